@@ -14,10 +14,25 @@ bl_info = {
 
 import bpy
 import bpy.utils.previews
+import argparse
 import random
 import colorsys
+import contextlib
+import cProfile
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
 import bmesh
-from mathutils import Vector
+import numpy as np
+from mathutils import Matrix, Vector
 
 # Global variables
 addon_keymaps = {}
@@ -31,6 +46,225 @@ KEYFRAME_SCALE = True
 KEYFRAME_VISIBILITY = False
 KEYFRAME_VISIBILITY_SCALE = True
 
+# NLA track used by the non-destructive time scale of ScaleKeyframesOperator
+TIME_SCALE_TRACK_NAME = "CakeTimeScale"
+
+CHANNEL_INTERPOLATION_ITEMS = [
+    ('LINEAR', "Linear", "Straight-line interpolation between keys"),
+    ('BEZIER', "Bezier", "Smooth interpolation between keys"),
+    ('CONSTANT', "Constant", "No interpolation, values hold until the next key"),
+]
+
+
+class RunStats:
+    """Phase timers and counters of the last bake or explosion, shown in the report and the panel"""
+
+    def __init__(self):
+        self.reset("")
+
+    def reset(self, operation, track_memory=False):
+        self.operation = operation
+        self.phases = {}
+        self.counters = {}
+        # Sizes of the run's input (particles, frames, pieces, ...) for the run history
+        self.inputs = {}
+        # Memory figures in MB, see finish()
+        self.memory = {}
+        # Warnings and errors the run reported
+        self.messages = []
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.datablocks_before = datablock_counts() if operation else {}
+        self._memory_before = process_memory_mb() if operation else None
+        self._tracing = track_memory and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        memory_after = process_memory_mb()
+        if memory_after is not None and self._memory_before is not None:
+            # Mostly the datablocks the run created, Python and NumPy memory is freed by now
+            self.memory["process growth"] = round(memory_after - self._memory_before, 1)
+        if self._tracing:
+            self.memory["python peak"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            tracemalloc.stop()
+            self._tracing = False
+        peak = process_peak_memory_mb()
+        if peak is not None:
+            self.memory["process peak"] = peak
+
+    def record(self, status):
+        """JSON-able record of the finished run for the run history"""
+        datablocks = datablock_counts()
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "operation": self.operation,
+            "status": status,
+            "addon_version": ".".join(str(part) for part in bl_info["version"]),
+            "blender": bpy.app.version_string,
+            "blend": bpy.data.filepath,
+            "inputs": self.inputs,
+            "total_seconds": round(self.total, 4),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "counters": self.counters,
+            "datablocks_delta": {name: count - self.datablocks_before.get(name, 0)
+                                 for name, count in datablocks.items()},
+            "peak_memory_mb": self.memory.get("process peak"),
+            "memory_mb": self.memory,
+            "messages": self.messages,
+        }
+
+    def summary(self):
+        phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds
+                           in sorted(self.phases.items(), key=lambda item: -item[1]))
+        counters = ", ".join(f"{name} {value}" for name, value in self.counters.items())
+        memory = ", ".join(f"{name} {value:.0f} MB" for name, value in self.memory.items())
+        return f"{self.operation} {self.total:.2f}s | {phases} | {counters} | {memory}"
+
+HISTORY_DATABLOCK_TYPES = ("objects", "meshes", "actions", "collections")
+
+def datablock_counts():
+    return {name: len(getattr(bpy.data, name)) for name in HISTORY_DATABLOCK_TYPES}
+
+def _windows_memory_mb(counter):
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return round(getattr(counters, counter) / (1024 * 1024), 1)
+
+def process_memory_mb():
+    """Current resident memory of this Blender process, None where it can't be read"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return round(int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        return _windows_memory_mb("WorkingSetSize")
+    except (AttributeError, OSError):
+        return None
+
+def process_peak_memory_mb():
+    """Peak resident memory of this Blender process since it started, None where it can't be read"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            return _windows_memory_mb("PeakWorkingSetSize")
+        except (AttributeError, OSError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+# Stats of the bake or explosion currently running, or of the last one
+run_stats = RunStats()
+
+def get_history_path(scene):
+    """Run history file, cake_run_history.jsonl in Blender's config folder unless the scene names one"""
+    if scene.cake_history_path:
+        return bpy.path.abspath(scene.cake_history_path)
+    return os.path.join(bpy.utils.user_resource('CONFIG'), "cake_run_history.jsonl")
+
+def append_run_history(scene, status):
+    """Appends the finished run_stats as one JSON line to the run history, returns the file"""
+    if not scene.cake_log_history:
+        return None
+    filepath = get_history_path(scene)
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    with open(filepath, "a") as history_file:
+        history_file.write(json.dumps(run_stats.record(status)) + "\n")
+    return filepath
+
+def read_run_history(filepath):
+    """Every readable record of a run history file, oldest first"""
+    if not os.path.isfile(filepath):
+        return []
+    records = []
+    with open(filepath) as history_file:
+        for line in history_file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+def _relative_change(new, old):
+    return f"{(new - old) / old:+.0%}" if old else "n/a"
+
+def compare_runs(last, previous):
+    """Lines comparing two run history records, phases sorted by their time in the last run"""
+    lines = [f"{last['operation']} {last['total_seconds']:.2f}s vs {previous['total_seconds']:.2f}s "
+             f"({_relative_change(last['total_seconds'], previous['total_seconds'])}), "
+             f"add-on {last['addon_version']} vs {previous['addon_version']}, "
+             f"Blender {last['blender']} vs {previous['blender']}"]
+    for name, seconds in sorted(last["phases"].items(), key=lambda item: -item[1]):
+        old = previous["phases"].get(name)
+        if old is None:
+            lines.append(f"{name}: {seconds:.2f}s (new phase)")
+        else:
+            lines.append(f"{name}: {seconds:.2f}s vs {old:.2f}s ({_relative_change(seconds, old)})")
+    if last["inputs"] != previous["inputs"]:
+        lines.append(f"inputs differ: {last['inputs']} vs {previous['inputs']}")
+    if last.get("peak_memory_mb") and previous.get("peak_memory_mb"):
+        lines.append(f"peak memory: {last['peak_memory_mb']:.0f} MB vs {previous['peak_memory_mb']:.0f} MB")
+    return lines
+
+def start_profiler(scene):
+    """cProfile profiler when the scene asks for a profile dump, else None"""
+    return cProfile.Profile() if scene.cake_write_profile else None
+
+def dump_profiler(profiler, scene):
+    if profiler is None:
+        return None
+    filepath = bpy.path.abspath(scene.cake_profile_path)
+    profiler.dump_stats(filepath)
+    return filepath
+
+def remove_objects(objects):
+    """
+    Deletes objects in one batch together with the actions and meshes only they were using.
+    Objects older than the active RollbackPoint are only unlinked and kept for it.
+    """
+    objects = list(objects)
+    if RollbackPoint.active:
+        objects = RollbackPoint.active.hold_objects(objects)
+    if not objects:
+        return
+    actions = {obj.animation_data.action for obj in objects
+               if obj.animation_data and obj.animation_data.action}
+    meshes = {obj.data for obj in objects if isinstance(obj.data, bpy.types.Mesh)}
+    for obj in objects:
+        if obj.data and obj.data.use_fake_user:
+            meshes.discard(obj.data)
+            bpy.data.meshes.remove(obj.data, do_unlink=True)
+    bpy.data.batch_remove(objects)
+    orphans = [data for data in actions | meshes if data.users == 0]
+    if orphans:
+        bpy.data.batch_remove(orphans)
 
 def create_or_clear_collection(collection_name):
     """Create a new collection or clear existing one if it exists"""
@@ -38,10 +272,7 @@ def create_or_clear_collection(collection_name):
     
     if existing_collection:
         # Remove all objects from the collection
-        for obj in existing_collection.objects:
-            if obj.data and obj.data.use_fake_user:
-                bpy.data.meshes.remove(obj.data, do_unlink=True)
-            bpy.data.objects.remove(obj, do_unlink=True)
+        remove_objects(existing_collection.objects)
         return existing_collection
     else:
         # Create new collection
@@ -49,262 +280,2359 @@ def create_or_clear_collection(collection_name):
         bpy.context.scene.collection.children.link(new_collection)
         return new_collection
 
-def create_particle_objects(particle_system, source_objects, collection_name):
+def output_collection_name(base_name, emitter, particle_system, multiple_emitters, multiple_systems):
+    """Collection a particle system bakes into, suffixed when one bake produces several collections"""
+    if multiple_emitters:
+        return f"{base_name}_{emitter.name}_{particle_system.name}"
+    if multiple_systems:
+        return f"{base_name}_{particle_system.name}"
+    return base_name
+
+# Custom property holding the particle index an object was baked from
+PARTICLE_INDEX_PROP = "cake_particle_index"
+BAKED_CHANNELS = ("location", "rotation_quaternion", "scale")
+
+def new_particle_object(index, source_objects, collection):
+    mesh = source_objects[index % len(source_objects)].data
+    duplicate = bpy.data.objects.new(
+        name=f"particle.{index:03d}",
+        object_data=mesh)
+    duplicate[PARTICLE_INDEX_PROP] = index
+    collection.objects.link(duplicate)
+    return duplicate
+
+def get_baked_particle_objects(collection):
+    """Objects of a previous bake ordered by the particle they follow"""
+    indexed = []
+    for obj in collection.objects:
+        index = obj.get(PARTICLE_INDEX_PROP)
+        if index is None:
+            # Bakes from older versions only carry the index in the name, particle.007(.001)
+            match = re.match(r"particle\.(\d+)(\.\d+)?$", obj.name)
+            if not match:
+                continue
+            index = int(match.group(1))
+        indexed.append((index, obj))
+    indexed.sort(key=lambda item: item[0])
+    return [obj for _, obj in indexed]
+
+def clear_keys_in_window(objects, window_start, window_end, data_paths=BAKED_CHANNELS):
+    """Removes the baked keys with window_start <= frame <= window_end, keys outside stay untouched"""
+    for obj in objects:
+        if not (obj.animation_data and obj.animation_data.action):
+            continue
+        for fcurve in obj.animation_data.action.fcurves:
+            if fcurve.data_path not in data_paths or not fcurve.keyframe_points:
+                continue
+            co = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+            fcurve.keyframe_points.foreach_get("co", co)
+            key_frames = co[0::2]
+            rewrite_keyframe_points(fcurve, (key_frames < window_start - 0.5) | (key_frames > window_end + 0.5))
+
+def rebake_particle_window(samples, source_objects, collection, window_start, window_end):
+    """
+    Re-bakes samples of window_start..window_end into the objects of an existing bake.
+    Keys outside the window are kept; objects are only created or removed when the
+    particle count changed. New objects stay hidden before the window.
+    """
+    scene = bpy.context.scene
+    objects = get_baked_particle_objects(collection)
+    particle_count = samples.particle_count
+
+    remove_objects(objects[particle_count:])
+    objects = objects[:particle_count]
+    clear_keys_in_window(objects, window_start, window_end)
+
+    if len(objects) < particle_count and not source_objects:
+        raise Exception("Particle count grew, select source objects to create the new particle instances.")
+    for index in range(len(objects), particle_count):
+        obj = new_particle_object(index, source_objects, collection)
+        obj.scale = (0.001, 0.001, 0.001)
+        if scene.frame_start < window_start:
+            obj.keyframe_insert("scale", frame=scene.frame_start)
+        objects.append(obj)
+
+    keyframe_objects_from_samples(samples, objects, 0, get_channel_interpolation(scene), get_key_reduction(scene),
+                                  get_memory_budget(scene))
+    return objects
+
+def _reclaim_action(obj):
+    """The object's baked action, taken back from the CakeTimeScale NLA strip if it was moved there"""
+    anim_data = obj.animation_data
+    if anim_data is None:
+        return None
+    track = anim_data.nla_tracks.get(TIME_SCALE_TRACK_NAME)
+    if track:
+        if anim_data.action is None and track.strips:
+            anim_data.action = track.strips[0].action
+        anim_data.nla_tracks.remove(track)
+    return anim_data.action
+
+def get_playing_action(obj):
+    """The object's action, also when it only plays through the CakeTimeScale NLA strip"""
+    anim_data = obj.animation_data
+    if anim_data is None:
+        return None
+    if anim_data.action is None:
+        track = anim_data.nla_tracks.get(TIME_SCALE_TRACK_NAME)
+        if track and track.strips:
+            return track.strips[0].action
+    return anim_data.action
+
+def reset_particle_object(obj, index, source_objects):
+    """
+    Turns a pooled object from a previous bake into a fresh particle instance for index,
+    keeping its action and F-curves but none of their keys. Returns False when the
+    object can't take the source's data type and has to be replaced.
+    """
+    source = source_objects[index % len(source_objects)]
+    if obj.type != source.type:
+        return False
+    if obj.data != source.data:
+        obj.data = source.data
+    obj[PARTICLE_INDEX_PROP] = index
+    obj.location = (0.0, 0.0, 0.0)
+    obj.rotation_mode = 'XYZ'
+    obj.rotation_euler = (0.0, 0.0, 0.0)
+    obj.rotation_quaternion = (1.0, 0.0, 0.0, 0.0)
+    obj.scale = (1.0, 1.0, 1.0)
+    obj.hide_viewport = False
+    obj.hide_render = False
+
+    action = _reclaim_action(obj)
+    if action:
+        for fcurve in list(action.fcurves):
+            if fcurve.data_path not in BAKED_CHANNELS:
+                action.fcurves.remove(fcurve)
+            elif fcurve.keyframe_points:
+                rewrite_keyframe_points(fcurve, np.zeros(len(fcurve.keyframe_points), dtype=bool))
+    return True
+
+def create_particle_objects(particle_system, source_objects, collection_name, particle_count=None):
+    """
+    One object per particle in the collection. On a re-bake the objects of the previous bake
+    are reused with their actions emptied in place, only the difference in particle count
+    is created or deleted, so repeated re-bakes leave no orphan data behind.
+    """
     if not source_objects:
         raise Exception("No source objects available to create particle instances.")
 
-    created_objects = []
-    
     # Generate a random color for the collection
     n=random.randint(1,8)
     color_code=f'COLOR_0{n}'
     # Create or get the collection
-    particle_collection = create_or_clear_collection(collection_name)
+    particle_collection = bpy.data.collections.get(collection_name) or create_or_clear_collection(collection_name)
     particle_collection.color_tag = color_code
 
-    for index, _ in enumerate(particle_system.particles):
-        object_index = index % len(source_objects)
-        mesh = source_objects[object_index].data
-        duplicate = bpy.data.objects.new(
-            name=f"particle.{index:03d}",
-            object_data=mesh)
-        particle_collection.objects.link(duplicate)
-        if duplicate.animation_data:
-            duplicate.animation_data_clear()
-        created_objects.append(duplicate)
+    if particle_count is None:
+        particle_count = len(particle_system.particles)
+    pool = get_baked_particle_objects(particle_collection)[:particle_count]
+    reused = {}
+    for index, obj in enumerate(pool):
+        if reset_particle_object(obj, index, source_objects):
+            reused[index] = obj
+    kept = set(reused.values())
+    remove_objects([obj for obj in particle_collection.objects if obj not in kept])
 
+    created_objects = []
+    for index in range(particle_count):
+        obj = reused.get(index)
+        if obj is None:
+            obj = new_particle_object(index, source_objects, particle_collection)
+        created_objects.append(obj)
+
+    run_stats.count("objects reused", len(reused))
+    run_stats.count("objects created", particle_count - len(reused))
     return created_objects
 
-def match_keyframe_objects(particle_system, objects, start_frame, end_frame, step=1, keyframe_offset=0):
-    depsgraph = bpy.context.evaluated_depsgraph_get()
-    
-    for frame_iter_for_particles in range(start_frame, end_frame + 1, step):
-        bpy.context.scene.frame_set(frame_iter_for_particles) 
-        
-        frame_for_keyframes = frame_iter_for_particles + keyframe_offset
-
-        eval_emitter_obj = particle_system.id_data.evaluated_get(depsgraph)
-        eval_psys = None
-        if eval_emitter_obj:
-            eval_psys = eval_emitter_obj.particle_systems.get(particle_system.name)
-
-        particles_on_frame = []
-        if eval_psys:
-            particles_on_frame = list(eval_psys.particles)
-        
-        for i, obj in enumerate(objects):
-            if i < len(particles_on_frame):
-                particle = particles_on_frame[i]
-                match_object_to_particle(particle, obj, frame_iter_for_particles) 
+class ParticleSamples:
+    """
+    Particle state of one particle system sampled over a frame range.
+    Every channel is a contiguous (frames, particles, ...) array so later stages
+    (keyframing, export, decimation, caching) work on the whole bake at once.
+    With a storage_dir the channels are memory-mapped .npy files instead of RAM arrays.
+    """
+    # channel name -> (trailing shape, dtype)
+    CHANNELS = {
+        "location": ((3,), np.float32),
+        "rotation": ((4,), np.float32),
+        "velocity": ((3,), np.float32),
+        "size": ((), np.float32),
+        # birth_time, die_time, lifetime
+        "times": ((3,), np.float32),
+        "alive": ((), bool),
+        # False where the evaluated system had no particle at that index on that frame
+        "exists": ((), bool),
+    }
+
+    def __init__(self, frames, particle_count, storage_dir=None):
+        self.frames = np.asarray(frames, dtype=np.int32)
+        self.particle_count = particle_count
+        self.storage_dir = storage_dir
+        num_frames = len(self.frames)
+        for name, (trailing_shape, dtype) in self.CHANNELS.items():
+            shape = (num_frames, particle_count) + trailing_shape
+            if storage_dir:
+                array = np.lib.format.open_memmap(os.path.join(storage_dir, f"{name}.npy"),
+                                                  mode='w+', dtype=dtype, shape=shape)
             else:
-                obj.scale = (0.001, 0.001, 0.001)
-                if KEYFRAME_VISIBILITY_SCALE is False and KEYFRAME_VISIBILITY is True:
-                    obj.hide_viewport = True
-                    obj.hide_render = True
-            
-            keyframe_object(obj, frame_for_keyframes)
+                array = np.zeros(shape, dtype=dtype)
+            setattr(self, name, array)
+        self.rotation[..., 0] = 1.0
+        if storage_dir:
+            np.save(os.path.join(storage_dir, "frames.npy"), self.frames)
 
-def match_object_to_particle(particle, obj, frame):
+    @classmethod
+    def nbytes(cls, num_frames, particle_count):
+        """Memory taken by the channels of num_frames x particle_count samples"""
+        per_particle_frame = sum(int(np.prod(trailing_shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+                                 for trailing_shape, dtype in cls.CHANNELS.values())
+        return num_frames * particle_count * per_particle_frame
+
+    def flush(self):
+        for name in self.CHANNELS:
+            array = getattr(self, name)
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    def save(self, storage_dir):
+        """Writes the samples to storage_dir in the layout load() opens"""
+        os.makedirs(storage_dir, exist_ok=True)
+        np.save(os.path.join(storage_dir, "frames.npy"), self.frames)
+        for name in self.CHANNELS:
+            np.save(os.path.join(storage_dir, f"{name}.npy"), getattr(self, name))
+        return storage_dir
 
-    obj.location = particle.location
-    
-    obj.rotation_mode = 'QUATERNION'
-
-    if hasattr(particle, 'matrix'):
-        rot_matrix = particle.matrix.to_3x3()
-        obj.rotation_quaternion = rot_matrix.to_quaternion()
-    elif hasattr(particle, 'rotation_matrix'):
-        rot_matrix = particle.rotation_matrix
-        obj.rotation_quaternion = rot_matrix.to_quaternion()
+    @classmethod
+    def load(cls, storage_dir):
+        """Opens samples saved with a storage_dir, channels stay on disk (read-only memory maps)"""
+        samples = cls.__new__(cls)
+        samples.storage_dir = storage_dir
+        samples.frames = np.load(os.path.join(storage_dir, "frames.npy"))
+        for name in cls.CHANNELS:
+            setattr(samples, name, np.load(os.path.join(storage_dir, f"{name}.npy"), mmap_mode='r'))
+        samples.particle_count = samples.location.shape[1]
+        return samples
+
+def _evaluated_particle_system(particle_system, depsgraph):
+    eval_emitter_obj = particle_system.id_data.original.evaluated_get(depsgraph)
+    if eval_emitter_obj:
+        return eval_emitter_obj.particle_systems.get(particle_system.name)
+    return None
+
+def _read_alive_states(particles, count):
+    states = np.empty(count, dtype=np.int32)
+    try:
+        particles.foreach_get("alive_state", states)
+        return states == _enum_value(bpy.types.Particle, "alive_state", 'ALIVE')
+    except (TypeError, RuntimeError):
+        return np.fromiter((p.alive_state == 'ALIVE' for p in particles), dtype=bool, count=count)
+
+def read_particle_frame(samples, frame_index, particles):
+    """Copies one frame of evaluated particles into samples with bulk foreach_get reads"""
+    total = len(particles)
+    count = min(total, samples.particle_count)
+    if count == 0:
+        return
+
+    buffer = np.empty(total * 4, dtype=np.float32)
+    for attr, target, width in (("location", samples.location, 3),
+                                ("rotation", samples.rotation, 4),
+                                ("velocity", samples.velocity, 3)):
+        particles.foreach_get(attr, buffer[:total * width])
+        target[frame_index, :count] = buffer[:total * width].reshape(total, width)[:count]
+    particles.foreach_get("size", buffer[:total])
+    samples.size[frame_index, :count] = buffer[:count]
+    for component, attr in enumerate(("birth_time", "die_time", "lifetime")):
+        particles.foreach_get(attr, buffer[:total])
+        samples.times[frame_index, :count, component] = buffer[:count]
+    samples.alive[frame_index, :count] = _read_alive_states(particles, total)[:count]
+    samples.exists[frame_index, :count] = True
+
+# Temporary scene used by isolated evaluation
+ISOLATED_SCENE_NAME = "CakeIsolatedEvaluation"
+
+def _has_collision(obj):
+    return any(modifier.type == 'COLLISION' for modifier in obj.modifiers)
+
+def _is_force_field(obj):
+    return obj.field is not None and obj.field.type != 'NONE'
+
+def get_simulation_objects(particle_systems, view_layer):
+    """
+    Emitters of particle_systems plus the colliders, force fields and keyed targets acting on them.
+    Everything else they depend on (parents, modifier and constraint targets, drivers) does not
+    need to be in the scene, the depsgraph pulls it in on its own.
+    """
+    # Disabled-in-viewport objects don't collide or push particles in the viewport either
+    scene_objects = [obj for obj in view_layer.objects if not obj.hide_viewport]
+    objects = []
+    for particle_system in particle_systems:
+        emitter = particle_system.id_data.original
+        settings = particle_system.settings.original
+        objects.append(emitter)
+        colliders = settings.collision_collection.all_objects if settings.collision_collection else scene_objects
+        objects += [obj for obj in colliders if _has_collision(obj)]
+        effector_collection = settings.effector_weights.collection
+        effectors = effector_collection.all_objects if effector_collection else scene_objects
+        objects += [obj for obj in effectors if _is_force_field(obj)]
+        original_psys = emitter.particle_systems.get(particle_system.name)
+        if original_psys:
+            objects += [target.object for target in original_psys.targets if target.object]
+    return list(dict.fromkeys(obj.original for obj in objects))
+
+@contextlib.contextmanager
+def evaluation_scene(particle_systems, isolated=False):
+    """
+    (scene, depsgraph) that particle sampling steps through. Normally the user's scene.
+    When isolated, a temporary scene linking only get_simulation_objects, so each frame change
+    evaluates the emitter and its dependencies instead of every rig and modifier stack of the shot.
+    The scene settings the simulation reads (time, gravity) are copied over so the result is the same.
+    """
+    scene = bpy.context.scene
+    if not isolated:
+        yield scene, bpy.context.evaluated_depsgraph_get()
+        return
+
+    isolated_scene = bpy.data.scenes.new(ISOLATED_SCENE_NAME)
+    try:
+        for attr in ("frame_start", "frame_end", "frame_step", "use_gravity", "gravity"):
+            setattr(isolated_scene, attr, getattr(scene, attr))
+        for attr in ("fps", "fps_base", "frame_map_old", "frame_map_new"):
+            setattr(isolated_scene.render, attr, getattr(scene.render, attr))
+        for obj in get_simulation_objects(particle_systems, bpy.context.view_layer):
+            isolated_scene.collection.objects.link(obj)
+        yield isolated_scene, isolated_scene.view_layers[0].depsgraph
+    finally:
+        bpy.data.scenes.remove(isolated_scene)
+
+# Modal bake: timer interval and how long each timer event keeps working before the UI redraws
+MODAL_TIMER_SECONDS = 0.01
+MODAL_SLICE_SECONDS = 0.1
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def run_steps(steps, window_manager=None):
+    """
+    Runs a bake generator to the end and returns its result. The generators yield
+    (phase, done, total) after each unit of work so modal operators can drive them
+    in slices, with a window_manager the progress shows on the mouse cursor.
+    """
+    if window_manager:
+        window_manager.progress_begin(0, 100)
+    try:
+        while True:
+            try:
+                _, done, total = next(steps)
+            except StopIteration as finished:
+                return finished.value
+            if window_manager and total:
+                window_manager.progress_update(100 * done / total)
+    finally:
+        if window_manager:
+            window_manager.progress_end()
+
+# bpy.data collections a cancelled modal run removes its new datablocks from
+ROLLBACK_DATABLOCKS = ("objects", "collections", "meshes", "materials", "actions", "particles", "node_groups", "pointclouds")
+
+# Object settings a bake resets on the objects it reuses
+ROLLBACK_OBJECT_ATTRS = ("location", "rotation_mode", "rotation_euler", "rotation_quaternion", "scale",
+                         "hide_viewport", "hide_render")
+
+class RollbackPoint:
+    """
+    What a modal run needs to undo itself without the undo stack: the datablocks that exist
+    when it is taken, the settings and F-curve keys of the objects the run may overwrite, the
+    frame and the selection. While it is the active one, objects and actions that existed
+    before the run are only unlinked when the run removes them (see hold_objects). restore()
+    removes everything the run created and puts the rest back, discard() deletes what was held.
+    """
+    active = None
+
+    def __init__(self, context, objects=()):
+        self.saved = [self._save_object(obj) for obj in objects]
+        self.held_objects = []
+        self.held_actions = []
+        self.existing = {attr: {id_data.session_uid for id_data in getattr(bpy.data, attr)}
+                         for attr in ROLLBACK_DATABLOCKS if hasattr(bpy.data, attr)}
+        self.frame = context.scene.frame_current
+        self.selected = [obj.name for obj in context.selected_objects]
+        self.active_object = context.view_layer.objects.active.name if context.view_layer.objects.active else None
+        RollbackPoint.active = self
+
+    @staticmethod
+    def _save_object(obj):
+        attrs = {}
+        for attr in ROLLBACK_OBJECT_ATTRS:
+            value = getattr(obj, attr)
+            attrs[attr] = tuple(value) if hasattr(value, "__len__") and not isinstance(value, str) else value
+        action = get_playing_action(obj)
+        fcurves = []
+        strip_scale = None
+        if action:
+            fcurves = [(fcurve.data_path, fcurve.array_index, fcurve.group.name if fcurve.group else None,
+                        read_keyframe_points(fcurve.keyframe_points)) for fcurve in action.fcurves]
+            if obj.animation_data.action is None:
+                strip_scale = get_time_scale_strip(obj).scale
+        return (obj, obj.data, attrs, obj.get(PARTICLE_INDEX_PROP), action, action.name if action else None,
+                fcurves, strip_scale)
+
+    def _created(self, id_data, attr):
+        return id_data.session_uid not in self.existing.get(attr, ())
+
+    def hold_objects(self, objects):
+        """Unlinks the objects that predate the run and keeps them, returns the ones to delete now"""
+        created = []
+        for obj in objects:
+            if self._created(obj, "objects"):
+                created.append(obj)
+                continue
+            collections = list(obj.users_collection)
+            for collection in collections:
+                collection.objects.unlink(obj)
+            obj.use_fake_user = True
+            self.held_objects.append((obj, collections))
+        return created
+
+    def hold_actions(self, actions):
+        """hold_objects for orphaned actions"""
+        created = []
+        for action in actions:
+            if self._created(action, "actions"):
+                created.append(action)
+            else:
+                action.use_fake_user = True
+                self.held_actions.append(action)
+        return created
+
+    def _release(self):
+        if RollbackPoint.active is self:
+            RollbackPoint.active = None
+        for obj, _ in self.held_objects:
+            obj.use_fake_user = False
+        for action in self.held_actions:
+            action.use_fake_user = False
+
+    def restore(self, context):
+        self._release()
+        for obj, collections in self.held_objects:
+            for collection in collections:
+                collection.objects.link(obj)
+        for obj, data, attrs, particle_index, action, action_name, fcurves, strip_scale in self.saved:
+            if obj.data != data:
+                obj.data = data
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+            if particle_index is None:
+                obj.pop(PARTICLE_INDEX_PROP, None)
+            else:
+                obj[PARTICLE_INDEX_PROP] = particle_index
+            if action is None:
+                continue
+            if obj.animation_data is None:
+                obj.animation_data_create()
+            if get_playing_action(obj) is not action:
+                _reclaim_action(obj)
+                obj.animation_data.action = action
+            action.name = action_name
+            current = {(fcurve.data_path, fcurve.array_index): fcurve for fcurve in action.fcurves}
+            for data_path, index, group, data in fcurves:
+                fcurve = current.pop((data_path, index), None)
+                if fcurve is None:
+                    fcurve = (action.fcurves.new(data_path, index=index, action_group=group) if group
+                              else action.fcurves.new(data_path, index=index))
+                replace_keyframe_points(fcurve, data)
+            for fcurve in current.values():
+                action.fcurves.remove(fcurve)
+            if strip_scale is not None:
+                get_time_scale_strip(obj).scale = strip_scale
+
+        created = [id_data for attr in self.existing for id_data in getattr(bpy.data, attr)
+                   if self._created(id_data, attr)]
+        if created:
+            bpy.data.batch_remove(created)
+        self.saved, self.held_objects, self.held_actions = [], [], []
+
+        context.scene.frame_set(self.frame)
+        for obj in context.view_layer.objects:
+            obj.select_set(obj.name in self.selected)
+        context.view_layer.objects.active = (context.view_layer.objects.get(self.active_object)
+                                             if self.active_object else None)
+
+    def discard(self):
+        self._release()
+        remove_objects([obj for obj, _ in self.held_objects])
+        orphans = [action for action in self.held_actions if action.users == 0]
+        if orphans:
+            bpy.data.batch_remove(orphans)
+        self.saved, self.held_objects, self.held_actions = [], [], []
+
+def iter_sample_particle_systems(particle_systems, start_frame, end_frame, step=1, storage_dirs=None, isolated=False):
+    """
+    Steps the timeline once and samples every particle of every given system on each frame,
+    so baking several systems or emitters costs a single simulation pass.
+    Yields after every frame, returns the ParticleSamples of each system.
+    """
+    frames = list(range(start_frame, end_frame + 1, step))
+    storage_dirs = storage_dirs or [None] * len(particle_systems)
+    all_samples = [None] * len(particle_systems)
+
+    with evaluation_scene(particle_systems, isolated) as (scene, depsgraph):
+        for frame_index, frame in enumerate(frames):
+            with run_stats.phase("frame_set"):
+                scene.frame_set(frame)
+            run_stats.count("frames evaluated")
+            for system_index, particle_system in enumerate(particle_systems):
+                with run_stats.phase("read particles"):
+                    eval_psys = _evaluated_particle_system(particle_system, depsgraph)
+                    particles = eval_psys.particles if eval_psys else []
+                    if all_samples[system_index] is None:
+                        all_samples[system_index] = ParticleSamples(
+                            frames, len(particles) or particle_system.settings.count, storage_dirs[system_index])
+                    read_particle_frame(all_samples[system_index], frame_index, particles)
+            yield "Sampling", frame_index + 1, len(frames)
+
+    return [samples if samples is not None else ParticleSamples(frames, 0, storage_dir)
+            for samples, storage_dir in zip(all_samples, storage_dirs)]
+
+def sample_particle_systems(particle_systems, start_frame, end_frame, step=1, storage_dirs=None, isolated=False):
+    return run_steps(iter_sample_particle_systems(particle_systems, start_frame, end_frame, step, storage_dirs, isolated))
+
+def sample_particle_system(particle_system, start_frame, end_frame, step=1, storage_dir=None, isolated=False):
+    """Steps the timeline once and samples every particle of particle_system on each frame"""
+    return sample_particle_systems([particle_system], start_frame, end_frame, step, [storage_dir], isolated)[0]
+
+# Bump when the sampled data changes meaning, so stale caches are never reused
+SAMPLE_CACHE_VERSION = 2
+
+def get_sample_cache_dir():
+    """cakecache_<blend name> folder next to the .blend, None while the file is unsaved"""
+    if not bpy.data.filepath:
+        return None
+    blend_dir, blend_name = os.path.split(bpy.data.filepath)
+    return os.path.join(blend_dir, f"cakecache_{os.path.splitext(blend_name)[0]}")
+
+def _rna_signature(struct, depth=1):
+    """repr of every plain property of an RNA struct, following nested non-ID structs depth levels deep"""
+    parts = []
+    for prop in struct.bl_rna.properties:
+        if prop.identifier == "rna_type" or prop.type == 'COLLECTION':
+            continue
+        try:
+            value = getattr(struct, prop.identifier)
+        except AttributeError:
+            continue
+        if prop.type == 'POINTER':
+            if value is not None and depth > 0 and not isinstance(value, bpy.types.ID):
+                value = _rna_signature(value, depth - 1)
+            else:
+                value = getattr(value, "name_full", None)
+        elif getattr(prop, "is_array", False):
+            value = repr([tuple(v) if hasattr(v, "__len__") else v for v in value])
+        parts.append((prop.identifier, value))
+    return repr(parts)
+
+def _animation_signature(id_data):
+    """Bytes of every key and handle of the ID's action"""
+    anim_data = getattr(id_data, "animation_data", None)
+    if not anim_data or not anim_data.action:
+        return b""
+    chunks = []
+    for fcurve in anim_data.action.fcurves:
+        keyframe_points = fcurve.keyframe_points
+        chunks.append(f"{fcurve.data_path}[{fcurve.array_index}]".encode())
+        for attr in ("co", "handle_left", "handle_right"):
+            values = np.empty(len(keyframe_points) * 2, dtype=np.float32)
+            keyframe_points.foreach_get(attr, values)
+            chunks.append(values.tobytes())
+    return b"".join(chunks)
+
+def particle_cache_key(particle_system, frames):
+    """
+    Hash of everything the sampled particle state depends on: particle settings and seed,
+    the frame range, the emitter's geometry, modifiers and transform animation,
+    and the colliders and force fields of the scene.
+    """
+    scene = bpy.context.scene
+    emitter = particle_system.id_data.original
+    digest = hashlib.sha1()
+    digest.update(repr((SAMPLE_CACHE_VERSION, bpy.app.version, particle_system.name, particle_system.seed,
+                        list(frames), scene.render.fps, scene.render.fps_base)).encode())
+    digest.update(_rna_signature(particle_system.settings).encode())
+
+    digest.update(np.array(emitter.matrix_world, dtype=np.float32).tobytes())
+    digest.update(_animation_signature(emitter))
+    for modifier in emitter.modifiers:
+        digest.update(_rna_signature(modifier, depth=0).encode())
+    if emitter.type == 'MESH':
+        coords = np.empty(len(emitter.data.vertices) * 3, dtype=np.float32)
+        emitter.data.vertices.foreach_get("co", coords)
+        digest.update(coords.tobytes())
+
+    for obj in scene.objects:
+        has_field = obj.field is not None and obj.field.type != 'NONE'
+        has_collision = any(modifier.type == 'COLLISION' for modifier in obj.modifiers)
+        if obj == emitter or not (has_field or has_collision):
+            continue
+        digest.update(obj.name_full.encode())
+        digest.update(np.array(obj.matrix_world, dtype=np.float32).tobytes())
+        digest.update(_animation_signature(obj))
+        if has_field:
+            digest.update(_rna_signature(obj.field, depth=0).encode())
+        if has_collision:
+            digest.update(_rna_signature(obj.collision, depth=0).encode())
+    return digest.hexdigest()
+
+# Blender point cache (.bphys) layout, see BKE_pointcache.h
+BPHYS_TYPE_PARTICLES = 1
+PTCACHE_TYPEFLAG_COMPRESS = 1 << 16
+PTCACHE_TYPEFLAG_TYPEMASK = 0x0000FFFF
+# data type bit -> (name, numpy dtype, components), in file order
+BPHYS_DATA_TYPES = (
+    ("index", np.uint32, 1),
+    ("location", np.float32, 3),
+    ("velocity", np.float32, 3),
+    ("rotation", np.float32, 4),
+    ("avelocity", np.float32, 3),
+    ("size", np.float32, 1),
+    ("times", np.float32, 3),
+    ("boids", np.uint8, 20),
+)
+
+def read_bphys_frame(filepath):
+    """
+    Parses one uncompressed particle point cache file into {data name: (points, components) array}.
+    Raises ValueError for other cache types and for compressed caches.
+    """
+    with open(filepath, "rb") as cache_file:
+        data = cache_file.read()
+    if data[:8] != b"BPHYSICS":
+        raise ValueError(f"{filepath} is not a Blender point cache file")
+    typeflag, point_count, data_types = struct.unpack_from("<III", data, 8)
+    if typeflag & PTCACHE_TYPEFLAG_TYPEMASK != BPHYS_TYPE_PARTICLES:
+        raise ValueError(f"{filepath} is not a particle point cache")
+
+    present = [(bit, entry) for bit, entry in enumerate(BPHYS_DATA_TYPES) if data_types & (1 << bit)]
+    offset = 20
+    result = {}
+    if typeflag & PTCACHE_TYPEFLAG_COMPRESS:
+        # One block per data type, each prefixed by its compression mode
+        for bit, (name, dtype, width) in present:
+            if data[offset] != 0:
+                raise ValueError(f"{filepath} is compressed, set the cache compression to None to read it")
+            offset += 1
+            values = np.frombuffer(data, dtype=dtype, count=point_count * width, offset=offset)
+            result[name] = values.reshape(point_count, width)
+            offset += values.nbytes
     else:
-        obj.rotation_quaternion = particle.rotation
-    
-    visibility = particle.alive_state == 'ALIVE'
-    if KEYFRAME_VISIBILITY_SCALE:
-        obj.scale = (0.001, 0.001, 0.001) if not visibility else (particle.size,) * 3
-
-    if visibility:
-        obj.hide_viewport = False
-        obj.hide_render = False
-
-def get_directionally_matched_pieces(source_obj_center, all_pieces, particle_system_data, eval_frame, context):
+        # Uncompressed points are stored interleaved, one record per point
+        record = np.dtype([(name, dtype, (width,)) for bit, (name, dtype, width) in present])
+        points = np.frombuffer(data, dtype=record, count=point_count, offset=offset)
+        for bit, (name, dtype, width) in present:
+            result[name] = points[name]
+    return result
+
+def get_point_cache_files(particle_system):
     """
-    Attempts to match pieces to particles based on direction.
-    Returns a list of pieces ordered to match particle animation tracks.
+    Frame -> .bphys path for the particle system's disk cache,
+    or None if it has no usable disk cache (memory-only caches stay on the depsgraph path).
     """
-    if not all_pieces or not particle_system_data:
-        return []
-
-    depsgraph = context.evaluated_depsgraph_get()
-    bpy.context.scene.frame_set(eval_frame)
-
-    eval_emitter_obj = particle_system_data.id_data.evaluated_get(depsgraph)
-    eval_psys = None
-    if eval_emitter_obj:
-        eval_psys = eval_emitter_obj.particle_systems.get(particle_system_data.name)
-
-    if not eval_psys or not eval_psys.particles:
-        return all_pieces[:len(eval_psys.particles)] if eval_psys else all_pieces
-
-    particle_infos = []
-    for i, p in enumerate(eval_psys.particles):
-        if p.alive_state == 'ALIVE' and hasattr(p, 'velocity'):
-            direction = p.velocity.normalized() if p.velocity.length > 0.001 else (p.location - source_obj_center).normalized()
-            if direction.length < 0.001 : direction = Vector((random.uniform(-1,1),random.uniform(-1,1),random.uniform(-1,1))).normalized()
-            particle_infos.append({'id': i, 'vector': direction, 'original_particle': p, 'used': False})
-
-    piece_infos = []
-    for i, piece_obj in enumerate(all_pieces):
-
-        piece_center_world = piece_obj.matrix_world.translation
-        outward_vector = (piece_center_world - source_obj_center).normalized()
-        if outward_vector.length < 0.001: outward_vector = Vector((random.uniform(-1,1),random.uniform(-1,1),random.uniform(-1,1))).normalized()
-        piece_infos.append({'id': i, 'vector': outward_vector, 'object': piece_obj})
-    
-    if not particle_infos:
-        return all_pieces[:0]
-
-    num_slots_to_fill = min(len(particle_infos), len(piece_infos), particle_system_data.settings.count)
-    
-    ordered_pieces_for_animation = [None] * num_slots_to_fill
- 
-    
-    available_pieces = list(piece_infos)
-    assignments = {}
-
-    particle_infos.sort(key=lambda p_info: p_info['id'])
-
-    for p_info in particle_infos:
-        if not available_pieces: break
-        best_piece_info = None
-        highest_dot = -2.0
-
-        for piece_idx, pc_info in enumerate(available_pieces):
-            dot = p_info['vector'].dot(pc_info['vector'])
-            if dot > highest_dot:
-                highest_dot = dot
-                best_piece_info = pc_info
-                best_piece_list_idx = piece_idx
-        
-        if best_piece_info:
-            assignments[p_info['id']] = best_piece_info['id']
-            available_pieces.pop(best_piece_list_idx)
-            p_info['used'] = True
-
-
-    final_ordered_pieces = [None] * particle_system_data.settings.count 
-    
-    piece_obj_to_id_map = {p['object']: p['id'] for p in piece_infos}
-
-    potential_matches = []
-    temp_particles = [p for p in eval_psys.particles]
-
-    for pc_info in piece_infos:
-        for particle_idx, p_sys_particle in enumerate(temp_particles):
-            if particle_idx >= particle_system_data.settings.count: break
-
-            p_velocity = p_sys_particle.velocity.normalized() if hasattr(p_sys_particle, 'velocity') and p_sys_particle.velocity.length > 0.001 else (p_sys_particle.location - source_obj_center).normalized()
-            if p_velocity.length < 0.001 : p_velocity = Vector((random.uniform(-1,1),random.uniform(-1,1),random.uniform(-1,1))).normalized()
-
-            dot = pc_info['vector'].dot(p_velocity)
-            potential_matches.append({'dot': dot, 'piece_obj': pc_info['object'], 'particle_idx': particle_idx})
-
-    potential_matches.sort(key=lambda x: x['dot'], reverse=True)
-    
-    assigned_particles = [False] * particle_system_data.settings.count
-    assigned_pieces_set = set()
-
-    for match in potential_matches:
-        p_idx = match['particle_idx']
-        pc_obj = match['piece_obj']
-
-        if not assigned_particles[p_idx] and pc_obj not in assigned_pieces_set:
-            final_ordered_pieces[p_idx] = pc_obj
-            assigned_particles[p_idx] = True
-            assigned_pieces_set.add(pc_obj)
-            if len(assigned_pieces_set) >= len(all_pieces): break
-            if sum(assigned_particles) >= particle_system_data.settings.count : break
-
-    
-    result_pieces = [None] * min(len(all_pieces), particle_system_data.settings.count)
-    
-    assigned_particles_indices = set()
-    assigned_piece_objects = set()
-
-    for p_slot_idx in range(len(result_pieces)):
-        best_match_for_this_slot = None
-        best_dot_for_this_slot = -2.0
-
-        if p_slot_idx >= len(temp_particles): continue
+    cache = particle_system.point_cache
+    emitter = particle_system.id_data.original
+    if cache.use_external:
+        directory = bpy.path.abspath(cache.filepath)
+    elif cache.use_disk_cache and bpy.data.filepath:
+        blend_dir, blend_name = os.path.split(bpy.data.filepath)
+        directory = os.path.join(blend_dir, f"blendcache_{os.path.splitext(blend_name)[0]}")
+    else:
+        return None
+    if not os.path.isdir(directory):
+        return None
+
+    # Unnamed caches use the emitter name in hex so it is always a valid file name
+    prefix = cache.name or "".join(f"{byte:02X}" for byte in emitter.name.encode("utf-8"))
+    if cache.use_external and cache.index < 0:
+        pattern = re.compile(re.escape(prefix) + r"_(\d{6})\.bphys$")
+    else:
+        pattern = re.compile(re.escape(prefix) + r"_(\d{6})_%02d\.bphys$" % max(cache.index, 0))
 
-        current_particle = temp_particles[p_slot_idx]
-        p_vec = current_particle.velocity.normalized() if hasattr(current_particle, 'velocity') and current_particle.velocity.length > 0.001 else (current_particle.location - source_obj_center).normalized()
-        if p_vec.length < 0.001 : p_vec = Vector((random.uniform(-1,1),random.uniform(-1,1),random.uniform(-1,1))).normalized()
+    files = {}
+    for filename in os.listdir(directory):
+        match = pattern.match(filename)
+        if match:
+            files[int(match.group(1))] = os.path.join(directory, filename)
+    return files or None
 
-        best_piece_for_this_particle = None
+def read_point_cache_samples(particle_system, start_frame, end_frame, step=1):
+    """
+    Builds ParticleSamples straight from the system's baked .bphys files, without frame_set.
+    Birth/death times and sizes are only stored once, in the frame 0 info file.
+    Returns None when any requested frame is missing from the disk cache or the cache can't be read,
+    callers then fall back to stepping the timeline.
+    """
+    files = get_point_cache_files(particle_system)
+    if not files:
+        return None
+    frames = list(range(start_frame, end_frame + 1, step))
+    if any(frame not in files for frame in frames):
+        return None
+
+    try:
+        frame_data = [read_bphys_frame(files[frame]) for frame in frames]
+        info = read_bphys_frame(files[0]) if 0 in files else {}
+    except (OSError, ValueError, struct.error):
+        return None
+
+    particle_count = particle_system.settings.count
+    for name in ("times", "size"):
+        if name in info:
+            particle_count = max(particle_count, len(info[name]))
+    for data in frame_data:
+        if "index" in data and data["index"].size:
+            particle_count = max(particle_count, int(data["index"].max()) + 1)
+        elif "index" not in data and "location" in data:
+            particle_count = max(particle_count, len(data["location"]))
+
+    samples = ParticleSamples(frames, particle_count)
+    samples.size[:] = particle_system.settings.particle_size
+    if "size" in info:
+        samples.size[:, :len(info["size"])] = info["size"][:, 0]
+    for frame_index, (frame, data) in enumerate(zip(frames, frame_data)):
+        if "location" not in data:
+            continue
+        indices = data["index"][:, 0] if "index" in data else np.arange(len(data["location"]))
+        for name in ("location", "velocity", "rotation", "times"):
+            if name in data:
+                getattr(samples, name)[frame_index, indices] = data[name]
+        if "size" in data:
+            samples.size[frame_index, indices] = data["size"][:, 0]
+        samples.exists[frame_index, indices] = True
+
+    # Particles are only written around their lifetime, unborn/dead frames borrow the nearest written state
+    written = samples.exists.copy()
+    seen = written.any(axis=0)
+    for name in ("location", "rotation", "velocity", "times"):
+        values = getattr(samples, name)
+        filled = _forward_fill(values, written, values[0])
+        backfilled = _forward_fill(values[::-1], written[::-1], values[-1])[::-1]
+        before_first = ~np.maximum.accumulate(written, axis=0)
+        values[:] = np.where(before_first[..., np.newaxis], backfilled, filled)
+    samples.exists[:] = seen[np.newaxis, :]
+    if "times" in info:
+        samples.times[:, :len(info["times"])] = info["times"]
+
+    # Without any times the written particles are the best guess, point_cache_matches catches the rest
+    samples.alive[:] = written
+    if "times" in info or any("times" in data for data in frame_data):
+        birth, death = samples.times[..., 0], samples.times[..., 1]
+        frame_numbers = samples.frames[:, np.newaxis]
+        samples.alive &= (birth <= frame_numbers) & (frame_numbers < death)
+    return samples
+
+# Largest difference in location and size between point cache samples and evaluated particles
+POINT_CACHE_TOLERANCE = 1e-4
+
+def point_cache_matches(cached, evaluated, frame_indices):
+    """
+    True when samples read from the point cache agree with evaluated samples of the same system,
+    evaluated holding the frames at frame_indices of cached: same particles alive, same locations and sizes.
+    """
+    if cached.particle_count != evaluated.particle_count:
+        return False
+    for evaluated_index, cached_index in enumerate(frame_indices):
+        alive = evaluated.alive[evaluated_index]
+        if not np.array_equal(cached.alive[cached_index], alive):
+            return False
+        for name in ("location", "size"):
+            difference = np.abs(getattr(cached, name)[cached_index] - getattr(evaluated, name)[evaluated_index])
+            if difference[alive].size and difference[alive].max() > POINT_CACHE_TOLERANCE:
+                return False
+    return True
 
-        for piece_obj in all_pieces:
-            if piece_obj in assigned_piece_objects:
+def iter_checked_point_cache_samples(particle_system, start_frame, end_frame, step=1, isolated=False):
+    """
+    read_point_cache_samples, checked against the depsgraph on the first and last frame of the range.
+    Returns None when the cache can't be read or doesn't match what stepping the timeline gives.
+    """
+    with run_stats.phase("read point cache"):
+        samples = read_point_cache_samples(particle_system, start_frame, end_frame, step)
+    if samples is None:
+        return None
+    first, last = int(samples.frames[0]), int(samples.frames[-1])
+    checked = yield from iter_sample_particle_systems([particle_system], first, last, max(last - first, 1),
+                                                       isolated=isolated)
+    frame_indices = [0, len(samples.frames) - 1][:len(checked[0].frames)]
+    if not point_cache_matches(samples, checked[0], frame_indices):
+        run_stats.count("point caches rejected")
+        return None
+    return samples
+
+def iter_gather_particle_samples(particle_systems, start_frame, end_frame, step=1, use_cache=False, use_point_cache=False, isolated=False, memory_budget=None):
+    """
+    Samples of every system for the frame range. With use_point_cache they are read from
+    Blender's baked .bphys files when those cover the range and match the evaluated particles
+    on its first and last frame. Otherwise they come from the
+    sample cache without touching the timeline when the emitter state is unchanged.
+    All remaining systems are sampled together in one timeline sweep, fresh samples are
+    written straight into the cache's memory-mapped files so they never have to fit in RAM.
+    Generator like iter_sample_particle_systems, stopping it midway leaves no partial cache entry.
+    When fresh samples would take more than half the memory_budget (bytes), the ones not going
+    to the cache are memory-mapped to temporary files instead of being held in RAM.
+    """
+    results = [None] * len(particle_systems)
+    cache_dir = get_sample_cache_dir() if use_cache else None
+    frames = range(start_frame, end_frame + 1, step)
+    pending = []
+
+    for system_index, particle_system in enumerate(particle_systems):
+        if use_point_cache:
+            results[system_index] = yield from iter_checked_point_cache_samples(
+                particle_system, start_frame, end_frame, step, isolated)
+            if results[system_index] is not None:
+                continue
+        entry_dir = None
+        if cache_dir is not None:
+            entry_dir = os.path.join(cache_dir, particle_cache_key(particle_system, frames))
+            if os.path.isfile(os.path.join(entry_dir, "complete")):
+                with run_stats.phase("load sample cache"):
+                    results[system_index] = ParticleSamples.load(entry_dir)
                 continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.makedirs(entry_dir, exist_ok=True)
+        pending.append((system_index, entry_dir))
+
+    spill_dirs = {}
+    if memory_budget:
+        in_memory = [system_index for system_index, entry_dir in pending if entry_dir is None]
+        sample_bytes = sum(ParticleSamples.nbytes(len(frames), particle_systems[system_index].settings.count)
+                           for system_index in in_memory)
+        run_stats.memory["samples estimate"] = round(sample_bytes / (1024 * 1024), 1)
+        if sample_bytes > memory_budget // 2:
+            spill_dirs = {system_index: tempfile.TemporaryDirectory(prefix="cake_samples_", ignore_cleanup_errors=True)
+                          for system_index in in_memory}
+            run_stats.count("systems sampled to disk", len(spill_dirs))
+
+    if pending:
+        storage_dirs = [spill_dirs[system_index].name if system_index in spill_dirs else entry_dir
+                        for system_index, entry_dir in pending]
+        try:
+            swept = yield from iter_sample_particle_systems(
+                [particle_systems[system_index] for system_index, _ in pending],
+                start_frame, end_frame, step, storage_dirs, isolated)
+        except BaseException:
+            for _, entry_dir in pending:
+                if entry_dir is not None:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+            for spill_dir in spill_dirs.values():
+                spill_dir.cleanup()
+            raise
+        for (system_index, entry_dir), samples in zip(pending, swept):
+            # Temporary files live as long as the samples using them
+            samples.spill_dir = spill_dirs.get(system_index)
+            if entry_dir is not None:
+                samples.flush()
+                with open(os.path.join(entry_dir, "complete"), "w") as marker:
+                    marker.write(particle_systems[system_index].name)
+            results[system_index] = samples
+    return results
+
+def gather_particle_samples(particle_systems, start_frame, end_frame, step=1, use_cache=False, use_point_cache=False, isolated=False, memory_budget=None):
+    return run_steps(iter_gather_particle_samples(particle_systems, start_frame, end_frame, step,
+                                                  use_cache, use_point_cache, isolated, memory_budget))
+
+def get_particle_samples(particle_system, start_frame, end_frame, step=1, use_cache=False, use_point_cache=False, isolated=False):
+    return gather_particle_samples([particle_system], start_frame, end_frame, step,
+                                   use_cache, use_point_cache, isolated)[0]
+
+def _forward_fill(values, valid, initial):
+    """Repeats the last valid value along the frame axis, starting from initial"""
+    num_frames = values.shape[0]
+    filled = np.concatenate((initial[np.newaxis], values), axis=0)
+    valid = np.concatenate((np.ones((1,) + valid.shape[1:], dtype=bool), valid), axis=0)
+    last_valid = np.where(valid, np.arange(num_frames + 1).reshape((-1,) + (1,) * (valid.ndim - 1)), 0)
+    last_valid = np.maximum.accumulate(last_valid, axis=0)[1:]
+    return np.take_along_axis(filled, last_valid[..., np.newaxis], axis=0)
+
+def samples_to_transforms(samples, objects, first_index=0):
+    """
+    Turns sampled particle state into per-object location, quaternion and scale tracks,
+    objects[i] following particle first_index + i.
+    Objects without a particle on a frame keep their previous location/rotation and
+    are scaled down, dead or unborn particles get the 0.001 'hidden' scale.
+    """
+    num_frames = len(samples.frames)
+    num_objects = len(objects)
+    matched = max(0, min(num_objects, samples.particle_count - first_index))
+    particles = slice(first_index, first_index + matched)
+    exists, alive = particle_presence(samples, num_objects, first_index)
+
+    locations = np.zeros((num_frames, num_objects, 3), dtype=np.float32)
+    locations[:, :matched] = samples.location[:, particles]
+    rotations = np.zeros((num_frames, num_objects, 4), dtype=np.float32)
+    rotations[:, :matched] = samples.rotation[:, particles]
+    sizes = np.zeros((num_frames, num_objects), dtype=np.float32)
+    sizes[:, :matched] = samples.size[:, particles]
+
+    initial_locations = np.array([obj.location for obj in objects], dtype=np.float32).reshape(num_objects, 3)
+    initial_rotations = np.array([obj.rotation_quaternion for obj in objects], dtype=np.float32).reshape(num_objects, 4)
+    initial_scales = np.array([obj.scale for obj in objects], dtype=np.float32).reshape(num_objects, 3)
+
+    locations = _forward_fill(locations, exists, initial_locations)
+    rotations = _forward_fill(rotations, exists, initial_rotations)
+
+    scale_values = np.where(exists & alive, sizes, 0.001)
+    scale_set = ~exists | KEYFRAME_VISIBILITY_SCALE
+    scales = np.repeat(scale_values[..., np.newaxis], 3, axis=2)
+    scales = _forward_fill(scales, scale_set, initial_scales)
+
+    update_particle_objects(objects, exists, alive)
+    return locations, rotations, scales
+
+def particle_presence(samples, num_objects, first_index=0):
+    """(frames, objects) exists and alive masks of the particles first_index.. that objects follow"""
+    num_frames = len(samples.frames)
+    matched = max(0, min(num_objects, samples.particle_count - first_index))
+    particles = slice(first_index, first_index + matched)
+    exists = np.zeros((num_frames, num_objects), dtype=bool)
+    exists[:, :matched] = samples.exists[:, particles]
+    alive = np.zeros((num_frames, num_objects), dtype=bool)
+    alive[:, :matched] = samples.alive[:, particles]
+    return exists, alive
+
+def update_particle_objects(objects, exists, alive):
+    """Rotation mode and visibility of baked objects, from their particle's presence masks"""
+    for i, obj in enumerate(objects):
+        if exists[:, i].any():
+            obj.rotation_mode = 'QUATERNION'
+        if alive[:, i].any():
+            obj.hide_viewport = False
+            obj.hide_render = False
+        if KEYFRAME_VISIBILITY_SCALE is False and KEYFRAME_VISIBILITY is True:
+            missing_frames = np.flatnonzero(~exists[:, i])
+            alive_frames = np.flatnonzero(alive[:, i])
+            if missing_frames.size and (not alive_frames.size or missing_frames[-1] > alive_frames[-1]):
+                obj.hide_viewport = True
+                obj.hide_render = True
+
+def _key_slopes(values, key_frames, key_columns, prev_key, next_key):
+    """
+    Slopes of Blender's auto-clamped handles at the keys (key_frames[i], key_columns[i]) of a
+    (frames, objects, channels) track: the mean of the neighbouring secant slopes, flat at local
+    extremes and on the first and last key of the curve.
+    Returns a (frames * objects, channels) array only filled on those keys.
+    """
+    num_frames, num_objects, channels = values.shape
+    flat_values = values.reshape(-1, channels)
+    prev_frames = prev_key[np.maximum(key_frames - 1, 0), key_columns]
+    next_frames = next_key[np.minimum(key_frames + 1, num_frames - 1), key_columns]
+    key_values = flat_values[key_frames * num_objects + key_columns]
+    span_before = np.maximum(key_frames - prev_frames, 1).astype(np.float32)[:, np.newaxis]
+    span_after = np.maximum(next_frames - key_frames, 1).astype(np.float32)[:, np.newaxis]
+    slope_before = (key_values - flat_values[prev_frames * num_objects + key_columns]) / span_before
+    slope_after = (flat_values[next_frames * num_objects + key_columns] - key_values) / span_after
+    key_slopes = np.where(slope_before * slope_after > 0.0, (slope_before + slope_after) * 0.5, 0.0)
+    key_slopes[(key_frames == 0) | (key_frames == num_frames - 1)] = 0.0
+    slopes = np.zeros_like(flat_values)
+    slopes[key_frames * num_objects + key_columns] = key_slopes
+    return slopes
+
+def _interpolate_points(values, frames, columns, prev_frames, next_frames, fit, slopes=None):
+    """
+    What a (frames, objects, channels) track keyed only on its keys returns at the points
+    (frames[i], columns[i]), which lie between the keys prev_frames[i] and next_frames[i].
+    BEZIER needs the _key_slopes of the track.
+    """
+    num_objects, channels = values.shape[1:]
+    flat_values = values.reshape(-1, channels)
+    prev_ids = prev_frames * num_objects + columns
+    prev_values = flat_values[prev_ids]
+    if fit == 'CONSTANT':
+        return prev_values
+    next_ids = next_frames * num_objects + columns
+    next_values = flat_values[next_ids]
+    span = next_frames - prev_frames
+    t = ((frames - prev_frames) / np.maximum(span, 1)).astype(np.float32)[:, np.newaxis]
+    if fit == 'LINEAR':
+        return prev_values + t * (next_values - prev_values)
+
+    span = span.astype(np.float32)[:, np.newaxis]
+    t2, t3 = t * t, t * t * t
+    return ((2 * t3 - 3 * t2 + 1) * prev_values + (t3 - 2 * t2 + t) * span * slopes[prev_ids]
+            + (-2 * t3 + 3 * t2) * next_values + (t3 - t2) * span * slopes[next_ids])
+
+def _key_neighbours(keep):
+    """Key at or before and key at or after every frame of a (frames, objects) key mask"""
+    num_frames = keep.shape[0]
+    frame_ids = np.arange(num_frames)[:, np.newaxis]
+    prev_key = np.maximum.accumulate(np.where(keep, frame_ids, 0), axis=0)
+    next_key = np.minimum.accumulate(np.where(keep, frame_ids, num_frames - 1)[::-1], axis=0)[::-1]
+    return prev_key, next_key
+
+# Frames a long segment is probed on before its error is checked frame by frame
+SEGMENT_PROBES = 8
+
+def adaptive_key_mask(locations, rotations, scales, location_tolerance, rotation_tolerance, interpolation=None):
+    """
+    Picks, per object, a small set of frames whose interpolated curves stay within tolerance
+    of the sampled tracks. location_tolerance is in scene units (also used for scale),
+    rotation_tolerance in radians. Each channel is fitted the way it will be interpolated
+    (LINEAR, BEZIER or CONSTANT). The set is grown greedily like a parallel Douglas-Peucker,
+    every pass adds the worst frame of each segment still out of tolerance, so it is not minimal.
+    Only the frames whose fit changed with the last pass's keys are evaluated again.
+    Returns a (frames, objects) boolean mask of frames to keyframe.
+    """
+    interpolation = interpolation or {}
+    num_frames, num_objects = locations.shape[:2]
+    keep = np.zeros((num_frames, num_objects), dtype=bool)
+    if num_frames == 0 or num_objects == 0:
+        return keep
+    keep[0] = keep[-1] = True
+
+    # Birth and death pops must land exactly on their frames
+    visible = np.any(scales > 0.0011, axis=2)
+    flips = visible[1:] != visible[:-1]
+    keep[1:] |= flips
+    keep[:-1] |= flips
+
+    location_tolerance = max(location_tolerance, 1e-6)
+    rotation_tolerance = max(rotation_tolerance, 1e-6)
+
+    # Held (CONSTANT) channels are seeded with a forward sweep, refining them by splitting converges slowly
+    for enabled, data_path, track, tolerance, is_rotation in (
+            (KEYFRAME_LOCATION, "location", locations, location_tolerance, False),
+            (KEYFRAME_ROTATION, "rotation_quaternion", rotations, rotation_tolerance, True),
+            (KEYFRAME_SCALE, "scale", scales, location_tolerance, False)):
+        if enabled and interpolation.get(data_path) == 'CONSTANT':
+            held = track[0].copy()
+            for frame in range(1, num_frames):
+                if is_rotation:
+                    deviation = 2.0 * np.arccos(np.clip(np.abs(np.sum(held * track[frame], axis=1)), 0.0, 1.0))
+                else:
+                    deviation = np.abs(track[frame] - held).max(axis=1)
+                moved = deviation > tolerance
+                keep[frame] |= moved
+                held[moved] = track[frame, moved]
+
+    # Error relative to the tolerance of every frame, refreshed only where the keys around it changed.
+    # Long segments are first probed on a few frames to pick their split, a segment only counts as
+    # within tolerance once every one of its frames was checked (exhaustive pass).
+    error = np.zeros((num_frames, num_objects), dtype=np.float32)
+    stale = ~keep
+    exhaustive = False
+    while True:
+        prev_key, next_key = _key_neighbours(keep)
+        stale &= ~keep
+        error[stale] = 0.0
+        frames, columns = np.nonzero(stale)
+        prev_frames = prev_key[frames, columns]
+        next_frames = next_key[frames, columns]
+        if not exhaustive:
+            stride = np.maximum((next_frames - prev_frames) // SEGMENT_PROBES, 1)
+            probed = (frames - prev_frames) % stride == 0
+            frames, columns = frames[probed], columns[probed]
+            prev_frames, next_frames = prev_frames[probed], next_frames[probed]
+        stale[frames, columns] = False
+        if frames.size:
+            point_error = np.zeros(frames.size, dtype=np.float32)
+            # Keys whose handles the probed frames depend on
+            bounding = np.zeros(keep.shape, dtype=bool)
+            bounding[prev_frames, columns] = True
+            bounding[next_frames, columns] = True
+            key_frames, key_columns = np.nonzero(bounding)
+            for enabled, data_path, track, default_fit in (
+                    (KEYFRAME_LOCATION, "location", locations, 'BEZIER'),
+                    (KEYFRAME_SCALE, "scale", scales, 'BEZIER'),
+                    (KEYFRAME_ROTATION, "rotation_quaternion", rotations, 'LINEAR')):
+                if not enabled:
+                    continue
+                fit = interpolation.get(data_path, default_fit)
+                slopes = _key_slopes(track, key_frames, key_columns, prev_key, next_key) if fit == 'BEZIER' else None
+                fitted = _interpolate_points(track, frames, columns, prev_frames, next_frames, fit, slopes)
+                sampled = track.reshape(-1, track.shape[2])[frames * num_objects + columns]
+                if data_path == "location":
+                    deviation = np.linalg.norm(fitted - sampled, axis=1) / location_tolerance
+                elif data_path == "scale":
+                    deviation = np.abs(fitted - sampled).max(axis=1) / location_tolerance
+                else:
+                    fitted /= np.maximum(np.linalg.norm(fitted, axis=1, keepdims=True), 1e-8)
+                    dots = np.clip(np.abs(np.sum(fitted * sampled, axis=1)), 0.0, 1.0)
+                    deviation = 2.0 * np.arccos(dots) / rotation_tolerance
+                np.maximum(point_error, deviation, out=point_error)
+            error[frames, columns] = point_error
+        error[keep] = 0.0
+
+        frames_out, columns_out = np.nonzero(error > 1.0)
+        if frames_out.size == 0:
+            if not stale.any():
+                break
+            exhaustive = True
+            continue
+        exhaustive = False
+
+        # Worst offending frame of every (object, segment) pair
+        segment = columns_out * num_frames + prev_key[frames_out, columns_out]
+        order = np.lexsort((-error[frames_out, columns_out], segment))
+        first = np.ones(order.size, dtype=bool)
+        first[1:] = segment[order][1:] != segment[order][:-1]
+        new_frames, new_columns = frames_out[order[first]], columns_out[order[first]]
+        keep[new_frames, new_columns] = True
+
+        # A new key changes its segment and, through the auto handles of the keys on both
+        # sides, the segments next to it: from the key before the previous one to the one after the next
+        prev_frames = prev_key[new_frames, new_columns]
+        next_frames = next_key[new_frames, new_columns]
+        first_stale = prev_key[np.maximum(prev_frames - 1, 0), new_columns]
+        last_stale = next_key[np.minimum(next_frames + 1, num_frames - 1), new_columns]
+        bounds = np.zeros((num_frames + 1, num_objects), dtype=np.int32)
+        np.add.at(bounds, (first_stale, new_columns), 1)
+        np.add.at(bounds, (last_stale + 1, new_columns), -1)
+        stale |= np.cumsum(bounds[:-1], axis=0) > 0
+
+    return keep
+
+def get_key_reduction(scene):
+    """Tolerances for adaptive key reduction, or None when baking on the fixed bake-step"""
+    if scene.cake_key_reduction != 'ADAPTIVE':
+        return None
+    return {
+        "location_tolerance": scene.cake_reduction_location_tolerance,
+        "rotation_tolerance": scene.cake_reduction_rotation_tolerance,
+    }
+
+# Objects converted to tracks at a time without a memory budget
+WRITE_CHUNK_OBJECTS = 2048
+# Objects keyed between two progress updates, also the smallest chunk a memory budget can force
+PROGRESS_CHUNK_OBJECTS = 128
+# Peak bytes of transform and key reduction arrays per object and sampled frame
+TRANSFORM_BYTES_PER_OBJECT_FRAME = 256
+
+def get_memory_budget(scene):
+    """Memory budget of the bake in bytes, None when unlimited"""
+    return scene.cake_memory_budget_mb * 1024 * 1024 if scene.cake_memory_budget_mb else None
+
+def write_chunk_objects(num_frames, memory_budget=None):
+    """Objects turned into tracks at once, so the chunk's arrays fit in half the memory budget"""
+    if not memory_budget:
+        return WRITE_CHUNK_OBJECTS
+    fitting = memory_budget // 2 // max(1, num_frames * TRANSFORM_BYTES_PER_OBJECT_FRAME)
+    return max(PROGRESS_CHUNK_OBJECTS, fitting)
+
+def iter_keyframe_objects_from_samples(samples, objects, keyframe_offset=0, interpolation=None, reduction=None, first_index=0, memory_budget=None):
+    """
+    Keys objects from samples, objects[i] following particle first_index + i.
+    Particles are converted in index ranges sized by write_chunk_objects.
+    Yields after every PROGRESS_CHUNK_OBJECTS objects.
+    """
+    key_frames = samples.frames.astype(np.float32) + keyframe_offset
+    chunk_size = write_chunk_objects(len(samples.frames), memory_budget)
+    run_stats.memory["write chunk estimate"] = round(
+        min(chunk_size, len(objects)) * len(samples.frames) * TRANSFORM_BYTES_PER_OBJECT_FRAME / (1024 * 1024), 1)
+    for first in range(0, len(objects), chunk_size):
+        chunk = objects[first:first + chunk_size]
+        with run_stats.phase("transforms"):
+            locations, rotations, scales = samples_to_transforms(samples, chunk, first_index + first)
+        keep = None
+        if reduction:
+            with run_stats.phase("key reduction"):
+                keep = adaptive_key_mask(locations, rotations, scales, interpolation=interpolation, **reduction)
+        for part_start in range(0, len(chunk), PROGRESS_CHUNK_OBJECTS):
+            part = slice(part_start, part_start + PROGRESS_CHUNK_OBJECTS)
+            with run_stats.phase("write keys"):
+                keyframe_objects_bulk(chunk[part], key_frames, locations[:, part], rotations[:, part], scales[:, part],
+                                      interpolation, keep[:, part] if keep is not None else None)
+            if keep is not None:
+                with run_stats.phase("key check"):
+                    restore_reduced_keys(chunk[part], key_frames, locations[:, part], rotations[:, part], scales[:, part],
+                                         keep[:, part], interpolation=interpolation, **reduction)
+            yield "Writing", first + min(part_start + PROGRESS_CHUNK_OBJECTS, len(chunk)), len(objects)
+
+def keyframe_objects_from_samples(samples, objects, keyframe_offset=0, interpolation=None, reduction=None, memory_budget=None):
+    run_steps(iter_keyframe_objects_from_samples(samples, objects, keyframe_offset, interpolation, reduction,
+                                                 memory_budget=memory_budget))
+
+# Seconds between two checks on the worker processes of a parallel bake
+WORKER_POLL_SECONDS = 0.05
+
+def _worker_command(spec_path):
+    return [bpy.app.binary_path, "-b", "--factory-startup",
+            "--python", os.path.abspath(__file__), "--", "--worker", spec_path]
+
+def _write_worker_progress(path, done):
+    """Objects a worker has keyed so far, replaced atomically so the parent never reads half a file"""
+    with open(path + ".tmp", "w") as progress_file:
+        progress_file.write(str(done))
+    os.replace(path + ".tmp", path)
+
+def _read_worker_progress(path):
+    try:
+        with open(path) as progress_file:
+            return int(progress_file.read())
+    except (OSError, ValueError):
+        return 0
+
+def _worker_error(work_dir, worker_index, process):
+    with open(os.path.join(work_dir, f"worker_{worker_index}.log")) as log:
+        log_tail = log.read()[-2000:]
+    return RuntimeError(f"Bake worker {worker_index} failed (exit code {process.returncode}):\n{log_tail}")
+
+def iter_parallel_keyframe_objects(samples, objects, workers, keyframe_offset=0, interpolation=None, reduction=None, memory_budget=None):
+    """
+    iter_keyframe_objects_from_samples split over background Blender processes. Every worker
+    keys its slice of particle indices from the samples on disk and writes the resulting actions
+    to a library .blend, which are then appended here and assigned to their objects.
+    The workers share memory_budget evenly.
+    """
+    work_dir = tempfile.mkdtemp(prefix="cake_workers_")
+    processes = []
+    try:
+        storage_dir = samples.storage_dir or samples.save(os.path.join(work_dir, "samples"))
+        edit_prefs = bpy.context.preferences.edit
+        slice_size = -(-len(objects) // workers)
+        for worker_index, first in enumerate(range(0, len(objects), slice_size)):
+            names = [obj.name for obj in objects[first:first + slice_size]]
+            spec = {
+                "samples": storage_dir,
+                "first_index": first,
+                "names": names,
+                "keyframe_offset": keyframe_offset,
+                "interpolation": interpolation or {},
+                "reduction": reduction,
+                "memory_budget": memory_budget // workers if memory_budget else None,
+                "new_interpolation": edit_prefs.keyframe_new_interpolation_type,
+                "new_handle_type": edit_prefs.keyframe_new_handle_type,
+                "output": os.path.join(work_dir, f"worker_{worker_index}.blend"),
+                "progress": os.path.join(work_dir, f"worker_{worker_index}.progress"),
+            }
+            spec_path = os.path.join(work_dir, f"worker_{worker_index}.json")
+            with open(spec_path, "w") as spec_file:
+                json.dump(spec, spec_file)
+            log = open(os.path.join(work_dir, f"worker_{worker_index}.log"), "w")
+            process = subprocess.Popen(_worker_command(spec_path), stdout=log, stderr=subprocess.STDOUT)
+            log.close()
+            processes.append((process, spec))
+        run_stats.count("worker processes", len(processes))
+
+        # Stops on the first worker that fails instead of waiting for the others
+        with run_stats.phase("workers"):
+            running = True
+            while running:
+                running = False
+                done = 0
+                for worker_index, (process, spec) in enumerate(processes):
+                    if process.poll() is None:
+                        running = True
+                        done += _read_worker_progress(spec["progress"])
+                    elif process.returncode != 0 or not os.path.isfile(spec["output"]):
+                        raise _worker_error(work_dir, worker_index, process)
+                    else:
+                        done += len(spec["names"])
+                yield "Writing", done, len(objects)
+                if running:
+                    time.sleep(WORKER_POLL_SECONDS)
+
+        with run_stats.phase("append actions"):
+            replaced_actions = set()
+            for process, spec in processes:
+                with open(spec["output"] + ".json") as names_file:
+                    action_names = json.load(names_file)
+                with bpy.data.libraries.load(spec["output"], link=False) as (data_from, data_to):
+                    data_to.actions = action_names
+                first = spec["first_index"]
+                for obj, action in zip(objects[first:first + len(spec["names"])], data_to.actions):
+                    if obj.animation_data is None:
+                        obj.animation_data_create()
+                    elif obj.animation_data.action:
+                        replaced_actions.add(obj.animation_data.action)
+                    obj.animation_data.action = action
+                    action.use_fake_user = False
+            orphans = [action for action in replaced_actions if action.users == 0]
+            if RollbackPoint.active:
+                orphans = RollbackPoint.active.hold_actions(orphans)
+            if orphans:
+                bpy.data.batch_remove(orphans)
+            for obj in objects:
+                obj.animation_data.action.name = f"{obj.name}Action"
+
+        chunk_size = write_chunk_objects(len(samples.frames), memory_budget)
+        for first in range(0, len(objects), chunk_size):
+            chunk = objects[first:first + chunk_size]
+            update_particle_objects(chunk, *particle_presence(samples, len(chunk), first))
+    finally:
+        for process, _ in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def run_bake_worker(spec):
+    """Worker side of iter_parallel_keyframe_objects, run in a background Blender"""
+    edit_prefs = bpy.context.preferences.edit
+    edit_prefs.keyframe_new_interpolation_type = spec["new_interpolation"]
+    edit_prefs.keyframe_new_handle_type = spec["new_handle_type"]
+    samples = ParticleSamples.load(spec["samples"])
+    # Data-less stand-ins named like the real objects, only their actions leave this process
+    holders = [bpy.data.objects.new(name, None) for name in spec["names"]]
+    steps = iter_keyframe_objects_from_samples(samples, holders, spec["keyframe_offset"], spec["interpolation"],
+                                               spec["reduction"], spec["first_index"], spec.get("memory_budget"))
+    last_written = time.perf_counter()
+    for _, done, _ in steps:
+        if time.perf_counter() - last_written >= WORKER_POLL_SECONDS:
+            _write_worker_progress(spec["progress"], done)
+            last_written = time.perf_counter()
+    actions = [holder.animation_data.action for holder in holders]
+    bpy.data.libraries.write(spec["output"], set(actions), fake_user=True)
+    with open(spec["output"] + ".json", "w") as names_file:
+        json.dump([action.name for action in actions], names_file)
+
+# Point cloud bakes look up points by a float index in Geometry Nodes, exact below 2**24
+POINT_CLOUD_MAX_POINTS = 2 ** 24
+POINT_CLOUD_MODIFIER_NAME = "CakeInstancer"
+
+def align_quaternion_signs(quaternions):
+    """
+    Flips (frames, particles, 4) quaternions onto the hemisphere of the previous frame's,
+    so mixing two neighbouring samples takes the short way round
+    """
+    dots = np.sum(quaternions[1:] * quaternions[:-1], axis=-1)
+    flips = np.concatenate((np.zeros((1,) + dots.shape[1:], dtype=np.int64),
+                            np.cumsum(dots < 0.0, axis=0)), axis=0)
+    return np.where((flips % 2 == 1)[..., np.newaxis], -quaternions, quaternions).astype(np.float32)
 
-            piece_center_w = piece_obj.matrix_world.translation
-            pc_vec = (piece_center_w - source_obj_center).normalized()
-            if pc_vec.length < 0.001: pc_vec = Vector((random.uniform(-1,1),random.uniform(-1,1),random.uniform(-1,1))).normalized()
+def _socket(sockets, name):
+    """First available socket called name, nodes like Sample Index keep one per data type"""
+    return next(socket for socket in sockets if socket.name == name and socket.enabled)
 
-            dot = p_vec.dot(pc_vec)
-            if dot > best_dot_for_this_slot:
-                best_dot_for_this_slot = dot
-                best_piece_for_this_particle = piece_obj
-        
-        if best_piece_for_this_particle:
-            result_pieces[p_slot_idx] = best_piece_for_this_particle
-            assigned_piece_objects.add(best_piece_for_this_particle)
+def build_point_cloud_instancer(name, source_objects):
+    """
+    Geometry Nodes group turning a point cloud bake back into instances of source_objects:
+    mixes the points of the samples before and after the current (sub)frame, particle i showing
+    source_objects[i % len(source_objects)] with the particle's rotation and size, and nothing
+    while it is dead or missing in the sample before.
+    """
+    node_group = bpy.data.node_groups.get(name) or bpy.data.node_groups.new(name, 'GeometryNodeTree')
+    node_group.nodes.clear()
+    node_group.interface.clear()
+    interface = node_group.interface
+    interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    interface.new_socket("Start Frame", in_out='INPUT', socket_type='NodeSocketFloat')
+    interface.new_socket("Frame Step", in_out='INPUT', socket_type='NodeSocketFloat')
+    interface.new_socket("Last Sample", in_out='INPUT', socket_type='NodeSocketInt')
+    interface.new_socket("Particles", in_out='INPUT', socket_type='NodeSocketInt')
+    interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+
+    nodes, links = node_group.nodes, node_group.links
+    group_input = nodes.new('NodeGroupInput')
+    group_output = nodes.new('NodeGroupOutput')
+
+    def math(operation, *inputs):
+        node = nodes.new('ShaderNodeMath')
+        node.operation = operation
+        for socket, value in zip(node.inputs, inputs):
+            if isinstance(value, bpy.types.NodeSocket):
+                links.new(value, socket)
+            else:
+                socket.default_value = value
+        return node.outputs[0]
+
+    # Fractional sample index of the current frame, held before the first and after the last one
+    scene_time = nodes.new('GeometryNodeInputSceneTime')
+    sample = math('DIVIDE', math('SUBTRACT', scene_time.outputs["Frame"], group_input.outputs["Start Frame"]),
+                  group_input.outputs["Frame Step"])
+    sample = math('MINIMUM', math('MAXIMUM', sample, 0.0), group_input.outputs["Last Sample"])
+    sample_before = math('FLOOR', sample)
+    sample_after = math('MINIMUM', math('ADD', sample_before, 1.0), group_input.outputs["Last Sample"])
+    factor = math('SUBTRACT', sample, sample_before)
+    index = nodes.new('GeometryNodeInputIndex').outputs["Index"]
+    point_before = math('MULTIPLY_ADD', sample_before, group_input.outputs["Particles"], index)
+    point_after = math('MULTIPLY_ADD', sample_after, group_input.outputs["Particles"], index)
+
+    def sampled(data_type, value, point_index=point_before):
+        node = nodes.new('GeometryNodeSampleIndex')
+        node.data_type = data_type
+        node.domain = 'POINT'
+        links.new(group_input.outputs["Geometry"], node.inputs["Geometry"])
+        links.new(value, _socket(node.inputs, "Value"))
+        links.new(point_index, node.inputs["Index"])
+        return _socket(node.outputs, "Value")
+
+    def mixed(data_type, value):
+        """value linearly mixed between the samples before and after the current frame"""
+        node = nodes.new('ShaderNodeMix')
+        node.data_type = 'VECTOR' if data_type == 'FLOAT_VECTOR' else data_type
+        links.new(factor, _socket(node.inputs, "Factor"))
+        links.new(sampled(data_type, value), _socket(node.inputs, "A"))
+        links.new(sampled(data_type, value, point_after), _socket(node.inputs, "B"))
+        return _socket(node.outputs, "Result")
+
+    def attribute(data_type, attribute_name):
+        node = nodes.new('GeometryNodeInputNamedAttribute')
+        node.data_type = data_type
+        node.inputs["Name"].default_value = attribute_name
+        return _socket(node.outputs, "Attribute")
+
+    points = nodes.new('GeometryNodePoints')
+    links.new(group_input.outputs["Particles"], points.inputs["Count"])
+    links.new(mixed('FLOAT_VECTOR', nodes.new('GeometryNodeInputPosition').outputs["Position"]),
+              points.inputs["Position"])
+
+    # Normalized lerp of the two quaternions, their signs are aligned by the bake
+    rotation = nodes.new('FunctionNodeQuaternionToRotation')
+    rotation_xyz = nodes.new('ShaderNodeSeparateXYZ')
+    links.new(mixed('FLOAT_VECTOR', attribute('FLOAT_VECTOR', "cake_rotation_xyz")), rotation_xyz.inputs["Vector"])
+    links.new(mixed('FLOAT', attribute('FLOAT', "cake_rotation_w")), rotation.inputs["W"])
+    for axis in "XYZ":
+        links.new(rotation_xyz.outputs[axis], rotation.inputs[axis])
+
+    instances = nodes.new('GeometryNodeGeometryToInstance')
+    for source in source_objects:
+        object_info = nodes.new('GeometryNodeObjectInfo')
+        object_info.transform_space = 'ORIGINAL'
+        object_info.inputs["Object"].default_value = source
+        links.new(object_info.outputs["Geometry"], instances.inputs["Geometry"])
+
+    instance_on_points = nodes.new('GeometryNodeInstanceOnPoints')
+    links.new(points.outputs["Points"], instance_on_points.inputs["Points"])
+    links.new(sampled('BOOLEAN', attribute('BOOLEAN', "cake_visible")), instance_on_points.inputs["Selection"])
+    links.new(instances.outputs["Instances"], instance_on_points.inputs["Instance"])
+    instance_on_points.inputs["Pick Instance"].default_value = True
+    links.new(index, instance_on_points.inputs["Instance Index"])
+    links.new(rotation.outputs["Rotation"], instance_on_points.inputs["Rotation"])
+    links.new(mixed('FLOAT', attribute('FLOAT', "cake_scale")), instance_on_points.inputs["Scale"])
+    links.new(instance_on_points.outputs["Instances"], group_output.inputs["Geometry"])
+
+    for column, node in enumerate(nodes):
+        node.location = (column * 200, 0)
+    return node_group
+
+def bake_point_cloud(samples, source_objects, collection_name, frame_step=1):
+    """
+    Bakes samples into a single mesh object in the collection instead of one object per particle.
+    Its points hold every sampled frame in turn (frame after frame, particle after particle) with
+    cake_rotation_xyz/cake_rotation_w (quaternion), cake_scale and cake_visible attributes, a
+    Geometry Nodes modifier instances source_objects on them. Frames between samples (frame_step > 1,
+    subframes) mix the two samples around them, like interpolated keys would.
+    """
+    if not source_objects:
+        raise ValueError("No source objects selected as particle instances.")
+    num_frames, particle_count = len(samples.frames), samples.particle_count
+    if num_frames * particle_count > POINT_CLOUD_MAX_POINTS:
+        raise ValueError(f"{num_frames} frames x {particle_count} particles is too many points for a point cloud "
+                         f"bake (max {POINT_CLOUD_MAX_POINTS}), increase the frame step or bake objects.")
+
+    collection = create_or_clear_collection(collection_name)
+    collection.color_tag = f'COLOR_0{random.randint(1, 8)}'
+    with run_stats.phase("point cloud"):
+        visible = np.asarray(samples.exists) & np.asarray(samples.alive)
+        identity = np.zeros((particle_count, 4), dtype=np.float32)
+        identity[:, 0] = 1.0
+        locations = _forward_fill(np.asarray(samples.location), np.asarray(samples.exists),
+                                  np.zeros((particle_count, 3), dtype=np.float32))
+        rotations = align_quaternion_signs(_forward_fill(np.asarray(samples.rotation), np.asarray(samples.exists),
+                                                         identity))
+        # Hidden samples keep the last visible size, a dying particle doesn't shrink towards its next sample
+        scales = _forward_fill(np.asarray(samples.size)[..., np.newaxis], visible,
+                               np.zeros((particle_count, 1), dtype=np.float32))[..., 0]
+
+        mesh = bpy.data.meshes.new(f"{collection_name}_points")
+        mesh.vertices.add(num_frames * particle_count)
+        mesh.vertices.foreach_set("co", locations.ravel())
+        mesh.attributes.new("cake_rotation_xyz", 'FLOAT_VECTOR', 'POINT').data.foreach_set(
+            "vector", np.ascontiguousarray(rotations[..., 1:]).ravel())
+        mesh.attributes.new("cake_rotation_w", 'FLOAT', 'POINT').data.foreach_set(
+            "value", np.ascontiguousarray(rotations[..., 0]).ravel())
+        mesh.attributes.new("cake_scale", 'FLOAT', 'POINT').data.foreach_set("value", scales.ravel())
+        mesh.attributes.new("cake_visible", 'BOOLEAN', 'POINT').data.foreach_set("value", visible.ravel())
+        mesh.update()
+
+        obj = bpy.data.objects.new(f"{collection_name}_points", mesh)
+        collection.objects.link(obj)
+        modifier = obj.modifiers.new(POINT_CLOUD_MODIFIER_NAME, 'NODES')
+        modifier.node_group = build_point_cloud_instancer(f"{collection_name}_Instancer", source_objects)
+        group_inputs = {item.name: item.identifier for item in modifier.node_group.interface.items_tree
+                        if item.item_type == 'SOCKET' and item.in_out == 'INPUT'}
+        modifier[group_inputs["Start Frame"]] = float(samples.frames[0]) if num_frames else 0.0
+        modifier[group_inputs["Frame Step"]] = float(frame_step)
+        modifier[group_inputs["Last Sample"]] = max(0, num_frames - 1)
+        modifier[group_inputs["Particles"]] = particle_count
+    run_stats.count("points written", num_frames * particle_count)
+    return obj
+
+def iter_match_keyframe_objects(particle_system, objects, start_frame, end_frame, step=1, keyframe_offset=0, interpolation=None, reduction=None):
+    """
+    Samples particle_system and keys objects[i] to particle i with the scene's bake settings.
+    Generator yielding (phase, done, total), returns the samples.
+    """
+    scene = bpy.context.scene
+    if interpolation is None:
+        interpolation = get_channel_interpolation(scene)
+    if reduction is None:
+        reduction = get_key_reduction(scene)
+    memory_budget = get_memory_budget(scene)
+    all_samples = yield from iter_gather_particle_samples([particle_system], start_frame, end_frame, step,
+                                                          scene.cake_use_sample_cache, scene.cake_read_point_cache,
+                                                          scene.cake_isolated_evaluation, memory_budget)
+    yield from iter_keyframe_objects_from_samples(all_samples[0], objects, keyframe_offset, interpolation, reduction,
+                                                  memory_budget=memory_budget)
+    return all_samples[0]
+
+def match_keyframe_objects(particle_system, objects, start_frame, end_frame, step=1, keyframe_offset=0, interpolation=None, reduction=None, window_manager=None):
+    return run_steps(iter_match_keyframe_objects(particle_system, objects, start_frame, end_frame, step,
+                                                 keyframe_offset, interpolation, reduction), window_manager)
+
+def bake_jobs(emitters, collection_name):
+    """(emitter, evaluated particle system) pairs of a bake, and the collection each one is baked into"""
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    jobs = []
+    for emitter in emitters:
+        evaluated_object = depsgraph.objects[emitter.name]
+        for particle_sys in evaluated_object.particle_systems:
+            jobs.append((emitter, particle_sys))
+    collection_names = [output_collection_name(collection_name, emitter, particle_sys,
+                                               len(emitters) > 1, len(jobs) > 1)
+                        for emitter, particle_sys in jobs]
+    return jobs, collection_names
+
+def iter_bake_particles(emitters, source_objects, collection_name, start_frame, end_frame, step=1, rebake_window=None):
+    """
+    Bakes every particle system of emitters into its own collection (see output_collection_name),
+    with interpolation, key reduction, caches and isolation taken from the scene settings.
+    rebake_window=(start, end) only replaces that frame window when every target collection exists.
+    Samples and write chunks are kept within scene.cake_memory_budget_mb when it is set.
+    With scene.cake_bake_output 'POINT_CLOUD' every system becomes one instancer object (bake_point_cloud)
+    and a re-bake window is ignored.
+    Generator yielding (phase, done, total), returns (collection names, whether a window was re-baked).
+    Raises ValueError for input the bake can't work with.
+    """
+    scene = bpy.context.scene
+    memory_budget = get_memory_budget(scene)
+    jobs, collection_names = bake_jobs(emitters, collection_name)
+    if not jobs:
+        raise ValueError("No particle systems found on the emitter.")
+    particle_systems = [particle_sys for _, particle_sys in jobs]
+    interpolation = get_channel_interpolation(scene)
+    reduction = get_key_reduction(scene)
+
+    existing_collections = [bpy.data.collections.get(name) for name in collection_names]
+    point_cloud = scene.cake_bake_output == 'POINT_CLOUD'
+    if rebake_window and not point_cloud and all(existing_collections):
+        window_start, window_end = rebake_window
+        if window_end < window_start:
+            raise ValueError("Re-bake window end must not be before its start.")
+        all_samples = yield from iter_gather_particle_samples(
+            particle_systems, window_start, window_end, step,
+            scene.cake_use_sample_cache, scene.cake_read_point_cache, scene.cake_isolated_evaluation, memory_budget)
+        run_stats.inputs.update(particles=sum(samples.particle_count for samples in all_samples),
+                                frames=len(all_samples[0].frames), step=step, systems=len(jobs),
+                                window=[window_start, window_end])
+        for job_index, (samples, collection) in enumerate(zip(all_samples, existing_collections)):
+            yield "Writing", job_index, len(jobs)
+            rebake_particle_window(samples, source_objects, collection, window_start, window_end)
+        return collection_names, True
 
-    actual_pieces_to_animate = [p for p in result_pieces if p is not None]
-    
-    if len(actual_pieces_to_animate) < len(result_pieces):
-        remaining_pieces = [p for p in all_pieces if p not in assigned_piece_objects]
-        fill_idx = 0
-        for i in range(len(result_pieces)):
-            if result_pieces[i] is None and fill_idx < len(remaining_pieces):
-                result_pieces[i] = remaining_pieces[fill_idx]
-                assigned_piece_objects.add(remaining_pieces[fill_idx])
-                fill_idx += 1
-        actual_pieces_to_animate = [p for p in result_pieces if p is not None]
+    if not source_objects:
+        raise ValueError("No source objects selected as particle instances.")
+
+    all_samples = yield from iter_gather_particle_samples(
+        particle_systems, start_frame, end_frame, step,
+        scene.cake_use_sample_cache, scene.cake_read_point_cache, scene.cake_isolated_evaluation, memory_budget)
+    total_objects = sum(samples.particle_count for samples in all_samples)
+    run_stats.inputs.update(particles=total_objects, frames=len(all_samples[0].frames), step=step, systems=len(jobs))
+    written = 0
+    yield "Writing", written, total_objects
+    if point_cloud:
+        for samples, name in zip(all_samples, collection_names):
+            bake_point_cloud(samples, source_objects, name, step)
+            written += samples.particle_count
+            yield "Writing", written, total_objects
+        return collection_names, False
+    for particle_sys, samples, name in zip(particle_systems, all_samples, collection_names):
+        particle_objects = create_particle_objects(particle_sys, source_objects, name, samples.particle_count)
+        if scene.cake_bake_workers > 1 and len(particle_objects) > 1:
+            write_steps = iter_parallel_keyframe_objects(samples, particle_objects, scene.cake_bake_workers,
+                                                         0, interpolation, reduction, memory_budget)
+        else:
+            write_steps = iter_keyframe_objects_from_samples(samples, particle_objects, 0, interpolation, reduction,
+                                                             memory_budget=memory_budget)
+        for _, done, _ in write_steps:
+            yield "Writing", written + done, total_objects
+        written += len(particle_objects)
+    return collection_names, False
+
+# Face attribute holding the piece a face was fractured into
+FRACTURE_PIECE_LAYER = "cake_piece"
+# Cutting passes of the Voronoi fracture, a face touching several cells needs one per border
+VORONOI_MAX_PASSES = 16
+
+# attribute data_type -> (foreach property, values per element, dtype)
+ATTRIBUTE_ARRAY_LAYOUTS = {
+    'FLOAT': ("value", 1, np.float32),
+    'INT': ("value", 1, np.int32),
+    'INT8': ("value", 1, np.int32),
+    'BOOLEAN': ("value", 1, bool),
+    'FLOAT2': ("vector", 2, np.float32),
+    'INT16_2D': ("value", 2, np.int32),
+    'INT32_2D': ("value", 2, np.int32),
+    'FLOAT_VECTOR': ("vector", 3, np.float32),
+    'FLOAT_COLOR': ("color", 4, np.float32),
+    'BYTE_COLOR': ("color", 4, np.float32),
+    'QUATERNION': ("value", 4, np.float32),
+}
+
+# Points compared to the seeds at a time in nearest_seeds, bounds the distance matrix
+NEAREST_CHUNK_POINTS = 4096
+
+def nearest_seeds(points, seeds):
+    """Index of the closest seed for every point, (n, 3) and (k, 3) arrays"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    seeds = np.asarray(seeds, dtype=np.float64)
+    seed_norms = (seeds * seeds).sum(axis=1)
+    nearest = np.empty(len(points), dtype=np.int64)
+    for first in range(0, len(points), NEAREST_CHUNK_POINTS):
+        chunk = points[first:first + NEAREST_CHUNK_POINTS]
+        # |p - s|^2 without the |p|^2 term, which is the same for every seed
+        nearest[first:first + len(chunk)] = np.argmin(seed_norms - 2.0 * chunk @ seeds.T, axis=1)
+    return nearest
+
+def random_surface_points(bm, count, rng):
+    """count points spread over the faces of bm by area, from a numpy Generator"""
+    triangles = np.array([[tuple(loop.vert.co) for loop in triangle] for triangle in bm.calc_loop_triangles()],
+                         dtype=np.float64).reshape(-1, 3, 3)
+    if not len(triangles):
+        return np.zeros((0, 3))
+    areas = np.linalg.norm(np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]), axis=1)
+    if areas.sum() <= 0.0:
+        areas = np.ones(len(triangles))
+    chosen = triangles[rng.choice(len(triangles), size=count, p=areas / areas.sum())]
+    u, v = rng.random(count), rng.random(count)
+    flip = u + v > 1.0
+    u[flip], v[flip] = 1.0 - u[flip], 1.0 - v[flip]
+    return (chosen[:, 0] + u[:, np.newaxis] * (chosen[:, 1] - chosen[:, 0])
+            + v[:, np.newaxis] * (chosen[:, 2] - chosen[:, 0]))
+
+def _read_array(collection, prop, count, width, dtype):
+    values = np.empty(count * width, dtype=dtype)
+    collection.foreach_get(prop, values)
+    return values.reshape(count, width) if width > 1 else values
+
+def split_mesh_by_face_labels(mesh, labels, name):
+    """
+    New meshes holding the faces of each label in sorted label order, with the vertices,
+    edges, seams, generic attributes (UV maps, colors, materials, ...) and materials they use.
+    Each mesh is centered on its bounding box. Vertex groups and shape keys need an object,
+    see write_vertex_weights and write_shape_keys.
+    Returns [(mesh, center in mesh space, indices of the mesh vertices it took)].
+    """
+    num_faces = len(mesh.polygons)
+    co = _read_array(mesh.vertices, "co", len(mesh.vertices), 3, np.float32)
+    edge_verts = _read_array(mesh.edges, "vertices", len(mesh.edges), 2, np.int32)
+    edge_seams = _read_array(mesh.edges, "use_seam", len(mesh.edges), 1, bool)
+    loop_verts = _read_array(mesh.loops, "vertex_index", len(mesh.loops), 1, np.int32)
+    loop_edges = _read_array(mesh.loops, "edge_index", len(mesh.loops), 1, np.int32)
+    loop_totals = _read_array(mesh.polygons, "loop_total", num_faces, 1, np.int32)
+    loop_faces = np.repeat(np.arange(num_faces), loop_totals)
+
+    domain_sizes = {'POINT': len(mesh.vertices), 'EDGE': len(mesh.edges), 'FACE': num_faces, 'CORNER': len(mesh.loops)}
+    attributes = []
+    for attribute in mesh.attributes:
+        layout = ATTRIBUTE_ARRAY_LAYOUTS.get(attribute.data_type)
+        if (attribute.name.startswith(".") or attribute.name in ("position", FRACTURE_PIECE_LAYER)
+                or layout is None or attribute.domain not in domain_sizes):
+            continue
+        prop, width, dtype = layout
+        values = _read_array(attribute.data, prop, domain_sizes[attribute.domain], width, dtype)
+        attributes.append((attribute.name, attribute.data_type, attribute.domain, prop, values))
+    active_uv = mesh.uv_layers.active.name if mesh.uv_layers.active else None
+
+    # Faces and their loops grouped by label, keeping the original order inside a group
+    labels = np.asarray(labels)
+    face_order = np.argsort(labels, kind='stable')
+    loop_order = np.argsort(labels[loop_faces], kind='stable')
+    piece_labels, face_counts = np.unique(labels, return_counts=True)
+    face_bounds = np.concatenate(([0], np.cumsum(face_counts)))
+    loop_bounds = np.concatenate(([0], np.cumsum(np.bincount(
+        np.searchsorted(piece_labels, labels), weights=loop_totals, minlength=len(piece_labels)).astype(np.int64))))
+
+    pieces = []
+    for piece_index in range(len(piece_labels)):
+        faces = face_order[face_bounds[piece_index]:face_bounds[piece_index + 1]]
+        loops = loop_order[loop_bounds[piece_index]:loop_bounds[piece_index + 1]]
+        verts = np.unique(loop_verts[loops])
+        edges = np.unique(loop_edges[loops])
+        piece_co = co[verts]
+        center = (piece_co.min(axis=0) + piece_co.max(axis=0)) / 2
+
+        piece_mesh = bpy.data.meshes.new(f"{name}.{piece_index:03d}")
+        piece_mesh.vertices.add(len(verts))
+        piece_mesh.vertices.foreach_set("co", (piece_co - center).ravel())
+        piece_mesh.edges.add(len(edges))
+        piece_mesh.edges.foreach_set("vertices", np.searchsorted(verts, edge_verts[edges]).astype(np.int32).ravel())
+        piece_mesh.edges.foreach_set("use_seam", edge_seams[edges])
+        piece_mesh.loops.add(len(loops))
+        piece_mesh.loops.foreach_set("vertex_index", np.searchsorted(verts, loop_verts[loops]).astype(np.int32))
+        piece_mesh.loops.foreach_set("edge_index", np.searchsorted(edges, loop_edges[loops]).astype(np.int32))
+        piece_mesh.polygons.add(len(faces))
+        loop_starts = np.concatenate(([0], np.cumsum(loop_totals[faces])[:-1])).astype(np.int32)
+        piece_mesh.polygons.foreach_set("loop_start", loop_starts)
+
+        domain_indices = {'POINT': verts, 'EDGE': edges, 'FACE': faces, 'CORNER': loops}
+        for attribute_name, data_type, domain, prop, values in attributes:
+            attribute = piece_mesh.attributes.get(attribute_name)
+            if attribute is None or attribute.data_type != data_type or attribute.domain != domain:
+                attribute = piece_mesh.attributes.new(attribute_name, data_type, domain)
+            attribute.data.foreach_set(prop, values[domain_indices[domain]].ravel())
+        if active_uv and active_uv in piece_mesh.uv_layers:
+            piece_mesh.uv_layers.active = piece_mesh.uv_layers[active_uv]
+        for material in mesh.materials:
+            piece_mesh.materials.append(material)
+        piece_mesh.update()
+        pieces.append((piece_mesh, Vector(center.tolist()), verts))
+    run_stats.count("piece meshes built", len(pieces))
+    return pieces
+
+def read_vertex_weights(mesh, num_groups):
+    """(vertices, groups) weights of a mesh's vertex groups, and the mask of the assigned ones"""
+    weights = np.zeros((len(mesh.vertices), num_groups), dtype=np.float32)
+    assigned = np.zeros(weights.shape, dtype=bool)
+    for vertex in mesh.vertices:
+        for element in vertex.groups:
+            weights[vertex.index, element.group] = element.weight
+            assigned[vertex.index, element.group] = True
+    return weights, assigned
+
+def write_vertex_weights(obj, group_names, weights, assigned):
+    """Creates group_names on obj and assigns its vertices the (vertices, groups) weights where assigned"""
+    for group_index, group_name in enumerate(group_names):
+        group = obj.vertex_groups.get(group_name) or obj.vertex_groups.new(name=group_name)
+        members = np.flatnonzero(assigned[:, group_index])
+        member_weights = weights[members, group_index]
+        # One add per distinct weight instead of one per vertex
+        for weight in np.unique(member_weights):
+            group.add(members[member_weights == weight].tolist(), float(weight), 'REPLACE')
+
+# Shape key settings carried over to fractured pieces, the slider range before the value it clamps
+SHAPE_KEY_SETTINGS = ("slider_min", "slider_max", "value", "mute", "interpolation", "vertex_group")
+
+def read_shape_keys(mesh):
+    """Every shape key of a mesh in order as (name, relative key name, settings, (vertices, 3) coordinates)"""
+    if not mesh.shape_keys:
+        return []
+    shape_keys = []
+    for key_block in mesh.shape_keys.key_blocks:
+        settings = {attr: getattr(key_block, attr) for attr in SHAPE_KEY_SETTINGS}
+        co = _read_array(key_block.data, "co", len(key_block.data), 3, np.float32)
+        shape_keys.append((key_block.name, key_block.relative_key.name, settings, co))
+    return shape_keys
+
+def write_shape_keys(obj, shape_keys, verts, offset, use_relative=True):
+    """Adds shape_keys (see read_shape_keys) to obj, keeping the verts rows moved by -offset"""
+    for name, _, settings, co in shape_keys:
+        key_block = obj.shape_key_add(name=name, from_mix=False)
+        key_block.data.foreach_set("co", (co[verts] - offset).ravel())
+        for attr, value in settings.items():
+            setattr(key_block, attr, value)
+    if shape_keys:
+        key_blocks = obj.data.shape_keys.key_blocks
+        for name, relative_name, _, _ in shape_keys:
+            key_blocks[name].relative_key = key_blocks[relative_name]
+        obj.data.shape_keys.use_relative = use_relative
+
+def _unit_directions(vectors):
+    """Rows of vectors normalized, rows too short to have a direction get a random one from the random module"""
+    vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+    lengths = np.linalg.norm(vectors, axis=1)
+    degenerate = lengths <= 0.001
+    directions = vectors / np.where(degenerate, 1.0, lengths)[:, np.newaxis]
+    for row in np.flatnonzero(degenerate):
+        directions[row] = Vector((random.uniform(-1,1),random.uniform(-1,1),random.uniform(-1,1))).normalized()
+    return directions
+
+def greedy_assignment(similarity):
+    """
+    Column of every row of a (rows, columns) similarity matrix, taking rows in order and giving each
+    the most similar column not taken yet (the first one on ties). -1 once the columns run out.
+    """
+    remaining = np.array(similarity, dtype=np.float64)
+    assignment = np.full(remaining.shape[0], -1, dtype=np.int64)
+    for row in range(min(remaining.shape)):
+        column = int(np.argmax(remaining[row]))
+        assignment[row] = column
+        remaining[:, column] = -np.inf
+    return assignment
+
+def optimal_assignment(cost):
+    """
+    Column of every row of a (rows, columns) cost matrix with the smallest total cost, -1 for rows
+    left over when there are fewer columns. Hungarian algorithm (shortest augmenting paths with
+    row/column potentials), each step vectorized over the columns.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    rows, columns = cost.shape
+    if rows > columns:
+        transposed = optimal_assignment(cost.T)
+        assignment = np.full(rows, -1, dtype=np.int64)
+        assignment[transposed] = np.arange(columns)
+        return assignment
+
+    # 1-based rows and columns, column 0 is the start of every augmenting path
+    u = np.zeros(rows + 1)
+    v = np.zeros(columns + 1)
+    row_of_column = np.zeros(columns + 1, dtype=np.int64)
+    way = np.zeros(columns + 1, dtype=np.int64)
+    # Row reduction, rows whose cheapest column is still free take it right away
+    u[1:] = cost.min(axis=1)
+    unmatched_rows = []
+    for row, column in enumerate(np.argmin(cost, axis=1).tolist(), start=1):
+        if row_of_column[column + 1]:
+            unmatched_rows.append(row)
+        else:
+            row_of_column[column + 1] = row
+
+    for row in unmatched_rows:
+        row_of_column[0] = row
+        column = 0
+        min_slack = np.full(columns + 1, np.inf)
+        used = np.zeros(columns + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current_row = row_of_column[column]
+            slack = cost[current_row - 1] - u[current_row] - v[1:]
+            improve = ~used[1:] & (slack < min_slack[1:])
+            min_slack[1:][improve] = slack[improve]
+            way[1:][improve] = column
+            candidates = np.where(used[1:], np.inf, min_slack[1:])
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+            used_columns = np.flatnonzero(used)
+            u[row_of_column[used_columns]] += delta
+            v[used_columns] -= delta
+            min_slack -= delta
+            column = next_column
+            if row_of_column[column] == 0:
+                break
+        while column:
+            previous = way[column]
+            row_of_column[column] = row_of_column[previous]
+            column = previous
+
+    assignment = np.full(rows, -1, dtype=np.int64)
+    matched = np.flatnonzero(row_of_column[1:])
+    assignment[row_of_column[1:][matched] - 1] = matched
+    return assignment
+
+def _rank_fractions(values):
+    """Rank of every value scaled to 0..1, ties broken by order"""
+    values = np.asarray(values)
+    ranks = np.argsort(np.argsort(values, kind='stable'), kind='stable')
+    return ranks / max(1, len(values) - 1)
+
+def get_directionally_matched_pieces(source_obj_center, all_pieces, particle_system_data, eval_frame, context, matching='GREEDY', size_weight=0.0):
+    """
+    Attempts to match pieces to particles based on direction.
+    Returns a list of pieces ordered to match particle animation tracks: particle i, in index order,
+    gets the free piece whose direction from source_obj_center is closest to its velocity (or to its
+    own direction from the center when it barely moves). Slots without a particle get the leftovers.
+    matching='OPTIMAL' maximizes the similarity of all pairs together instead (optimal_assignment).
+    size_weight blends in how well piece bounding box volume and particle size ranks agree.
+    """
+    if not all_pieces or not particle_system_data:
+        return []
 
+    scene = context.scene
+    original_frame = scene.frame_current
+    depsgraph = context.evaluated_depsgraph_get()
+    scene.frame_set(eval_frame)
+    try:
+        eval_emitter_obj = particle_system_data.id_data.evaluated_get(depsgraph)
+        eval_psys = None
+        if eval_emitter_obj:
+            eval_psys = eval_emitter_obj.particle_systems.get(particle_system_data.name)
+
+        if not eval_psys or not eval_psys.particles:
+            return all_pieces[:len(eval_psys.particles)] if eval_psys else all_pieces
+
+        particles = eval_psys.particles
+        total = len(particles)
+        if not _read_alive_states(particles, total).any():
+            return []
+
+        velocities = np.empty(total * 3, dtype=np.float32)
+        particles.foreach_get("velocity", velocities)
+        velocities = velocities.reshape(total, 3).astype(np.float64)
+        locations = np.empty(total * 3, dtype=np.float32)
+        particles.foreach_get("location", locations)
+        sizes = np.empty(total, dtype=np.float32)
+        particles.foreach_get("size", sizes)
+        center = np.array(tuple(source_obj_center), dtype=np.float64)
+    finally:
+        scene.frame_set(original_frame)
+
+    num_slots = min(len(all_pieces), particle_system_data.settings.count)
+    num_matched = min(num_slots, total)
+    moving = np.linalg.norm(velocities, axis=1) > 0.001
+    particle_directions = _unit_directions(np.where(moving[:, np.newaxis], velocities,
+                                                    locations.reshape(total, 3) - center)[:num_matched])
+    piece_centers = np.array([tuple(piece.matrix_world.translation) for piece in all_pieces], dtype=np.float64)
+    piece_directions = _unit_directions(piece_centers - center)
+
+    with run_stats.phase("similarity"):
+        similarity = particle_directions @ piece_directions.T
+        if size_weight > 0.0:
+            piece_volumes = np.array([np.prod(tuple(piece.dimensions)) for piece in all_pieces])
+            mismatch = np.abs(_rank_fractions(sizes[:num_matched])[:, np.newaxis]
+                              - _rank_fractions(piece_volumes)[np.newaxis, :])
+            # Same -1..1 range as the direction term
+            similarity = (1.0 - size_weight) * similarity + size_weight * (1.0 - 2.0 * mismatch)
+    with run_stats.phase("assignment"):
+        if matching == 'OPTIMAL':
+            assignment = optimal_assignment(-similarity)
+        else:
+            assignment = greedy_assignment(similarity)
 
-    bpy.context.scene.frame_set(context.scene.frame_current)
-    return actual_pieces_to_animate
+    matched_pieces = [all_pieces[column] for column in assignment]
+    taken = set(assignment.tolist())
+    leftovers = [piece for column, piece in enumerate(all_pieces) if column not in taken]
+    return matched_pieces + leftovers[:num_slots - num_matched]
 
 def keyframe_object(obj, frame):
+    run_stats.count("keys inserted", KEYFRAME_LOCATION * 3 + KEYFRAME_ROTATION * 4 + KEYFRAME_SCALE * 3)
     if KEYFRAME_LOCATION:
         obj.keyframe_insert("location", frame=frame)
     if KEYFRAME_ROTATION:
         obj.keyframe_insert("rotation_quaternion", frame=frame)
     if KEYFRAME_SCALE:
         obj.keyframe_insert("scale", frame=frame)
-    
-    # Ensure proper interpolation for rotations
-    if obj.animation_data and obj.animation_data.action:
+
+def get_channel_interpolation(scene):
+    """Interpolation per baked data path, as set in the CakeParticles panel"""
+    return {
+        "location": scene.cake_location_interpolation,
+        "rotation_quaternion": scene.cake_rotation_interpolation,
+        "scale": scene.cake_scale_interpolation,
+    }
+
+def apply_channel_interpolation(objects, interpolation):
+    """Sets the interpolation of every key in one pass per F-curve, once keyframing is done"""
+    for obj in objects:
+        if not (obj.animation_data and obj.animation_data.action):
+            continue
         for fcurve in obj.animation_data.action.fcurves:
-            if fcurve.data_path == "rotation_quaternion":
-                for keyf in fcurve.keyframe_points:
-                    keyf.interpolation = 'LINEAR'
+            mode = interpolation.get(fcurve.data_path)
+            if mode:
+                _foreach_set_enum(fcurve.keyframe_points, bpy.types.Keyframe, "interpolation", mode)
+
+def _enum_value(item_type, attr, identifier):
+    """Integer value Blender stores for an enum identifier, used for bulk foreach access"""
+    return item_type.bl_rna.properties[attr].enum_items[identifier].value
+
+def _foreach_get_enum(collection, item_type, attr):
+    """Integer values of an enum property for every item, with a per-item fallback"""
+    values = np.empty(len(collection), dtype=np.int32)
+    try:
+        collection.foreach_get(attr, values)
+    except (TypeError, RuntimeError):
+        enum_items = item_type.bl_rna.properties[attr].enum_items
+        values[:] = [enum_items[getattr(item, attr)].value for item in collection]
+    return values
+
+def _foreach_set_enum_values(collection, item_type, attr, values):
+    try:
+        collection.foreach_set(attr, np.ascontiguousarray(values, dtype=np.int32))
+    except (TypeError, RuntimeError):
+        identifiers = {item.value: item.identifier for item in item_type.bl_rna.properties[attr].enum_items}
+        for item, value in zip(collection, values):
+            setattr(item, attr, identifiers[int(value)])
+
+def _foreach_set_enum(collection, item_type, attr, identifier, start=0):
+    """Set an enum property on collection[start:] in one foreach pass, with a per-item fallback"""
+    count = len(collection)
+    if start >= count:
+        return
+    try:
+        values = np.empty(count, dtype=np.int32)
+        collection.foreach_get(attr, values)
+        values[start:] = _enum_value(item_type, attr, identifier)
+        collection.foreach_set(attr, values)
+    except (TypeError, RuntimeError):
+        for i in range(start, count):
+            setattr(collection[i], attr, identifier)
+
+# Keyframe attributes carried over when an F-curve's keys are rewritten in bulk
+KEYFRAME_FLOAT_ATTRS = (("co", 2), ("handle_left", 2), ("handle_right", 2), ("back", 1), ("amplitude", 1), ("period", 1))
+KEYFRAME_ENUM_ATTRS = ("interpolation", "handle_left_type", "handle_right_type", "easing", "type")
+KEYFRAME_BOOL_ATTRS = ("select_control_point", "select_left_handle", "select_right_handle")
+
+def read_keyframe_points(keyframe_points):
+    """Reads every key of an F-curve into a dict of (keys, ...) arrays"""
+    count = len(keyframe_points)
+    data = {}
+    for attr, width in KEYFRAME_FLOAT_ATTRS:
+        values = np.empty(count * width, dtype=np.float32)
+        keyframe_points.foreach_get(attr, values)
+        data[attr] = values.reshape(count, width) if width > 1 else values
+    for attr in KEYFRAME_ENUM_ATTRS:
+        data[attr] = _foreach_get_enum(keyframe_points, bpy.types.Keyframe, attr)
+    for attr in KEYFRAME_BOOL_ATTRS:
+        values = np.empty(count, dtype=bool)
+        keyframe_points.foreach_get(attr, values)
+        data[attr] = values
+    return data
+
+def write_keyframe_points(keyframe_points, data):
+    """Inverse of read_keyframe_points, keyframe_points must already hold the same number of keys"""
+    for attr, _ in KEYFRAME_FLOAT_ATTRS:
+        keyframe_points.foreach_set(attr, np.ascontiguousarray(data[attr], dtype=np.float32).ravel())
+    for attr in KEYFRAME_ENUM_ATTRS:
+        _foreach_set_enum_values(keyframe_points, bpy.types.Keyframe, attr, data[attr])
+    for attr in KEYFRAME_BOOL_ATTRS:
+        keyframe_points.foreach_set(attr, np.ascontiguousarray(data[attr], dtype=bool))
+
+def replace_keyframe_points(fcurve, data):
+    """Replaces every key of the F-curve with data as returned by read_keyframe_points"""
+    keyframe_points = fcurve.keyframe_points
+    count = len(data["co"])
+    if hasattr(keyframe_points, "clear"):
+        keyframe_points.clear()
+        if count:
+            keyframe_points.add(count)
+    else:
+        # Removing from the end never shifts the remaining keys
+        for _ in range(len(keyframe_points) - count):
+            keyframe_points.remove(keyframe_points[-1], fast=True)
+        if len(keyframe_points) < count:
+            keyframe_points.add(count - len(keyframe_points))
+    write_keyframe_points(keyframe_points, data)
+    fcurve.update()
+
+def rewrite_keyframe_points(fcurve, keep):
+    """
+    Drops the keys where keep is False by rewriting the F-curve in one pass,
+    instead of one O(n) keyframe_points.remove per key. Returns the number of removed keys.
+    """
+    keep = np.asarray(keep, dtype=bool)
+    removed = int(keep.size - np.count_nonzero(keep))
+    if removed == 0:
+        return 0
+    data = read_keyframe_points(fcurve.keyframe_points)
+    replace_keyframe_points(fcurve, {attr: values[keep] for attr, values in data.items()})
+    return removed
+
+def _ensure_object_action(obj):
+    if obj.animation_data is None:
+        obj.animation_data_create()
+    if obj.animation_data.action is None:
+        obj.animation_data.action = bpy.data.actions.new(name=f"{obj.name}Action")
+    return obj.animation_data.action
+
+def _ensure_fcurve(action, data_path, index):
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path, index=index, action_group="Object Transforms")
+    return fcurve
+
+def write_fcurve_keys(fcurve, frames, values, interpolation=None):
+    """
+    Appends len(frames) keys to the F-curve with a single keyframe_points.add and foreach_set,
+    then sorts and recalculates handles once. Keys get the same interpolation and handle type
+    keyframe_insert would give them, unless an interpolation is passed explicitly.
+    """
+    keyframe_points = fcurve.keyframe_points
+    existing = len(keyframe_points)
+    count = len(frames)
+    if count == 0:
+        return
+    keyframe_points.add(count)
+
+    co = np.empty(2 * (existing + count), dtype=np.float32)
+    keyframe_points.foreach_get("co", co)
+    co[2 * existing::2] = frames
+    co[2 * existing + 1::2] = values
+    keyframe_points.foreach_set("co", co)
+
+    # Same initial handles keyframe_insert uses, auto handles are recalculated by update()
+    handles = np.empty_like(co)
+    for handle_attr, frame_shift in (("handle_left", -1.0), ("handle_right", 1.0)):
+        keyframe_points.foreach_get(handle_attr, handles)
+        handles[2 * existing::2] = frames + frame_shift
+        handles[2 * existing + 1::2] = values
+        keyframe_points.foreach_set(handle_attr, handles)
+
+    edit_prefs = bpy.context.preferences.edit
+    _foreach_set_enum(keyframe_points, bpy.types.Keyframe, "interpolation",
+                      interpolation or edit_prefs.keyframe_new_interpolation_type, start=existing)
+    for handle_attr in ("handle_left_type", "handle_right_type"):
+        _foreach_set_enum(keyframe_points, bpy.types.Keyframe, handle_attr,
+                          edit_prefs.keyframe_new_handle_type, start=existing)
+    fcurve.update()
+
+def keyframe_objects_bulk(objects, frames, locations, rotations, scales, interpolation=None, keep=None):
+    """
+    Bulk counterpart of keyframe_object for a whole bake.
+    locations/scales are (frames, objects, 3) arrays and rotations (frames, objects, 4) quaternions.
+    interpolation maps data paths to 'LINEAR'/'BEZIER'/'CONSTANT', missing paths use the preferences.
+    keep is an optional (frames, objects) mask of the frames each object gets keys on.
+    """
+    interpolation = interpolation or {}
+    channels = []
+    if KEYFRAME_LOCATION:
+        channels.append(("location", locations))
+    if KEYFRAME_ROTATION:
+        channels.append(("rotation_quaternion", rotations))
+    if KEYFRAME_SCALE:
+        channels.append(("scale", scales))
+
+    frames = np.asarray(frames, dtype=np.float32)
+    curves_per_object = sum(values.shape[2] for _, values in channels)
+    for i, obj in enumerate(objects):
+        action = _ensure_object_action(obj)
+        frame_mask = keep[:, i] if keep is not None else slice(None)
+        for data_path, values in channels:
+            for axis in range(values.shape[2]):
+                fcurve = _ensure_fcurve(action, data_path, axis)
+                write_fcurve_keys(fcurve, frames[frame_mask], values[frame_mask, i, axis], interpolation.get(data_path))
+        key_count = np.count_nonzero(frame_mask) if keep is not None else len(frames)
+        run_stats.count("keys written", int(key_count) * curves_per_object)
+
+# Bisection steps when solving a Bezier segment for a frame
+BEZIER_SOLVE_STEPS = 40
+# Passes of putting keys back before a channel is keyed on every sampled frame
+KEY_CHECK_PASSES = 4
+
+def evaluate_keyframe_points(keyframe_points, frames):
+    """
+    Values of an F-curve at frames, computed in bulk from its keys and the handles Blender
+    calculated for them on update(). Returns None when a key uses an interpolation other than
+    CONSTANT, LINEAR or BEZIER, those curves are left to FCurve.evaluate.
+    """
+    count = len(keyframe_points)
+    frames = np.asarray(frames, dtype=np.float64)
+    points = {}
+    for attr in ("co", "handle_left", "handle_right"):
+        values = np.empty(2 * count, dtype=np.float32)
+        keyframe_points.foreach_get(attr, values)
+        points[attr] = values.reshape(count, 2).astype(np.float64)
+    interpolation = _foreach_get_enum(keyframe_points, bpy.types.Keyframe, "interpolation")
+    constant, linear, bezier = (_enum_value(bpy.types.Keyframe, "interpolation", identifier)
+                                for identifier in ('CONSTANT', 'LINEAR', 'BEZIER'))
+    if not np.isin(interpolation, (constant, linear, bezier)).all():
+        return None
+    co = points["co"]
+    if count == 1:
+        return np.full(frames.shape, co[0, 1])
+
+    segment = np.clip(np.searchsorted(co[:, 0], frames, side="right") - 1, 0, count - 2)
+    x0, y0 = co[segment].T
+    x3, y3 = co[segment + 1].T
+    x1, y1 = points["handle_right"][segment].T
+    x2, y2 = points["handle_left"][segment + 1].T
+
+    # Handles overlapping in time are shortened the way Blender corrects a Bezier segment
+    handle_span = np.abs(x1 - x0) + np.abs(x3 - x2)
+    fac = np.where(handle_span > x3 - x0, (x3 - x0) / np.maximum(handle_span, 1e-12), 1.0)
+    x1, y1 = x0 + (x1 - x0) * fac, y0 + (y1 - y0) * fac
+    x2, y2 = x3 - (x3 - x2) * fac, y3 - (y3 - y2) * fac
+
+    def cubic(p0, p1, p2, p3, t):
+        s = 1.0 - t
+        return s * s * s * p0 + 3.0 * s * s * t * p1 + 3.0 * s * t * t * p2 + t * t * t * p3
+
+    low, high = np.zeros_like(frames), np.ones_like(frames)
+    for _ in range(BEZIER_SOLVE_STEPS):
+        t = (low + high) * 0.5
+        before = cubic(x0, x1, x2, x3, t) < frames
+        low, high = np.where(before, t, low), np.where(before, high, t)
+    bezier_values = cubic(y0, y1, y2, y3, (low + high) * 0.5)
+    t = np.clip((frames - x0) / np.maximum(x3 - x0, 1e-12), 0.0, 1.0)
+    linear_values = y0 + t * (y3 - y0)
+
+    kind = interpolation[segment]
+    values = np.where(kind == bezier, bezier_values, np.where(kind == linear, linear_values, y0))
+    values = np.where(frames <= co[0, 0], co[0, 1], values)
+    return np.where(frames >= co[-1, 0], co[-1, 1], values)
+
+def _evaluate_fcurve(fcurve, frames):
+    values = evaluate_keyframe_points(fcurve.keyframe_points, frames)
+    if values is None:
+        values = np.array([fcurve.evaluate(frame) for frame in frames], dtype=np.float64)
+    return values
+
+def _channel_error(data_path, fitted, track):
+    """Per-frame deviation of a channel, measured the way adaptive_key_mask measures it"""
+    if data_path == "rotation_quaternion":
+        fitted = fitted / np.maximum(np.linalg.norm(fitted, axis=1, keepdims=True), 1e-8)
+        return 2.0 * np.arccos(np.clip(np.abs(np.sum(fitted * track, axis=1)), 0.0, 1.0))
+    if data_path == "location":
+        return np.linalg.norm(fitted - track, axis=1)
+    return np.abs(fitted - track).max(axis=1)
+
+def restore_reduced_keys(objects, frames, locations, rotations, scales, keep, location_tolerance, rotation_tolerance, interpolation=None):
+    """
+    Checks the frames adaptive_key_mask dropped against the written F-curves, since the handles
+    Blender computes on update() differ from the ones the mask was fitted with, and keys back
+    every frame still out of tolerance. A channel still off after KEY_CHECK_PASSES gets all of
+    its sampled frames keyed. Returns the number of keys put back.
+    """
+    interpolation = interpolation or {}
+    location_tolerance = max(location_tolerance, 1e-6)
+    rotation_tolerance = max(rotation_tolerance, 1e-6)
+    channels = []
+    if KEYFRAME_LOCATION:
+        channels.append(("location", locations, location_tolerance))
+    if KEYFRAME_ROTATION:
+        channels.append(("rotation_quaternion", rotations, rotation_tolerance))
+    if KEYFRAME_SCALE:
+        channels.append(("scale", scales, location_tolerance))
+
+    frames = np.asarray(frames, dtype=np.float32)
+    restored = 0
+    for i, obj in enumerate(objects):
+        action = obj.animation_data.action
+        for data_path, values, tolerance in channels:
+            fcurves = [action.fcurves.find(data_path, index=axis) for axis in range(values.shape[2])]
+            track = values[:, i]
+            dropped = ~keep[:, i]
+            for check in range(KEY_CHECK_PASSES + 1):
+                if not dropped.any():
+                    break
+                if check == KEY_CHECK_PASSES:
+                    off = dropped.copy()
+                else:
+                    fitted = np.stack([_evaluate_fcurve(fcurve, frames[dropped]) for fcurve in fcurves], axis=1)
+                    off = np.zeros_like(dropped)
+                    off[dropped] = _channel_error(data_path, fitted, track[dropped]) > tolerance
+                    if not off.any():
+                        break
+                for axis, fcurve in enumerate(fcurves):
+                    write_fcurve_keys(fcurve, frames[off], track[off, axis], interpolation.get(data_path))
+                dropped &= ~off
+                restored += int(np.count_nonzero(off)) * len(fcurves)
+    run_stats.count("keys restored", restored)
+    run_stats.count("keys written", restored)
+    return restored
+
+def reduce_fcurve_to_tolerance(fcurve, tolerance, locked):
+    """
+    Removes the keys of the F-curve that are not needed for the curve to stay within tolerance
+    of its original values, measured on the curve Blender actually evaluates (handles and
+    interpolation included) on every key and whole frame. locked keys (and both ends) are always
+    kept, every pass puts back the removed key nearest the worst frame of each out-of-tolerance
+    segment, Douglas-Peucker style. Returns the number of removed keys.
+    """
+    keyframe_points = fcurve.keyframe_points
+    count = len(keyframe_points)
+    keep = np.asarray(locked, dtype=bool).copy()
+    if count < 3:
+        return 0
+    keep[0] = keep[-1] = True
+    if keep.all():
+        return 0
+
+    original = read_keyframe_points(keyframe_points)
+    key_frames = original["co"][:, 0].astype(np.float64)
+    check_frames = np.union1d(key_frames, np.arange(np.ceil(key_frames[0]), key_frames[-1]))
+    reference = _evaluate_fcurve(fcurve, check_frames)
+
+    while True:
+        replace_keyframe_points(fcurve, {attr: values[keep] for attr, values in original.items()})
+        error = np.abs(_evaluate_fcurve(fcurve, check_frames) - reference)
+        out = np.flatnonzero(error > tolerance)
+        if out.size == 0 or keep.all():
+            return int(count - np.count_nonzero(keep))
+
+        # Worst frame of every segment between kept keys
+        kept_ids = np.flatnonzero(keep)
+        segment = np.clip(np.searchsorted(key_frames[kept_ids], check_frames[out], side="right") - 1,
+                          0, kept_ids.size - 2)
+        order = np.lexsort((-error[out], segment))
+        first = np.ones(order.size, dtype=bool)
+        first[1:] = segment[order][1:] != segment[order][:-1]
+        worst_frames = check_frames[out[order[first]]]
+        segment = segment[order[first]]
+
+        # Removed key nearest to it, inside its segment unless the segment has none
+        removed_ids = np.flatnonzero(~keep)
+        removed_frames = key_frames[removed_ids]
+        after = np.minimum(np.searchsorted(removed_frames, worst_frames), removed_ids.size - 1)
+        before = np.maximum(after - 1, 0)
+        nearer_before = np.abs(removed_frames[before] - worst_frames) < np.abs(removed_frames[after] - worst_frames)
+        nearest = removed_ids[np.where(nearer_before, before, after)]
+        low, high = kept_ids[segment] + 1, kept_ids[segment + 1] - 1
+        nearest = np.where(low <= high, np.clip(nearest, low, np.maximum(high, low)), nearest)
+        keep[nearest] = True
 
 def remove_inbetween(context, objs):
-    step = context.scene.step
-    
+    """
+    Simplifies the selected keys of every F-curve, either keeping every Nth selected key (STEP)
+    or only the keys needed to stay within a value tolerance (TOLERANCE). Returns removed key count.
+    """
+    scene = context.scene
+    step = scene.step
+    mode = scene.cake_simplify_mode
+    removed = 0
+
     for obj in objs:
         if obj.animation_data: 
-            action = obj.animation_data.action
+            action = get_playing_action(obj)
             
             if action:
                 for fcurve in action.fcurves:
-                    keyframe_points = [point for point in fcurve.keyframe_points if point.select_control_point]
-                    
-                    for i in range(len(keyframe_points) - 1, -1, -1):
-                        if i % step != 0:
-                            fcurve.keyframe_points.remove(keyframe_points[i])
+                    keyframe_points = fcurve.keyframe_points
+                    count = len(keyframe_points)
+                    if count == 0:
+                        continue
+                    selected = np.empty(count, dtype=bool)
+                    keyframe_points.foreach_get("select_control_point", selected)
+                    if not selected.any():
+                        continue
+
+                    if mode == 'TOLERANCE':
+                        removed += reduce_fcurve_to_tolerance(fcurve, scene.cake_simplify_tolerance, ~selected)
+                        continue
+                    selected_ids = np.flatnonzero(selected)
+                    keep = np.ones(count, dtype=bool)
+                    keep[selected_ids[np.arange(selected_ids.size) % step != 0]] = False
+                    removed += rewrite_keyframe_points(fcurve, keep)
+    return removed
+
+def scale_action_time(action, factor):
+    """
+    Scales every key and handle of the action in time around its first frame, the same pivot
+    an NLA strip scale uses, one foreach pass per F-curve
+    """
+    pivot = action.frame_range[0]
+    for fcurve in action.fcurves:
+        keyframe_points = fcurve.keyframe_points
+        coords = np.empty(len(keyframe_points) * 2, dtype=np.float32)
+        for attr in ("co", "handle_left", "handle_right"):
+            keyframe_points.foreach_get(attr, coords)
+            coords[0::2] = pivot + (coords[0::2] - pivot) * factor
+            keyframe_points.foreach_set(attr, coords)
+        fcurve.update()
+
+def get_time_scale_strip(obj):
+    """
+    NLA strip playing obj's action, used to time scale it without touching the keys.
+    The first call moves the active action into its own track, later calls reuse the strip.
+    """
+    anim_data = obj.animation_data
+    track = anim_data.nla_tracks.get(TIME_SCALE_TRACK_NAME)
+    if track and track.strips:
+        return track.strips[0]
+    action = anim_data.action
+    if action is None:
+        return None
+
+    track = anim_data.nla_tracks.new()
+    track.name = TIME_SCALE_TRACK_NAME
+    start = action.frame_range[0]
+    strip = track.strips.new(action.name, int(start), action)
+    # strips.new only takes whole frames, move the strip onto the action's actual start
+    if hasattr(strip, "frame_start_ui"):
+        strip.frame_start_ui = start
+    anim_data.action = None
+    return strip
 
 def main(context, source_objects):
     bake_step = context.scene.bake_step
@@ -340,7 +2668,47 @@ class CakeParticlesPanel(bpy.types.Panel):
         col = layout.column(align=True)
         col.prop(context.scene, "target_collection_name", text="Collection Name", icon='OUTLINER_COLLECTION')
         col.prop(context.scene, "bake_step", text="bake-step")
+        col.prop(context.scene, "cake_bake_selected_emitters", text="Bake Selected Emitters Too")
         col.operator('cake.bake_particles', text='Bake', icon='EXPERIMENTAL')
+
+        box_bake = layout.box()
+        row = box_bake.row()
+        row.prop(scene, "show_cake_bake_options",
+                icon='TRIA_DOWN' if scene.show_cake_bake_options else 'TRIA_RIGHT',
+                icon_only=True, emboss=False)
+        row.label(text="Bake Options")
+
+        if scene.show_cake_bake_options:
+            col_bake = box_bake.column(align=True)
+            col_bake.prop(scene, "cake_bake_output", text="Output")
+
+            col_bake.separator()
+            col_bake.label(text="Interpolation:")
+            col_bake.prop(scene, "cake_location_interpolation", text="Location")
+            col_bake.prop(scene, "cake_rotation_interpolation", text="Rotation")
+            col_bake.prop(scene, "cake_scale_interpolation", text="Scale")
+
+            col_bake.separator()
+            col_bake.prop(scene, "cake_key_reduction", text="Keys")
+            if scene.cake_key_reduction == 'ADAPTIVE':
+                col_bake.prop(scene, "cake_reduction_location_tolerance", text="Location Tolerance")
+                col_bake.prop(scene, "cake_reduction_rotation_tolerance", text="Rotation Tolerance")
+
+            col_bake.separator()
+            row_cache = col_bake.row(align=True)
+            row_cache.prop(scene, "cake_use_sample_cache", text="Sample Cache")
+            row_cache.operator(CAKE_OT_ClearSampleCache.bl_idname, text="", icon='TRASH')
+            col_bake.prop(scene, "cake_read_point_cache", text="Read Baked Point Cache")
+            col_bake.prop(scene, "cake_isolated_evaluation", text="Evaluate Emitter Only")
+            col_bake.prop(scene, "cake_bake_workers", text="Worker Processes")
+            col_bake.prop(scene, "cake_memory_budget_mb", text="Memory Budget (MB)")
+
+            col_bake.separator()
+            col_bake.prop(scene, "cake_rebake_window", text="Re-bake Frame Window Only")
+            if scene.cake_rebake_window:
+                row_window = col_bake.row(align=True)
+                row_window.prop(scene, "cake_rebake_frame_start", text="Start")
+                row_window.prop(scene, "cake_rebake_frame_end", text="End")
         
         box_explode = layout.box()
         row_explode_header = box_explode.row()
@@ -354,6 +2722,8 @@ class CakeParticlesPanel(bpy.types.Panel):
             col_explode_content = box_explode.column(align=True)
             col_explode_content.prop(scene, "cake_explosion_num_cuts")
             col_explode_content.prop(scene, "cake_explosion_split_mode", text="Split Mode")
+            col_explode_content.prop(scene, "cake_explosion_matching", text="Matching")
+            col_explode_content.prop(scene, "cake_explosion_size_weight", text="Size Matching", slider=True)
             col_explode_content.prop(scene, "cake_explosion_seed")
             col_explode_content.prop(scene, "target_collection_name", text="Output Collection")
             
@@ -370,6 +2740,39 @@ class CakeParticlesPanel(bpy.types.Panel):
             col_explode_content.operator(CAKE_OT_AdjustExplosionParticles.bl_idname, text="Set Explosion Settings", icon='MOD_PARTICLES')
             col_explode_content.operator(CAKE_OT_CakeExplosion.bl_idname, text="Explode 🍰💥", icon='MOD_EXPLODE')
         
+        box_stats = layout.box()
+        row = box_stats.row()
+        row.prop(scene, "show_cake_stats",
+                icon='TRIA_DOWN' if scene.show_cake_stats else 'TRIA_RIGHT',
+                icon_only=True, emboss=False)
+        row.label(text="Last Run Stats")
+
+        if scene.show_cake_stats:
+            col_stats = box_stats.column(align=True)
+            if run_stats.operation:
+                col_stats.label(text=f"{run_stats.operation}: {run_stats.total:.2f} s", icon='TIME')
+                for name, seconds in sorted(run_stats.phases.items(), key=lambda item: -item[1]):
+                    col_stats.label(text=f"{name}: {seconds:.2f} s")
+                for name, value in run_stats.counters.items():
+                    col_stats.label(text=f"{name}: {value}")
+                for name, megabytes in run_stats.memory.items():
+                    col_stats.label(text=f"{name}: {megabytes:.0f} MB", icon='MEMORY')
+            else:
+                col_stats.label(text="Nothing baked yet this session")
+            col_stats.separator()
+            col_stats.prop(scene, "cake_track_memory", text="Track Python Memory")
+            row_profile = col_stats.row(align=True)
+            row_profile.prop(scene, "cake_write_profile", text="cProfile")
+            sub = row_profile.row(align=True)
+            sub.active = scene.cake_write_profile
+            sub.prop(scene, "cake_profile_path", text="")
+            row_history = col_stats.row(align=True)
+            row_history.prop(scene, "cake_log_history", text="History")
+            sub = row_history.row(align=True)
+            sub.active = scene.cake_log_history
+            sub.prop(scene, "cake_history_path", text="")
+            col_stats.operator(CAKE_OT_CompareLastRuns.bl_idname, icon='SORTTIME')
+
         box = layout.box()
         row = box.row()
         row.prop(context.scene, "show_info", 
@@ -383,6 +2786,7 @@ class CakeParticlesPanel(bpy.types.Panel):
             col.label(text='Keep the emitter Active', icon='OBJECT_DATA')
             col.label(text='Keep the Objects to instance Selected', icon='POINTCLOUD_DATA')
             col.label(text='Adjust bake step to change keyframing interval, animation density', icon='ACTION')
+            col.label(text='Progress shows in the status bar, Esc cancels a running bake', icon='CANCEL')
         
         box = layout.box()
         row = box.row()
@@ -412,11 +2816,16 @@ class SimplifyAnimationPanel(bpy.types.Panel):
         
         # Main controls
         col = layout.column(align=True)
-        col.prop(context.scene, 'step', text='step size')
+        col.prop(context.scene, 'cake_simplify_mode', text='')
+        if context.scene.cake_simplify_mode == 'TOLERANCE':
+            col.prop(context.scene, 'cake_simplify_tolerance', text='tolerance')
+        else:
+            col.prop(context.scene, 'step', text='step size')
         col.operator("object.simplify_object_animation")
         
         col = layout.column(align=True)
         col.prop(context.scene, 'scale_range', text="Random Range")
+        col.prop(context.scene, 'cake_time_scale_mode', text='')
         col.operator('object.scale_keyframes', text='Randomize Times', icon='RNA')
         
         # Edit info panel
@@ -431,6 +2840,8 @@ class SimplifyAnimationPanel(bpy.types.Panel):
             col = box.column()
             col.label(text='Larger Step = Bigger Cut', icon='PARTICLEMODE')
             col.label(text='Only affects selected frames', icon='STICKY_UVS_LOC')
+            col.label(text='Tolerance mode keeps only the keys that shape the curve', icon='IPO_LINEAR')
+            col.label(text='NLA time scale is re-randomized from the original timing, range 0 resets it', icon='NLA')
             col.label(text="Hover or click over the timeline to refresh don't spam the button", icon='INFO')
 
 
@@ -438,12 +2849,163 @@ class SimplifyAnimationPanel(bpy.types.Panel):
 # Operators classes which control the executions
 # ------(❁´◡`❁)-------
 
-class CAKE_OT_CakeExplosion(bpy.types.Operator):
+class CakeModalRun:
+    """
+    Base of the operators running a step generator (see run_steps), which they return from
+    steps(context) with the operator result as its return value. Called from a script,
+    execute runs it to the end. Invoked from the UI it runs modal in MODAL_SLICE_SECONDS
+    slices with progress on the cursor and in the status bar, and Esc cancels. Nothing may
+    be modified before the run first reaches rollback_phase, a RollbackPoint taken there
+    puts the scene back on cancel or error.
+    """
+    run_label = ""
+    rollback_phase = ""
+
+    run_modal: bpy.props.BoolProperty(
+        default=False,
+        options={'HIDDEN', 'SKIP_SAVE'},
+        description="Run in the background of the UI with progress, Esc cancels"
+    )
+
+    def overwritten_objects(self, context):
+        """Existing objects the run may change or delete, saved by its RollbackPoint"""
+        return []
+
+    def report(self, type, message):
+        # Kept for callers that only see the operator result, like batch jobs
+        if type & {'WARNING', 'ERROR'}:
+            run_stats.messages.append(message)
+        return super().report(type, message)
+
+    def execute(self, context):
+        run_stats.reset(self.run_label, context.scene.cake_track_memory)
+        self._profiler = start_profiler(context.scene)
+        self._steps = self.steps(context)
+        self._rollback_point = None
+        self._start_frame = context.scene.frame_current
+        if self.run_modal and context.window:
+            return self.start_modal(context)
+        if self._profiler:
+            self._profiler.enable()
+        status = 'FAILED'
+        try:
+            while True:
+                self.next_step(context)
+        except StopIteration as finished:
+            result = finished.value
+            status = next(iter(result))
+            return result
+        except Exception as e:
+            self.report({'ERROR'}, f"Error during {self.run_label.lower()}: {str(e)}")
+            return {'CANCELLED'}
+        finally:
+            if self._profiler:
+                self._profiler.disable()
+            self.report_stats(context, status)
+            self.end_rollback(context, status)
+
+    def next_step(self, context):
+        phase, done, total = next(self._steps)
+        if phase == self.rollback_phase and not self._rollback_point:
+            # The scene is still untouched here
+            self._rollback_point = RollbackPoint(context, self.overwritten_objects(context))
+        return phase, done, total
+
+    def end_rollback(self, context, status):
+        """Keeps what a finished run did and puts the scene back after any other outcome"""
+        if status == 'FINISHED':
+            if self._rollback_point:
+                self._rollback_point.discard()
+                self._rollback_point = None
+        else:
+            self.rollback(context)
+
+    def report_stats(self, context, status):
+        run_stats.finish()
+        append_run_history(context.scene, status)
+        self.report({'INFO'}, run_stats.summary())
+        profile_path = dump_profiler(self._profiler, context.scene)
+        if profile_path:
+            self.report({'INFO'}, f"Profile written to {profile_path}")
+
+    def start_modal(self, context):
+        self._timer = context.window_manager.event_timer_add(MODAL_TIMER_SECONDS, window=context.window)
+        self._phase = None
+        self._phase_start = time.perf_counter()
+        context.window_manager.progress_begin(0, 100)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def end_modal(self, context, status):
+        context.window_manager.event_timer_remove(self._timer)
+        context.window_manager.progress_end()
+        context.workspace.status_text_set(None)
+        self.report_stats(context, status)
+        self.end_rollback(context, status)
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            return self.cancel_run(context)
+        if event.type != 'TIMER' or event.timer is not self._timer:
+            return {'PASS_THROUGH'}
+
+        # Work in slices so the UI keeps redrawing and Esc gets through between them
+        deadline = time.perf_counter() + MODAL_SLICE_SECONDS
+        if self._profiler:
+            self._profiler.enable()
+        try:
+            while time.perf_counter() < deadline:
+                phase, done, total = self.next_step(context)
+                if phase != self._phase:
+                    self._phase = phase
+                    self._phase_start = time.perf_counter()
+        except StopIteration as finished:
+            self.end_modal(context, next(iter(finished.value)))
+            return finished.value
+        except Exception as e:
+            self.end_modal(context, 'FAILED')
+            self.report({'ERROR'}, f"Error during {self.run_label.lower()}: {str(e)}")
+            return {'CANCELLED'}
+        finally:
+            if self._profiler:
+                self._profiler.disable()
+
+        self.show_progress(context, phase, done, total)
+        return {'RUNNING_MODAL'}
+
+    def show_progress(self, context, phase, done, total):
+        elapsed = time.perf_counter() - self._phase_start
+        text = f"Cake {self.run_label}: {phase} {done}/{total}"
+        if done and total:
+            context.window_manager.progress_update(100 * done / total)
+            text += f"  ETA {format_duration(elapsed / done * (total - done))}"
+        context.workspace.status_text_set(text + "  (Esc to cancel)")
+
+    def rollback(self, context):
+        if self._rollback_point:
+            self._rollback_point.restore(context)
+            self._rollback_point = None
+        else:
+            context.scene.frame_set(self._start_frame)
+
+    def cancel_run(self, context):
+        self._steps.close()
+        self.end_modal(context, 'CANCELLED')
+        self.report({'WARNING'}, f"{self.run_label} cancelled, the scene was left as it was before.")
+        return {'CANCELLED'}
+
+    def cancel(self, context):
+        self._steps.close()
+        self.end_modal(context, 'CANCELLED')
+
+class CAKE_OT_CakeExplosion(CakeModalRun, bpy.types.Operator):
     """Splits selected mesh into target pieces by creating temporary seams for each piece, 
        then animates them using its active particle system, with an initial state display."""
     bl_idname = "cake.cake_explosion"
     bl_label = "Prepare & Explode Mesh"
     bl_options = {'REGISTER', 'UNDO'}
+    run_label = "Explosion"
+    rollback_phase = "Fracturing"
 
     @classmethod
     def poll(cls, context):
@@ -477,76 +3039,240 @@ class CAKE_OT_CakeExplosion(bpy.types.Operator):
         return min_co, max_co
     
 
-    def _chip_one_piece(self, bm, context, num_bisections_on_chunk, iteration_info_for_debug=""):
+    def _chip_pieces_in_bmesh(self, bm, num_pieces, num_bisections_per_chip):
         """
-        Applies 'num_bisections_on_chunk' to the current bm, marks seams,
-        then selects and returns True if a PARTIAL island was selected.
-        Used by NON_UNIFORM and RANDOM_CHIPPING modes.
+        Chips up to num_pieces - 1 pieces off bm without leaving it: every chip bisects the
+        remainder 'num_bisections_per_chip' times, marks the cuts as seams and takes the
+        seam-delimited island of a random remainder face. Chipped faces get their chip number
+        (1, 2, ...) in the FRACTURE_PIECE_LAYER face layer, the remainder keeps 0.
+        Returns the number of chips.
         """
-        if not bm.faces or not any(f.is_valid for f in bm.faces):
-            self.report({'DEBUG'}, f"Debug (_chip_one_piece): No valid faces in BMesh for {iteration_info_for_debug}.")
-            return False
-
-        bm.verts.ensure_lookup_table()
-        bm.edges.ensure_lookup_table()
-        bm.faces.ensure_lookup_table()
+        piece_layer = bm.faces.layers.int.get(FRACTURE_PIECE_LAYER) or bm.faces.layers.int.new(FRACTURE_PIECE_LAYER)
+        remainder = list(bm.faces)
+        chipped = 0
+        for iteration in range(num_pieces - 1):
+            for _ in range(num_bisections_per_chip):
+                # Ordered de-duplication, so the same seed always gives the same cuts
+                edges = list(dict.fromkeys(edge for face in remainder for edge in face.edges))
+                verts = list(dict.fromkeys(vert for edge in edges for vert in edge.verts))
+                min_co, max_co = self._get_bmesh_bounds(verts)
+                if min_co is None: break
+
+                dims = (max_co - min_co) / 2.0
+                center = min_co + dims
+                safe_dims = Vector([max(abs(d), 0.001) for d in dims])
+
+                plane_co = center + Vector((random.uniform(-safe_dims.x, safe_dims.x),
+                                            random.uniform(-safe_dims.y, safe_dims.y),
+                                            random.uniform(-safe_dims.z, safe_dims.z)))
+                plane_no = Vector((random.uniform(-1.0, 1.0), random.uniform(-1.0, 1.0), random.uniform(-1.0, 1.0)))
+
+                if plane_no.length < 0.0001: plane_no = Vector((1.0,0.0,0.0))
+                plane_no.normalize()
 
-        for _ in range(num_bisections_on_chunk):
-            current_valid_verts = [v for v in bm.verts if v.is_valid]
-            if not current_valid_verts or not any(f.is_valid for f in bm.faces): break
+                try:
+                    ret = bmesh.ops.bisect_plane(bm, geom=verts + edges + remainder, plane_co=plane_co, plane_no=plane_no, clear_inner=False, clear_outer=False)
+                    run_stats.count("bmesh bisects")
+                except Exception as e:
+                    self.report({'WARNING'}, f"Chipping: bisect failed on chip {iteration}: {type(e).__name__} - {e}")
+                    continue
+                for edge in ret['geom_cut']:
+                    if isinstance(edge, bmesh.types.BMEdge): edge.seam = True
+                remainder = [face for face in ret['geom'] if isinstance(face, bmesh.types.BMFace)]
+
+            if not remainder: break
+            remainder_set = set(remainder)
+            seed_face = random.choice(remainder)
+            island = {seed_face}
+            stack = [seed_face]
+            while stack:
+                for edge in stack.pop().edges:
+                    if edge.seam: continue
+                    for face in edge.link_faces:
+                        if face not in island and face in remainder_set:
+                            island.add(face)
+                            stack.append(face)
+            if len(island) == len(remainder):
+                continue
 
-            min_co, max_co = self._get_bmesh_bounds(current_valid_verts)
-            if min_co is None: continue
-            
-            dims = (max_co - min_co) / 2.0
-            center = min_co + dims
-            safe_dims = Vector([max(abs(d), 0.001) for d in dims])
-            
-            plane_co = center + Vector((random.uniform(-safe_dims.x, safe_dims.x),
-                                        random.uniform(-safe_dims.y, safe_dims.y),
-                                        random.uniform(-safe_dims.z, safe_dims.z)))
-            plane_no = Vector((random.uniform(-1.0, 1.0), random.uniform(-1.0, 1.0), random.uniform(-1.0, 1.0)))
-            
-            if plane_no.length < 0.0001: plane_no = Vector((1.0,0.0,0.0))
-            plane_no.normalize()
+            chipped += 1
+            for face in island:
+                face[piece_layer] = chipped
+            remainder = [face for face in remainder if face not in island]
+        return chipped
 
+    def _apply_uniform_cuts_to_bmesh(self, bm, num_pieces, noise_factor=0.05):
+        """
+        Cuts bm with a grid of about num_pieces cells, more cuts along its longer sides. The cuts of
+        an axis sit at the quantiles of the vertex positions along it, so pieces get a similar share
+        of the mesh, and are shifted and tilted by noise_factor (fraction of the mesh size).
+        Faces are binned into cells by their center, the cell number goes to FRACTURE_PIECE_LAYER.
+        """
+        piece_layer = bm.faces.layers.int.get(FRACTURE_PIECE_LAYER) or bm.faces.layers.int.new(FRACTURE_PIECE_LAYER)
+        co = np.array([tuple(vert.co) for vert in bm.verts], dtype=np.float64).reshape(-1, 3)
+        if not len(co) or not bm.faces:
+            return
+        dims = np.maximum(co.max(axis=0) - co.min(axis=0), 1e-6)
+        # Grow the grid along its coarsest axis, then keep whichever of the last two grids is closer to num_pieces
+        counts, previous = [1, 1, 1], [1, 1, 1]
+        while counts[0] * counts[1] * counts[2] < num_pieces:
+            previous = list(counts)
+            counts[int(np.argmax(dims / counts))] += 1
+        if num_pieces - np.prod(previous) <= np.prod(counts) - num_pieces:
+            counts = previous
+
+        # (axis, plane point, plane normal) of every cut
+        planes = []
+        for axis, count in enumerate(counts):
+            for position in np.quantile(co[:, axis], np.arange(1, count) / count):
+                plane_co = co.mean(axis=0)
+                plane_co[axis] = position + random.uniform(-noise_factor, noise_factor) * dims[axis]
+                plane_no = np.array([random.uniform(-noise_factor, noise_factor) for _ in range(3)])
+                plane_no[axis] = 1.0
+                planes.append((axis, plane_co, plane_no / np.linalg.norm(plane_no)))
+
+        for _, plane_co, plane_no in planes:
+            geom = bm.verts[:] + bm.edges[:] + bm.faces[:]
             try:
-                geom_to_bisect = [e for e in bm.verts[:] + bm.edges[:] + bm.faces[:] if e.is_valid]
-                if not geom_to_bisect or not any(f.is_valid for f in bm.faces): continue
-                
-                ret = bmesh.ops.bisect_plane(bm, geom=geom_to_bisect, plane_co=plane_co, plane_no=plane_no, clear_inner=False, clear_outer=False)
-                bm.verts.ensure_lookup_table(); bm.edges.ensure_lookup_table(); bm.faces.ensure_lookup_table()
-                if 'geom_cut' in ret:
-                    for edge in ret['geom_cut']:
-                        if isinstance(edge, bmesh.types.BMEdge) and edge.is_valid: edge.seam = True
+                ret = bmesh.ops.bisect_plane(bm, geom=geom, plane_co=Vector(plane_co), plane_no=Vector(plane_no),
+                                             clear_inner=False, clear_outer=False)
+                run_stats.count("bmesh bisects")
             except Exception as e:
-                self.report({'WARNING'}, f"Debug (_chip_one_piece): Bisect failed for {iteration_info_for_debug}: {type(e).__name__} - {e}")
-
-        if not bm.faces or not any(f.is_valid for f in bm.faces): return False
-        for f_deselect in bm.faces: 
-            if f_deselect.is_valid: f_deselect.select = False
+                self.report({'WARNING'}, f"Uniform: bisect failed: {type(e).__name__} - {e}")
+                continue
+            for edge in ret['geom_cut']:
+                if isinstance(edge, bmesh.types.BMEdge): edge.seam = True
+
+        centers = np.array([tuple(face.calc_center_median()) for face in bm.faces], dtype=np.float64).reshape(-1, 3)
+        cells = np.zeros((len(centers), 3), dtype=np.int64)
+        for axis, plane_co, plane_no in planes:
+            cells[:, axis] += (centers - plane_co) @ plane_no > 0.0
+        labels = (cells[:, 0] * counts[1] + cells[:, 1]) * counts[2] + cells[:, 2]
+        for face, label in zip(bm.faces, labels.tolist()):
+            face[piece_layer] = label + 1
+
+    def _voronoi_cells_in_bmesh(self, bm, num_pieces):
+        """
+        Cuts bm along the Voronoi cells of num_pieces random points on its surface and puts the
+        cell number (1..num_pieces) of every face in the FRACTURE_PIECE_LAYER face layer. Each pass
+        groups the faces crossing a cell border by the pair of cells and cuts every group with
+        that pair's bisecting plane at once, until no face crosses a border.
+        Returns the number of non-empty cells, num_pieces unless the mesh has too few faces.
+        """
+        piece_layer = bm.faces.layers.int.get(FRACTURE_PIECE_LAYER) or bm.faces.layers.int.new(FRACTURE_PIECE_LAYER)
+        rng = np.random.default_rng(random.getrandbits(32))
+        # Points on the surface, so every cell holds some of the mesh
+        seeds = random_surface_points(bm, max(1, num_pieces), rng)
+        if not len(seeds):
+            return 0
+        co = np.array([tuple(vert.co) for vert in bm.verts], dtype=np.float64).reshape(-1, 3)
+        tolerance = 1e-5 * max(float(np.linalg.norm(co.max(axis=0) - co.min(axis=0))), 1e-6)
+
+        for pass_index in range(VORONOI_MAX_PASSES + 1):
+            bm.verts.index_update()
+            faces = list(bm.faces)
+            co = np.array([tuple(vert.co) for vert in bm.verts], dtype=np.float64).reshape(-1, 3)
+            vert_cells = nearest_seeds(co, seeds)
+            face_cells = nearest_seeds([tuple(face.calc_center_median()) for face in faces], seeds)
+
+            crossing = {}
+            for face, cell in zip(faces, face_cells):
+                for vert in face.verts:
+                    other = vert_cells[vert.index]
+                    if other == cell:
+                        continue
+                    # Distance of the vertex past the border between the two cells
+                    normal = seeds[other] - seeds[cell]
+                    if (co[vert.index] - (seeds[cell] + seeds[other]) / 2) @ normal > tolerance * np.linalg.norm(normal):
+                        crossing.setdefault((cell, other), []).append(face)
+                        break
+            if not crossing:
+                break
+            if pass_index == VORONOI_MAX_PASSES:
+                self.report({'WARNING'}, f"Voronoi: {sum(map(len, crossing.values()))} faces still cross cell borders after {VORONOI_MAX_PASSES} passes.")
+                break
+
+            for (cell, other), cell_faces in crossing.items():
+                cell_faces = [face for face in cell_faces if face.is_valid]
+                edges = list(dict.fromkeys(edge for face in cell_faces for edge in face.edges))
+                verts = list(dict.fromkeys(vert for edge in edges for vert in edge.verts))
+                try:
+                    ret = bmesh.ops.bisect_plane(bm, geom=verts + edges + cell_faces,
+                                                 plane_co=Vector((seeds[cell] + seeds[other]) / 2),
+                                                 plane_no=Vector(seeds[other] - seeds[cell]).normalized(),
+                                                 clear_inner=False, clear_outer=False)
+                    run_stats.count("bmesh bisects")
+                except Exception as e:
+                    self.report({'WARNING'}, f"Voronoi: bisect between cells {cell} and {other} failed: {type(e).__name__} - {e}")
+                    continue
+                for edge in ret['geom_cut']:
+                    if isinstance(edge, bmesh.types.BMEdge): edge.seam = True
+
+        for face, cell in zip(faces, face_cells):
+            face[piece_layer] = cell + 1
+        return len(np.unique(face_cells))
+
+    def _build_piece_objects(self, base_obj, bm):
+        """
+        Writes the fractured bm into base_obj's mesh and replaces base_obj with one object per
+        FRACTURE_PIECE_LAYER value, chips in cut order and the remainder last. The pieces are
+        copies of base_obj (modifiers, materials, ...) with their origin on their bounds center.
+        """
+        mesh = base_obj.data
+        bm.to_mesh(mesh)
+        bm.free()
+        labels = np.zeros(len(mesh.polygons), dtype=np.int32)
+        if len(labels):
+            mesh.attributes[FRACTURE_PIECE_LAYER].data.foreach_get("value", labels)
+            labels[labels == 0] = labels.max() + 1
+
+        group_names = [group.name for group in base_obj.vertex_groups]
+        weights, assigned = read_vertex_weights(mesh, len(group_names)) if group_names else (None, None)
+        shape_keys = read_shape_keys(mesh)
+        use_relative = mesh.shape_keys.use_relative if mesh.shape_keys else True
+        action = base_obj.animation_data.action if base_obj.animation_data else None
+
+        with run_stats.phase("build pieces"):
+            pieces = []
+            for piece_mesh, center, verts in split_mesh_by_face_labels(mesh, labels, f"{base_obj.name}_piece"):
+                piece = base_obj.copy()
+                piece.data = piece_mesh
+                piece.matrix_world = base_obj.matrix_world @ Matrix.Translation(center)
+                if action:
+                    # Every piece gets keyed on its own, a shared action would move them all together
+                    piece.animation_data.action = action.copy()
+                if group_names:
+                    write_vertex_weights(piece, group_names, weights[verts], assigned[verts])
+                    piece.vertex_groups.active_index = base_obj.vertex_groups.active_index
+                write_shape_keys(piece, shape_keys, verts, np.array(center, dtype=np.float32), use_relative)
+                piece.active_shape_key_index = base_obj.active_shape_key_index
+                for collection in base_obj.users_collection:
+                    collection.objects.link(piece)
+                pieces.append(piece)
+        bpy.data.objects.remove(base_obj, do_unlink=True)
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+        if action and action.users == 0:
+            bpy.data.actions.remove(action)
+        return pieces
 
-        valid_faces_for_seed = [f for f in bm.faces if f.is_valid and not f.hide]
-        if not valid_faces_for_seed: return False
-        
-        seed_face = random.choice(valid_faces_for_seed)
-        if not seed_face.is_valid: return False
-        seed_face.select = True 
 
-        try:
-            bpy.ops.mesh.select_linked(delimit={'SEAM'})
-        except Exception as e_sl: 
-            self.report({'ERROR'}, f"Debug (_chip_one_piece): select_linked FAILED for {iteration_info_for_debug}: {type(e_sl).__name__} - {e_sl}. This should not happen if operator name is correct.")
-            if not seed_face.is_valid or not seed_face.select : return False 
-
-        selected_faces_count = sum(1 for f in bm.faces if f.is_valid and f.select)
-        total_valid_faces = sum(1 for f in bm.faces if f.is_valid)
-        if total_valid_faces == 0: return False
-        
-        return 0 < selected_faces_count < total_valid_faces
+    def invoke(self, context, event):
+        # Exploding from the UI runs modal, scripts calling execute keep the blocking explosion
+        self.run_modal = True
+        return self.execute(context)
 
+    def overwritten_objects(self, context):
+        """Objects already in the target collection, the explosion clears it"""
+        collection = bpy.data.collections.get(context.scene.target_collection_name)
+        return list(collection.objects) if collection else []
 
-    def execute(self, context):
+    def steps(self, context):
+        """
+        The explosion as a generator yielding (phase, done, total): fracturing, matching pieces
+        to particles, then sampling and writing their keys. Nothing is modified before the
+        first 'Fracturing' step.
+        """
         source_obj = context.active_object
         scene = context.scene
         
@@ -567,7 +3293,7 @@ class CAKE_OT_CakeExplosion(bpy.types.Operator):
         original_object_matrix = source_obj.matrix_world.copy()
         original_source_center_world = source_obj.matrix_world.translation.copy()
 
-
+        yield "Fracturing", 0, 1
         initial_state_obj = None
         if source_obj.data:
             bpy.ops.object.select_all(action='DESELECT')
@@ -613,220 +3339,43 @@ class CAKE_OT_CakeExplosion(bpy.types.Operator):
                 bpy.ops.object.particle_system_remove()
         
         final_pieces = []
-        
-        if split_mode == 'UNIFORM': 
-            self.report({'INFO'}, "Using UNIFORM splitting mode (global pre-cut).")
-            
-            if target_num_pieces_total <= 1:
-                if obj_to_process_for_splitting.data and obj_to_process_for_splitting.data.vertices:
-                    final_pieces.append(obj_to_process_for_splitting)
-            else:
-                bpy.ops.object.select_all(action='DESELECT')
-                obj_to_process_for_splitting.select_set(True)
-                context.view_layer.objects.active = obj_to_process_for_splitting
-                
-                current_mode = obj_to_process_for_splitting.mode
-                if current_mode != 'EDIT': bpy.ops.object.mode_set(mode='EDIT')
-                bm = bmesh.from_edit_mesh(obj_to_process_for_splitting.data)
-                
-                self._apply_uniform_cuts_to_bmesh(bm, target_num_pieces_total, noise_factor=0.05) 
-                
-                bmesh.update_edit_mesh(obj_to_process_for_splitting.data)
-                if current_mode != 'EDIT': bpy.ops.object.mode_set(mode=current_mode)
-                else: bpy.ops.object.mode_set(mode='OBJECT')
-
-                object_being_separated_iteratively = obj_to_process_for_splitting
-                
-
-                for _ in range(target_num_pieces_total + 5):
-                    if not object_being_separated_iteratively or \
-                       object_being_separated_iteratively.name not in bpy.data.objects or \
-                       not object_being_separated_iteratively.data or \
-                       not object_being_separated_iteratively.data.polygons:
-                        self.report({'DEBUG'}, "Uniform: Remainder object is invalid or empty.")
-                        break 
-
-                    bpy.ops.object.select_all(action='DESELECT')
-                    object_being_separated_iteratively.select_set(True)
-                    context.view_layer.objects.active = object_being_separated_iteratively
-                    name_of_current_remainder_obj = object_being_separated_iteratively.name
-
-                    bpy.ops.object.mode_set(mode='EDIT')
-                    bm_iter = bmesh.from_edit_mesh(object_being_separated_iteratively.data)
-                    bm_iter.faces.ensure_lookup_table()
-
-                    if not bm_iter.faces or not any(f.is_valid for f in bm_iter.faces):
-                        bpy.ops.object.mode_set(mode='OBJECT')
-                        self.report({'DEBUG'}, "Uniform: No valid faces in remainder BMesh.")
-                        break 
-                    
-                    for f_sel_clear in bm_iter.faces: f_sel_clear.select = False
-                    
-                    seed_face_iter = next((f for f in bm_iter.faces if f.is_valid and not f.hide), None)
-                    
-                    if not seed_face_iter:
-                        bpy.ops.object.mode_set(mode='OBJECT')
-                        self.report({'DEBUG'}, "Uniform: No valid seed face found in remainder.")
-                        break 
-                    
-                    seed_face_iter.select = True
-                    
-
-                    bmesh.update_edit_mesh(object_being_separated_iteratively.data)
-                    
-                    try:
-                        bpy.ops.mesh.select_linked(delimit={'SEAM'})
-                    except Exception as e:
-                        bpy.ops.object.mode_set(mode='OBJECT')
-                        self.report({'WARNING'}, f"UNIFORM separation: bpy.ops.mesh.select_linked failed: {type(e).__name__} - {e}")
-                        break 
-
-                    is_last_intended_separation = (len(final_pieces) >= target_num_pieces_total - 1)
-                    
-                    bpy.ops.object.mode_set(mode='OBJECT')
-                    selected_poly_count = sum(1 for p in object_being_separated_iteratively.data.polygons if p.select)
-                    total_poly_count = len(object_being_separated_iteratively.data.polygons)
-                    bpy.ops.object.mode_set(mode='EDIT')
-
-                    if selected_poly_count == total_poly_count and not is_last_intended_separation:
-
-                        self.report({'INFO'}, "Uniform: Entire remainder selected, treating as last piece.")
-                        bpy.ops.object.mode_set(mode='OBJECT')
-                        break
-
-
-                    objects_before_sep = set(o.name for o in bpy.data.objects)
-                    try:
-                        bpy.ops.mesh.separate(type='SELECTED')
-                    except RuntimeError as e_sep:
-                        bpy.ops.object.mode_set(mode='OBJECT')
-                        self.report({'WARNING'}, f"UNIFORM separation: bpy.ops.mesh.separate failed: {e_sep}")
-                        break
-                    bpy.ops.object.mode_set(mode='OBJECT')
-
-                    new_piece_obj = None
-                    current_obj_names = set(o.name for o in bpy.data.objects)
-                    diff_names = current_obj_names - objects_before_sep
-                    
-                    for name_cand in diff_names:
-                        cand_obj = bpy.data.objects.get(name_cand)
-                        if cand_obj and cand_obj.name != name_of_current_remainder_obj:
-                            if cand_obj.select_get() or context.view_layer.objects.active == cand_obj :
-                                new_piece_obj = cand_obj
-                                break
-                    if not new_piece_obj and diff_names:
-                         new_piece_obj = bpy.data.objects.get(list(diff_names)[0])
-                    
-                    if new_piece_obj and new_piece_obj.data and new_piece_obj.data.vertices:
-                        final_pieces.append(new_piece_obj)
-                        remainder_obj_check = bpy.data.objects.get(name_of_current_remainder_obj)
-                        if remainder_obj_check and remainder_obj_check.data and remainder_obj_check.data.polygons:
-                            object_being_separated_iteratively = remainder_obj_check
-                        else: 
-                            object_being_separated_iteratively = None; break 
-                    else:
-                        self.report({'WARNING'}, "UNIFORM separation: No new piece identified or piece empty.")
-                        object_being_separated_iteratively = bpy.data.objects.get(name_of_current_remainder_obj)
-                        if not (object_being_separated_iteratively and object_being_separated_iteratively.data and object_being_separated_iteratively.data.polygons):
-                            break 
-                
-                if object_being_separated_iteratively and \
-                   object_being_separated_iteratively.name in bpy.data.objects and \
-                   object_being_separated_iteratively.data and \
-                   object_being_separated_iteratively.data.vertices:
-                    if not any(p is object_being_separated_iteratively for p in final_pieces):
-                        final_pieces.append(object_being_separated_iteratively)
-                elif object_being_separated_iteratively and object_being_separated_iteratively.name in bpy.data.objects:
-                    bpy.data.objects.remove(object_being_separated_iteratively, do_unlink=True)
-                    
-        elif split_mode in ['NON_UNIFORM', 'RANDOM_CHIPPING']:
-            self.report({'INFO'}, f"Using iterative chipping mode: {split_mode}.")
-            obj_to_carve_from = obj_to_process_for_splitting
-
-            num_bisections_per_chip = 1
-            if split_mode == 'NON_UNIFORM':
-                num_bisections_per_chip = random.randint(1, 2)
-            elif split_mode == 'RANDOM_CHIPPING':
-                num_bisections_per_chip = random.randint(2, 5) 
-
-            for iteration_count in range(target_num_pieces_total - 1):
-                if not obj_to_carve_from or \
-                   obj_to_carve_from.name not in bpy.data.objects or \
-                   not obj_to_carve_from.data or \
-                   not obj_to_carve_from.data.vertices or \
-                   not obj_to_carve_from.data.polygons:
-                    self.report({'DEBUG'}, f"Chipping: obj_to_carve_from invalid for iter {iteration_count}")
-                    break
-
-                bpy.ops.object.select_all(action='DESELECT')
-                obj_to_carve_from.select_set(True)
-                context.view_layer.objects.active = obj_to_carve_from
-                name_of_object_being_reduced = obj_to_carve_from.name
-                
-                current_mode = obj_to_carve_from.mode
-                if current_mode != 'EDIT': bpy.ops.object.mode_set(mode='EDIT')
-                
-                bm = bmesh.from_edit_mesh(obj_to_carve_from.data)
-                debug_info = f"Chunk: {name_of_object_being_reduced}, Iter: {iteration_count}, Mode: {split_mode}"
-                
-                selection_successful = self._chip_one_piece(bm, context, num_bisections_per_chip, debug_info)
-                
-                if not selection_successful:
-                    if current_mode != 'EDIT': bpy.ops.object.mode_set(mode=current_mode)
-                    else: bpy.ops.object.mode_set(mode='OBJECT')
-                    self.report({'INFO'}, f"Chipping: _chip_one_piece selection not successful for {name_of_object_being_reduced}")
-                    continue 
+        with run_stats.phase("fracture"):
+            if split_mode == 'UNIFORM':
+                self.report({'INFO'}, "Using UNIFORM splitting mode (global pre-cut).")
+                bm = bmesh.new()
+                bm.from_mesh(obj_to_process_for_splitting.data)
+                self._apply_uniform_cuts_to_bmesh(bm, target_num_pieces_total, noise_factor=0.05)
+                final_pieces = self._build_piece_objects(obj_to_process_for_splitting, bm)
+
+            elif split_mode in ['NON_UNIFORM', 'RANDOM_CHIPPING']:
+                self.report({'INFO'}, f"Using iterative chipping mode: {split_mode}.")
+                num_bisections_per_chip = 1
+                if split_mode == 'NON_UNIFORM':
+                    num_bisections_per_chip = random.randint(1, 2)
+                elif split_mode == 'RANDOM_CHIPPING':
+                    num_bisections_per_chip = random.randint(2, 5) 
+
+                bm = bmesh.new()
+                bm.from_mesh(obj_to_process_for_splitting.data)
+                chipped = self._chip_pieces_in_bmesh(bm, target_num_pieces_total, num_bisections_per_chip)
+                if chipped < target_num_pieces_total - 1:
+                    self.report({'INFO'}, f"Chipping: {target_num_pieces_total - 1 - chipped} chips left the remainder whole.")
+                final_pieces = self._build_piece_objects(obj_to_process_for_splitting, bm)
+
+            elif split_mode == 'VORONOI':
+                self.report({'INFO'}, "Using VORONOI splitting mode.")
+                bm = bmesh.new()
+                bm.from_mesh(obj_to_process_for_splitting.data)
+                cells = self._voronoi_cells_in_bmesh(bm, target_num_pieces_total)
+                if cells < target_num_pieces_total:
+                    self.report({'WARNING'}, f"Voronoi: only {cells} of {target_num_pieces_total} cells hold faces.")
+                final_pieces = self._build_piece_objects(obj_to_process_for_splitting, bm)
 
-                objects_before_sep = set(o.name for o in bpy.data.objects)
-                try:
-                    bpy.ops.mesh.separate(type='SELECTED')
-                except RuntimeError as e_sep:
-                     self.report({'WARNING'}, f"Chipping: separate op failed for {name_of_object_being_reduced}: {e_sep}")
-                     if current_mode != 'EDIT': bpy.ops.object.mode_set(mode=current_mode)
-                     else: bpy.ops.object.mode_set(mode='OBJECT')
-                     continue
-                
-                if current_mode != 'EDIT': bpy.ops.object.mode_set(mode=current_mode)
-                else: bpy.ops.object.mode_set(mode='OBJECT')
-                
-                new_piece = None
-                new_obj_names = set(o.name for o in bpy.data.objects) - objects_before_sep
-                temp_remainder = bpy.data.objects.get(name_of_object_being_reduced)
-
-                for n_name in new_obj_names:
-                    obj_cand = bpy.data.objects.get(n_name)
-                    if obj_cand and obj_cand != temp_remainder :
-                        new_piece = obj_cand; break
-                if not new_piece:
-                    for sel_obj in context.selected_objects:
-                        if sel_obj.name in new_obj_names and sel_obj != temp_remainder:
-                            new_piece = sel_obj; break
-                
-                if new_piece and new_piece.data and new_piece.data.vertices:
-                    final_pieces.append(new_piece)
-                    if temp_remainder and temp_remainder.data and temp_remainder.data.vertices:
-                        obj_to_carve_from = temp_remainder
-                    else: 
-                        if temp_remainder and temp_remainder.name in bpy.data.objects: bpy.data.objects.remove(temp_remainder, do_unlink=True)
-                        obj_to_carve_from = None; break 
-                else: 
-                    if new_piece and new_piece.name in bpy.data.objects: bpy.data.objects.remove(new_piece, do_unlink=True)
-                    if not (temp_remainder and temp_remainder.data and temp_remainder.data.vertices):
-                        if temp_remainder and temp_remainder.name in bpy.data.objects: bpy.data.objects.remove(temp_remainder, do_unlink=True)
-                        obj_to_carve_from = None; break
-            
-            if obj_to_carve_from and obj_to_carve_from.name in bpy.data.objects and \
-               obj_to_carve_from.data and obj_to_carve_from.data.vertices:
-                if not any(p is obj_to_carve_from for p in final_pieces):
-                    final_pieces.append(obj_to_carve_from)
-            elif obj_to_carve_from and obj_to_carve_from.name in bpy.data.objects:
-                bpy.data.objects.remove(obj_to_carve_from, do_unlink=True)
-        
-        else:
-            self.report({'ERROR'}, f"Unknown split_mode defined: {split_mode}")
-            if initial_state_obj and initial_state_obj.name in bpy.data.objects: bpy.data.objects.remove(initial_state_obj, do_unlink=True)
-            if obj_to_process_for_splitting and obj_to_process_for_splitting.name in bpy.data.objects: bpy.data.objects.remove(obj_to_process_for_splitting, do_unlink=True)
-            return {'CANCELLED'}
+            else:
+                self.report({'ERROR'}, f"Unknown split_mode defined: {split_mode}")
+                if initial_state_obj and initial_state_obj.name in bpy.data.objects: bpy.data.objects.remove(initial_state_obj, do_unlink=True)
+                if obj_to_process_for_splitting and obj_to_process_for_splitting.name in bpy.data.objects: bpy.data.objects.remove(obj_to_process_for_splitting, do_unlink=True)
+                return {'CANCELLED'}
 
         # --- Post-splitting ---
         valid_pieces_cleaned = []
@@ -855,15 +3404,17 @@ class CAKE_OT_CakeExplosion(bpy.types.Operator):
         else: initial_state_obj = None 
 
         actual_created_piece_count = len(final_pieces)
-        for i, piece in enumerate(final_pieces):
-            if piece.name not in bpy.data.objects : continue 
-            piece.name = f"{original_active_name}_piece_{i:03d}"
-            for coll_to_unlink_from in piece.users_collection: coll_to_unlink_from.objects.unlink(piece)
-            if piece.name not in exploded_collection.objects: exploded_collection.objects.link(piece)
-            bpy.ops.object.select_all(action='DESELECT')
-            piece.select_set(True)
-            context.view_layer.objects.active = piece
-            bpy.ops.object.origin_set(type='ORIGIN_GEOMETRY', center='BOUNDS')
+        run_stats.count("pieces", actual_created_piece_count)
+        run_stats.inputs.update(
+            pieces=target_num_pieces_total, split_mode=split_mode, particles=user_psys.settings.count,
+            poly_count=len(source_obj_ref.data.polygons) if source_obj_ref.type == 'MESH' else 0,
+            frames=len(range(scene.frame_start, scene.frame_end + 1, scene.bake_step)), step=scene.bake_step)
+        with run_stats.phase("piece setup"):
+            for i, piece in enumerate(final_pieces):
+                if piece.name not in bpy.data.objects : continue 
+                piece.name = f"{original_active_name}_piece_{i:03d}"
+                for coll_to_unlink_from in piece.users_collection: coll_to_unlink_from.objects.unlink(piece)
+                if piece.name not in exploded_collection.objects: exploded_collection.objects.link(piece)
         
         num_particles_in_user_system = user_psys.settings.count
         
@@ -876,13 +3427,17 @@ class CAKE_OT_CakeExplosion(bpy.types.Operator):
                  particle_eval_frame = max(scene.frame_start, int(user_psys.settings.frame_start))
             
             self.report({'INFO'}, "Attempting directional particle assignment...")
-            pieces_for_animation = get_directionally_matched_pieces(
-                original_source_center_world, 
-                list(final_pieces),
-                user_psys, 
-                particle_eval_frame,
-                context
-            )
+            yield "Matching", 0, len(final_pieces)
+            with run_stats.phase("piece matching"):
+                pieces_for_animation = get_directionally_matched_pieces(
+                    original_source_center_world, 
+                    list(final_pieces),
+                    user_psys, 
+                    particle_eval_frame,
+                    context,
+                    scene.cake_explosion_matching,
+                    scene.cake_explosion_size_weight
+                )
             self.report({'INFO'}, f"Directional matching resulted in {len(pieces_for_animation)} pieces for animation.")
         
         if not pieces_for_animation and final_pieces:
@@ -912,6 +3467,7 @@ class CAKE_OT_CakeExplosion(bpy.types.Operator):
             keyframe_object(initial_state_obj, bake_anim_start_frame)
             initial_state_obj.scale = (0.001, 0.001, 0.001)
             initial_state_obj.keyframe_insert(data_path="scale", frame=bake_anim_start_frame + 1)
+            apply_channel_interpolation([initial_state_obj], get_channel_interpolation(scene))
 
         for piece in pieces_for_animation:
             if piece and piece.name in bpy.data.objects:
@@ -920,9 +3476,9 @@ class CAKE_OT_CakeExplosion(bpy.types.Operator):
 
         if pieces_for_animation:
             self.report({'INFO'}, (f"Animating {num_pieces_to_animate_final} pieces. Initial state on frame {bake_anim_start_frame}, fragments from {bake_anim_start_frame + 1}."))
-            match_keyframe_objects(user_psys, pieces_for_animation, 
-                                   bake_anim_start_frame, bake_anim_end_frame,
-                                   bake_anim_step, keyframe_offset=1) 
+            yield from iter_match_keyframe_objects(user_psys, pieces_for_animation,
+                                                   bake_anim_start_frame, bake_anim_end_frame,
+                                                   bake_anim_step, keyframe_offset=1)
             if actual_created_piece_count > num_pieces_to_animate_final :
                  self.report({'WARNING'}, (f"{actual_created_piece_count - num_pieces_to_animate_final} pieces created but not animated (either no matching particle or particle limit)."))
         elif actual_created_piece_count > 0:
@@ -952,11 +3508,14 @@ class CAKE_OT_CakeExplosion(bpy.types.Operator):
         return {'FINISHED'}
 
 
-class BakeParticlesOperator(bpy.types.Operator):
+class BakeParticlesOperator(CakeModalRun, bpy.types.Operator):
     bl_idname = "cake.bake_particles"
     bl_label = "Bake Particles"
     bl_description = "Bake particles motion into keyframed animations"
     bl_options = {"REGISTER", "UNDO"}
+    run_label = "Bake"
+    # Nothing in the scene is modified before the first 'Writing' step
+    rollback_phase = "Writing"
 
     def validate_particle_settings(self, context):
         obj = context.active_object
@@ -981,9 +3540,12 @@ class BakeParticlesOperator(bpy.types.Operator):
         elif warnings:  # If there are warnings, show them but continue
             self.report({'INFO'}, "Note: " + " | ".join(warnings))
         
+        # Baking from the UI runs modal, scripts calling execute keep the blocking bake
+        self.run_modal = True
+
         # Then check if collection exists
         collection_name = context.scene.target_collection_name
-        if bpy.data.collections.get(collection_name):
+        if bpy.data.collections.get(collection_name) and not context.scene.cake_rebake_window:
             return context.window_manager.invoke_confirm(
                 self, 
                 event,
@@ -991,37 +3553,84 @@ class BakeParticlesOperator(bpy.types.Operator):
             )
         return self.execute(context)
 
-    def execute(self, context):
+    def steps(self, context):
+        """
+        The bake as a generator, yielding (phase, done, total) progress. Nothing in the
+        scene is modified before the first 'Writing' step, so the whole 'Sampling'
+        phase can be stopped without leaving anything behind.
+        """
+        scene = context.scene
+        collection_name = scene.target_collection_name
+        if not collection_name:
+            self.report({'ERROR'}, "Please specify a collection name.")
+            return {'CANCELLED'}
+
+        active_object = bpy.context.object
+        emitters = [active_object]
+        if scene.cake_bake_selected_emitters:
+            emitters += [obj for obj in bpy.context.selected_objects
+                         if obj != active_object and obj.particle_systems]
+        source_objects = [obj for obj in bpy.context.selected_objects if obj not in emitters]
+        rebake_window = None
+        if scene.cake_rebake_window:
+            rebake_window = (scene.cake_rebake_frame_start, scene.cake_rebake_frame_end)
+        self._emitters = emitters
+
         try:
-            collection_name = context.scene.target_collection_name
-            if not collection_name:
-                self.report({'ERROR'}, "Please specify a collection name.")
-                return {'CANCELLED'}
+            collection_names, window_rebaked = yield from iter_bake_particles(
+                emitters, source_objects, collection_name,
+                scene.frame_start, scene.frame_end, scene.bake_step, rebake_window)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
 
-            bake_step = context.scene.bake_step
-            depsgraph = bpy.context.evaluated_depsgraph_get()
-            active_object = bpy.context.object
-            evaluated_object = depsgraph.objects[active_object.name]
-            source_objects = [obj for obj in bpy.context.selected_objects if obj != active_object]
+        if window_rebaked:
+            self.report({'INFO'}, f"Re-baked frames {rebake_window[0]}-{rebake_window[1]} in: {', '.join(collection_names)}")
+        else:
+            self.report({'INFO'}, f"Successfully baked particles to collection: {', '.join(collection_names)}")
+        return {"FINISHED"}
 
-            if not source_objects:
-                self.report({'ERROR'}, "No source objects selected as particle instances.")
-                return {'CANCELLED'}
+    def overwritten_objects(self, context):
+        """Objects of the bake's output collections that already exist, the bake reuses or deletes them"""
+        _, collection_names = bake_jobs(self._emitters, context.scene.target_collection_name)
+        collections = [bpy.data.collections.get(name) for name in collection_names]
+        return list({obj for collection in collections if collection for obj in collection.objects})
 
-            # Modified main function call with collection name
-            for particle_sys in evaluated_object.particle_systems:
-                start_frame = bpy.context.scene.frame_start
-                end_frame = bpy.context.scene.frame_end
-                particle_objects = create_particle_objects(particle_sys, source_objects, collection_name)
-                match_keyframe_objects(particle_sys, particle_objects, start_frame, end_frame, bake_step)
+class CAKE_OT_ClearSampleCache(bpy.types.Operator):
+    """Delete the particle sample cache stored next to this .blend file"""
+    bl_idname = "cake.clear_sample_cache"
+    bl_label = "Clear Sample Cache"
 
-            self.report({'INFO'}, f"Successfully baked particles to collection: {collection_name}")
-            
-        except Exception as e:
-            self.report({'ERROR'}, f"Error during baking: {str(e)}")
+    def execute(self, context):
+        cache_dir = get_sample_cache_dir()
+        if not cache_dir or not os.path.isdir(cache_dir):
+            self.report({'INFO'}, "No sample cache to clear.")
             return {'CANCELLED'}
-        return {"FINISHED"}
-    
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        self.report({'INFO'}, f"Removed sample cache: {cache_dir}")
+        return {'FINISHED'}
+
+class CAKE_OT_CompareLastRuns(bpy.types.Operator):
+    """Compare the last bake or explosion in the run history with the previous run of the same kind"""
+    bl_idname = "cake.compare_last_runs"
+    bl_label = "Compare With Previous Run"
+
+    def execute(self, context):
+        filepath = get_history_path(context.scene)
+        records = [record for record in read_run_history(filepath) if record.get("status") == 'FINISHED']
+        if not records:
+            self.report({'WARNING'}, f"No finished runs in {filepath}")
+            return {'CANCELLED'}
+        last = records[-1]
+        previous = next((record for record in reversed(records[:-1])
+                         if record["operation"] == last["operation"]), None)
+        if previous is None:
+            self.report({'WARNING'}, f"Only one finished {last['operation']} run in the history.")
+            return {'CANCELLED'}
+        lines = compare_runs(last, previous)
+        self.report({'INFO'}, " | ".join(lines))
+        return {'FINISHED'}
+
 class CollectionCheckOperator(bpy.types.Operator):
     bl_idname = "cake.check_collection"
     bl_label = "Check Collection"
@@ -1045,7 +3654,8 @@ class SimplifyObjectAnimationOperator(bpy.types.Operator):
     bl_options = {"REGISTER", "UNDO"}
 
     def execute(self, context):
-        remove_inbetween(context, bpy.context.selected_objects)
+        removed = remove_inbetween(context, bpy.context.selected_objects)
+        self.report({'INFO'}, f"Removed {removed} keyframes")
         return {'FINISHED'}
     
 class ScaleKeyframesOperator(bpy.types.Operator):
@@ -1073,16 +3683,15 @@ class ScaleKeyframesOperator(bpy.types.Operator):
                 time_offset_mod.frame_scale *= random_scale_factor
                 obj.update_tag()
                 scaled_count += 1
-            elif obj.animation_data and obj.animation_data.action:
-                action = obj.animation_data.action
+            elif obj.animation_data and context.scene.cake_time_scale_mode == 'NLA':
+                strip = get_time_scale_strip(obj)
+                if strip is None:
+                    continue
+                strip.scale = 1 + random.uniform(-range_value, range_value)
+                scaled_count += 1
+            elif get_playing_action(obj):
                 random_scale_factor = 1 + random.uniform(-range_value, range_value)
-                
-                for fcurve in action.fcurves:
-                    for keyframe in fcurve.keyframe_points:
-                        keyframe.co.x *= random_scale_factor
-                        keyframe.handle_left.x *= random_scale_factor
-                        keyframe.handle_right.x *= random_scale_factor
-                    fcurve.update()
+                scale_action_time(get_playing_action(obj), random_scale_factor)
                 scaled_count += 1
 
         if scaled_count > 0:
@@ -1151,11 +3760,154 @@ class CAKE_OT_AdjustExplosionParticles(bpy.types.Operator):
 
         return {'FINISHED'}
     
+# ------(❁´◡`❁)-------
+# Command line batch baking:
+#   blender -b scene.blend --python CakeParticles.py -- --job job.json [--output baked.blend] [--summary summary.json]
+# ------(❁´◡`❁)-------
+
+BATCH_SUMMARY_PREFIX = "CAKE_BATCH_SUMMARY "
+
+def load_batch_job(filepath):
+    """Job file as a dict, .toml files are read with tomllib, anything else as JSON"""
+    if filepath.lower().endswith(".toml"):
+        import tomllib
+        with open(filepath, "rb") as job_file:
+            return tomllib.load(job_file)
+    with open(filepath) as job_file:
+        return json.load(job_file)
+
+def _batch_objects(names):
+    if isinstance(names, str):
+        names = [names]
+    missing = [name for name in names if name not in bpy.data.objects]
+    if missing:
+        raise ValueError(f"Objects not found: {', '.join(missing)}")
+    return [bpy.data.objects[name] for name in names]
+
+def _apply_scene_settings(scene, settings):
+    """Sets scene (and add-on) properties by name, e.g. frame_start, bake_step, cake_key_reduction"""
+    for name, value in settings.items():
+        if not hasattr(scene, name):
+            raise ValueError(f"Unknown scene setting: {name}")
+        setattr(scene, name, value)
+
+def run_batch_bake(job):
+    scene = bpy.context.scene
+    _apply_scene_settings(scene, job.get("scene", {}))
+    emitters = _batch_objects(job["emitters"])
+    source_objects = _batch_objects(job.get("sources", []))
+    rebake_window = job.get("rebake_window")
+    run_stats.reset("Bake", scene.cake_track_memory)
+    status = 'FAILED'
+    try:
+        collection_names, _ = run_steps(iter_bake_particles(
+            emitters, source_objects, job.get("collection", scene.target_collection_name),
+            scene.frame_start, scene.frame_end, scene.bake_step,
+            tuple(rebake_window) if rebake_window else None))
+        status = 'FINISHED'
+    finally:
+        run_stats.finish()
+        append_run_history(scene, status)
+    return {"collections": collection_names}
+
+def run_batch_explosion(job):
+    scene = bpy.context.scene
+    _apply_scene_settings(scene, job.get("scene", {}))
+    if "collection" in job:
+        scene.target_collection_name = job["collection"]
+    source_obj = _batch_objects(job["object"])[0]
+    view_layer = bpy.context.view_layer
+    for obj in view_layer.objects:
+        obj.select_set(False)
+    source_obj.select_set(True)
+    view_layer.objects.active = source_obj
+    result = bpy.ops.cake.cake_explosion()
+    if 'FINISHED' not in result:
+        reason = run_stats.messages[-1] if run_stats.messages else "cancelled"
+        raise RuntimeError(f"Explosion of '{source_obj.name}' failed: {reason}")
+    return {"collections": [scene.target_collection_name]}
+
+BATCH_JOB_TYPES = {
+    "bake": run_batch_bake,
+    "explosion": run_batch_explosion,
+}
+
+def run_batch(job_data, output=None):
+    """
+    Runs the jobs of a job file in order, then saves the .blend (to output, or in place).
+    Job file layout:
+        {"output": "baked.blend",
+         "jobs": [{"type": "bake", "emitters": ["Emitter"], "sources": ["Rock", "Pebble"],
+                   "collection": "rocks", "rebake_window": [40, 60],
+                   "scene": {"frame_start": 1, "frame_end": 250, "bake_step": 2}},
+                  {"type": "explosion", "object": "Cake", "collection": "cake_pieces",
+                   "scene": {"cake_explosion_num_cuts": 30, "cake_explosion_seed": 4}}]}
+    "scene" sets any scene property by name before the job runs. Returns the timing summary,
+    nothing is saved when a job fails.
+    """
+    summary = {"blend": bpy.data.filepath, "blender": bpy.app.version_string,
+               "addon_version": ".".join(str(part) for part in bl_info["version"]), "jobs": []}
+    batch_start = time.perf_counter()
+    for job_index, job in enumerate(job_data.get("jobs", [])):
+        record = {"index": job_index, "type": job.get("type", "bake")}
+        job_start = time.perf_counter()
+        try:
+            if record["type"] not in BATCH_JOB_TYPES:
+                raise ValueError(f"Unknown job type: {record['type']}")
+            record.update(BATCH_JOB_TYPES[record["type"]](job))
+            record["status"] = "FINISHED"
+            record["phases"] = {name: round(seconds, 4) for name, seconds in run_stats.phases.items()}
+            record["counters"] = dict(run_stats.counters)
+            record["memory_mb"] = dict(run_stats.memory)
+        except Exception as e:
+            record["status"] = "FAILED"
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["seconds"] = round(time.perf_counter() - job_start, 4)
+        summary["jobs"].append(record)
+
+    summary["failed"] = sum(1 for record in summary["jobs"] if record["status"] != "FINISHED")
+    output = output or job_data.get("output")
+    if not summary["failed"]:
+        save_start = time.perf_counter()
+        if output:
+            bpy.ops.wm.save_as_mainfile(filepath=os.path.abspath(output))
+        else:
+            bpy.ops.wm.save_mainfile()
+        summary["saved"] = bpy.data.filepath
+        summary["save_seconds"] = round(time.perf_counter() - save_start, 4)
+    summary["total_seconds"] = round(time.perf_counter() - batch_start, 4)
+    return summary
+
+def batch_main(argv):
+    """Entry point for blender -b --python, argv are the arguments after '--'"""
+    parser = argparse.ArgumentParser(prog="CakeParticles.py", description="Bake CakeParticles jobs without the UI")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--job", help="JSON or TOML job file")
+    mode.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="Save the result here instead of overwriting the opened .blend")
+    parser.add_argument("--summary", help="Also write the timing summary to this JSON file")
+    args = parser.parse_args(argv)
+    if args.worker:
+        with open(args.worker) as spec_file:
+            run_bake_worker(json.load(spec_file))
+        return 0
+
+    summary = run_batch(load_batch_job(args.job), args.output)
+    summary["job"] = os.path.abspath(args.job)
+    if args.summary:
+        with open(args.summary, "w") as summary_file:
+            json.dump(summary, summary_file, indent=2)
+    # One line, so farm scripts can grep it out of Blender's log
+    print(BATCH_SUMMARY_PREFIX + json.dumps(summary), flush=True)
+    return 1 if summary["failed"] else 0
+
 # Register the Add-on
 def register():
     bpy.utils.register_class(CakeParticlesPanel)
     bpy.utils.register_class(BakeParticlesOperator)
     bpy.utils.register_class(CollectionCheckOperator)
+    bpy.utils.register_class(CAKE_OT_ClearSampleCache)
+    bpy.utils.register_class(CAKE_OT_CompareLastRuns)
     bpy.types.Scene.target_collection_name = bpy.props.StringProperty(
         name="Target Collection",
         default="particles",
@@ -1168,6 +3920,142 @@ def register():
         min=1,
         description="Keyframe every N frames"
     )
+    bpy.types.Scene.show_cake_bake_options = bpy.props.BoolProperty(
+        name="Show Bake Options",
+        description="Show advanced options for baking",
+        default=False
+    )
+    bpy.types.Scene.cake_location_interpolation = bpy.props.EnumProperty(
+        name="Location Interpolation",
+        items=CHANNEL_INTERPOLATION_ITEMS,
+        default='BEZIER',
+        description="Interpolation of the baked location keys"
+    )
+    bpy.types.Scene.cake_rotation_interpolation = bpy.props.EnumProperty(
+        name="Rotation Interpolation",
+        items=CHANNEL_INTERPOLATION_ITEMS,
+        default='LINEAR',
+        description="Interpolation of the baked rotation keys. Linear avoids quaternion overshoots"
+    )
+    bpy.types.Scene.cake_scale_interpolation = bpy.props.EnumProperty(
+        name="Scale Interpolation",
+        items=CHANNEL_INTERPOLATION_ITEMS,
+        default='BEZIER',
+        description="Interpolation of the baked scale keys. Constant gives hard pops on birth and death"
+    )
+    bpy.types.Scene.cake_key_reduction = bpy.props.EnumProperty(
+        name="Key Reduction",
+        items=[
+            ('NONE', "Every Bake Step", "Keyframe every sampled frame (bake-step)"),
+            ('ADAPTIVE', "Adaptive", "Keep only the keys needed to stay within the tolerances below, fitted with each channel's interpolation"),
+        ],
+        default='NONE',
+        description="How many of the sampled frames end up as keyframes"
+    )
+    bpy.types.Scene.cake_reduction_location_tolerance = bpy.props.FloatProperty(
+        name="Location Tolerance",
+        default=0.01,
+        min=0.0,
+        subtype='DISTANCE',
+        description="Maximum location (and scale) error allowed by adaptive key reduction, in scene units"
+    )
+    bpy.types.Scene.cake_reduction_rotation_tolerance = bpy.props.FloatProperty(
+        name="Rotation Tolerance",
+        default=0.0174533,
+        min=0.0,
+        subtype='ANGLE',
+        description="Maximum rotation error allowed by adaptive key reduction"
+    )
+    bpy.types.Scene.cake_use_sample_cache = bpy.props.BoolProperty(
+        name="Use Sample Cache",
+        default=False,
+        description="Store sampled particles next to the .blend (cakecache_ folder) and reuse them while the emitter, its particle settings and the frame range are unchanged. Requires a saved file"
+    )
+    bpy.types.Scene.cake_read_point_cache = bpy.props.BoolProperty(
+        name="Read Baked Point Cache",
+        default=False,
+        description="Read particles straight from the emitter's baked disk cache (.bphys) instead of stepping the timeline. Needs Disk Cache with compression None, falls back to stepping otherwise"
+    )
+    bpy.types.Scene.cake_isolated_evaluation = bpy.props.BoolProperty(
+        name="Isolated Evaluation",
+        default=False,
+        description="Step the timeline in a temporary scene holding only the emitters, their colliders and force fields (plus what they depend on) instead of the whole scene. Same result, much faster in heavy shots. Frame change handlers still run"
+    )
+    bpy.types.Scene.cake_bake_workers = bpy.props.IntProperty(
+        name="Worker Processes",
+        default=1,
+        min=1,
+        soft_max=32,
+        description="Background Blender processes writing the keyframes in parallel, each one a slice of the particles. 1 writes them in this Blender. The simulation is still sampled once, here"
+    )
+    bpy.types.Scene.cake_bake_output = bpy.props.EnumProperty(
+        name="Bake Output",
+        items=[
+            ('OBJECTS', "Objects", "One keyframed object per particle"),
+            ('POINT_CLOUD', "Point Cloud", "A single object whose per-frame points are instanced with the source objects by Geometry Nodes. Much lighter for large particle counts, frames between samples mix the samples around them"),
+        ],
+        default='OBJECTS'
+    )
+    bpy.types.Scene.cake_memory_budget_mb = bpy.props.IntProperty(
+        name="Memory Budget",
+        default=0,
+        min=0,
+        soft_max=65536,
+        subtype='UNSIGNED',
+        description="Rough limit in MB for the particle samples and keyframe arrays of a bake. Samples over half of it are memory-mapped to temporary files and keys are written in smaller batches. 0 for no limit"
+    )
+    bpy.types.Scene.cake_track_memory = bpy.props.BoolProperty(
+        name="Track Python Memory",
+        default=False,
+        description="Trace Python and NumPy allocations with tracemalloc to report their peak in the run stats. Slows runs down"
+    )
+    bpy.types.Scene.show_cake_stats = bpy.props.BoolProperty(
+        name="Show Last Run Stats",
+        default=False,
+        description="Show the phase timings and counters of the last bake or explosion"
+    )
+    bpy.types.Scene.cake_write_profile = bpy.props.BoolProperty(
+        name="Write Profile",
+        default=False,
+        description="Record bakes and explosions with cProfile and write the trace to the file below (open it with snakeviz, pstats, ...)"
+    )
+    bpy.types.Scene.cake_profile_path = bpy.props.StringProperty(
+        name="Profile File",
+        default="//cake_profile.prof",
+        subtype='FILE_PATH',
+        description="Where the cProfile trace of the last run is written"
+    )
+    bpy.types.Scene.cake_log_history = bpy.props.BoolProperty(
+        name="Log Run History",
+        default=False,
+        description="Append every bake and explosion (sizes, phase timings, peak memory, add-on version) as a JSON line to the run history file"
+    )
+    bpy.types.Scene.cake_history_path = bpy.props.StringProperty(
+        name="History File",
+        default="",
+        subtype='FILE_PATH',
+        description="JSON-lines run history. Empty uses cake_run_history.jsonl in Blender's user config folder, shared by all files"
+    )
+    bpy.types.Scene.cake_rebake_window = bpy.props.BoolProperty(
+        name="Re-bake Frame Window",
+        default=False,
+        description="When the target collection already exists, only replace its keys inside the frame window below instead of rebuilding the whole bake"
+    )
+    bpy.types.Scene.cake_rebake_frame_start = bpy.props.IntProperty(
+        name="Window Start",
+        default=1,
+        description="First frame re-baked into the existing collection"
+    )
+    bpy.types.Scene.cake_rebake_frame_end = bpy.props.IntProperty(
+        name="Window End",
+        default=250,
+        description="Last frame re-baked into the existing collection"
+    )
+    bpy.types.Scene.cake_bake_selected_emitters = bpy.props.BoolProperty(
+        name="Bake Selected Emitters",
+        default=False,
+        description="Also bake selected objects that have particle systems, all systems are sampled in the same timeline pass. Other selected objects stay the instanced sources"
+    )
     bpy.types.Scene.cake_explosion_num_cuts = bpy.props.IntProperty(
         name="Number of Cuts",
         description="Number of random cuts to perform on the mesh. More cuts generally result in more pieces",
@@ -1180,10 +4068,28 @@ def register():
         items=[
             ('NON_UNIFORM', "Non-Uniform (Chip)", "Chips pieces iteratively; sizes can vary (original method)."),
             ('RANDOM_CHIPPING', "Random Chipping (Aggressive)", "Iterative chipping with more random cuts per step."),
+            ('UNIFORM', "Uniform (Grid)", "Noisy axis-aligned grid of cuts placed by the vertex distribution; pieces of similar size, fastest mode."),
+            ('VORONOI', "Voronoi", "Exactly N pieces: Voronoi cells around N seed points scattered over the mesh by the seed."),
         ],
         default='NON_UNIFORM',
         description="Method used to split the mesh during explosion."
     )
+    bpy.types.Scene.cake_explosion_matching = bpy.props.EnumProperty(
+        name="Piece Matching",
+        items=[
+            ('GREEDY', "Greedy", "Particles in index order take the free piece pointing most their way. Fastest"),
+            ('OPTIMAL', "Optimal", "Best assignment of all pieces at once (Hungarian algorithm), no piece flies off in a clearly wrong direction. Takes seconds for thousands of pieces"),
+        ],
+        default='GREEDY',
+        description="How explosion pieces are assigned to particles"
+    )
+    bpy.types.Scene.cake_explosion_size_weight = bpy.props.FloatProperty(
+        name="Size Matching",
+        description="Weight of matching big pieces to big particles against matching directions. 0 only uses directions",
+        default=0.0,
+        min=0.0,
+        max=1.0
+    )
     bpy.types.Scene.show_cake_explosion_options = bpy.props.BoolProperty(
         name="Show Cake Explosion",
         description="Show options for the Cake Explosion feature",
@@ -1205,6 +4111,22 @@ def register():
         min=1,
         description="step size = minimum distance between selected frames after processing"
         )
+    bpy.types.Scene.cake_simplify_mode = bpy.props.EnumProperty(
+        name="Simplify Mode",
+        items=[
+            ('STEP', "Every Nth Key", "Keep every Nth selected key"),
+            ('TOLERANCE', "Tolerance", "Keep only the selected keys needed to stay within the tolerance"),
+        ],
+        default='STEP',
+        description="How Simplify Animation picks the keys to remove"
+    )
+    bpy.types.Scene.cake_simplify_tolerance = bpy.props.FloatProperty(
+        name="Simplify Tolerance",
+        default=0.001,
+        min=0.0,
+        precision=4,
+        description="Maximum change of a curve's value on any frame once keys are removed, in the curve's own units"
+    )
     bpy.utils.register_class(ScaleKeyframesOperator)
     
     bpy.types.Scene.scale_range = bpy.props.FloatProperty(
@@ -1213,6 +4135,15 @@ def register():
         min=0.0,
         description="Range within which to randomly scale the keyframes"
     )
+    bpy.types.Scene.cake_time_scale_mode = bpy.props.EnumProperty(
+        name="Time Scale Mode",
+        items=[
+            ('KEYS', "Scale Keys", "Move the keyframes themselves around the action's first frame, scaling compounds on every run"),
+            ('NLA', "NLA Strip Scale", "Play the action through an NLA strip and only change the strip scale, keys stay untouched"),
+        ],
+        default='KEYS',
+        description="How Randomize Times applies the random time scale"
+    )
     bpy.types.Scene.show_info = bpy.props.BoolProperty(
         default=False,
         name="Show Basic Information"
@@ -1231,19 +4162,49 @@ def unregister():
     bpy.utils.unregister_class(CakeParticlesPanel)
     bpy.utils.unregister_class(BakeParticlesOperator)
     bpy.utils.unregister_class(CollectionCheckOperator)
+    bpy.utils.unregister_class(CAKE_OT_ClearSampleCache)
+    bpy.utils.unregister_class(CAKE_OT_CompareLastRuns)
     bpy.utils.unregister_class(CAKE_OT_CakeExplosion)
     bpy.utils.unregister_class(CAKE_OT_AdjustExplosionParticles)
     del bpy.types.Scene.cake_explosion_num_cuts
     del bpy.types.Scene.cake_explosion_split_mode
+    del bpy.types.Scene.cake_explosion_matching
+    del bpy.types.Scene.cake_explosion_size_weight
     del bpy.types.Scene.cake_explosion_seed
     del bpy.types.Scene.show_cake_explosion_options
     del bpy.types.Scene.target_collection_name
     del bpy.types.Scene.bake_step
+    del bpy.types.Scene.show_cake_bake_options
+    del bpy.types.Scene.cake_location_interpolation
+    del bpy.types.Scene.cake_rotation_interpolation
+    del bpy.types.Scene.cake_scale_interpolation
+    del bpy.types.Scene.cake_key_reduction
+    del bpy.types.Scene.cake_reduction_location_tolerance
+    del bpy.types.Scene.cake_reduction_rotation_tolerance
+    del bpy.types.Scene.cake_use_sample_cache
+    del bpy.types.Scene.cake_read_point_cache
+    del bpy.types.Scene.cake_isolated_evaluation
+    del bpy.types.Scene.cake_bake_workers
+    del bpy.types.Scene.cake_bake_output
+    del bpy.types.Scene.cake_memory_budget_mb
+    del bpy.types.Scene.cake_track_memory
+    del bpy.types.Scene.show_cake_stats
+    del bpy.types.Scene.cake_write_profile
+    del bpy.types.Scene.cake_profile_path
+    del bpy.types.Scene.cake_log_history
+    del bpy.types.Scene.cake_history_path
+    del bpy.types.Scene.cake_rebake_window
+    del bpy.types.Scene.cake_rebake_frame_start
+    del bpy.types.Scene.cake_rebake_frame_end
+    del bpy.types.Scene.cake_bake_selected_emitters
     bpy.utils.unregister_class(SimplifyAnimationPanel)
     bpy.utils.unregister_class(SimplifyObjectAnimationOperator)
     del bpy.types.Scene.step
+    del bpy.types.Scene.cake_simplify_mode
+    del bpy.types.Scene.cake_simplify_tolerance
     bpy.utils.unregister_class(ScaleKeyframesOperator)
     del bpy.types.Scene.scale_range
+    del bpy.types.Scene.cake_time_scale_mode
     del bpy.types.Scene.show_info
     del bpy.types.Scene.show_advanced
     del bpy.types.Scene.show_edit_info
@@ -1251,3 +4212,5 @@ def unregister():
 # Required for Blender to recognize the script as an add-on
 if __name__ == "__main__":
     register()
+    if "--" in sys.argv:
+        sys.exit(batch_main(sys.argv[sys.argv.index("--") + 1:]))
@@ -0,0 +1,87 @@
+"""
+Bake time versus frame count for CakeParticles.
+
+Run headless from the repository root:
+    blender -b --factory-startup --python benchmarks/bench_bake_scaling.py -- --particles 1000 --frames 50,100,200,400
+
+Each frame count starts from an empty factory scene with a fresh emitter, so nothing is served from
+a warm particle cache and no earlier emitter is simulated along.
+With linear scaling the "ms/frame" column stays roughly flat as the frame count grows.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+import bpy
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_addon():
+    spec = importlib.util.spec_from_file_location("CakeParticles", os.path.join(REPO_ROOT, "CakeParticles.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.register()
+    return module
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--particles", type=int, default=1000)
+    parser.add_argument("--frames", default="50,100,200,400", help="Comma separated frame counts")
+    return parser.parse_args(argv)
+
+
+def reset_scene():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    return bpy.context.scene
+
+
+def build_emitter(scene, particle_count, frame_count):
+    bpy.ops.mesh.primitive_plane_add(size=2.0)
+    emitter = bpy.context.active_object
+    emitter.modifiers.new("Particles", type='PARTICLE_SYSTEM')
+    settings = emitter.particle_systems[0].settings
+    settings.count = particle_count
+    settings.frame_start = 1
+    settings.frame_end = max(1, frame_count // 2)
+    settings.lifetime = frame_count
+    settings.use_rotations = True
+    settings.use_dynamic_rotation = True
+    scene.frame_start = 1
+    scene.frame_end = frame_count
+    return emitter
+
+
+def main():
+    args = parse_args()
+    cake = load_addon()
+
+    print(f"{'frames':>8} {'sample s':>10} {'write s':>10} {'total s':>10} {'ms/frame':>10}")
+    per_frame = []
+    for frame_count in (int(f) for f in args.frames.split(",")):
+        scene = reset_scene()
+        bpy.ops.mesh.primitive_cube_add(size=0.1)
+        source = bpy.context.active_object
+        emitter = build_emitter(scene, args.particles, frame_count)
+        psys = emitter.particle_systems[0]
+        objects = cake.create_particle_objects(psys, [source], f"bench_{frame_count}")
+
+        t0 = time.perf_counter()
+        samples = cake.sample_particle_system(psys, scene.frame_start, scene.frame_end)
+        t1 = time.perf_counter()
+        cake.keyframe_objects_from_samples(samples, objects, interpolation=cake.get_channel_interpolation(scene))
+        t2 = time.perf_counter()
+
+        per_frame.append((t2 - t0) / frame_count)
+        print(f"{frame_count:>8} {t1 - t0:>10.3f} {t2 - t1:>10.3f} {t2 - t0:>10.3f} {per_frame[-1] * 1000:>10.2f}")
+
+    if len(per_frame) > 1:
+        print(f"per-frame cost ratio (longest / shortest bake): {per_frame[-1] / per_frame[0]:.2f}  (~1.0 means linear)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Reproducible timings of the bake, explosion, matching and post-processing paths of CakeParticles.
+
+Run headless from the repository root:
+    blender -b --factory-startup --python benchmarks/bench_suite.py -- --preset quick --output bench.json
+    blender -b --factory-startup --python benchmarks/bench_suite.py -- --preset full --output new.json \
+        --baseline bench.json --thresholds benchmarks/thresholds.json
+
+Every case starts from an empty factory scene and is built from a fixed seed, so two runs on the
+same machine time the same work. Each case runs --repeat times and keeps the fastest time.
+With --baseline, cases slower than baseline * (1 + threshold) are listed and the exit code is 1.
+"""
+import argparse
+import fnmatch
+import importlib.util
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import bpy
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRESETS = {
+    "quick": {"particles": [1000], "frames": [100], "polys": [512, 2048], "pieces": [20],
+              "matching": [100, 500]},
+    "default": {"particles": [1000, 10000], "frames": [100, 500], "polys": [512, 2048, 8192], "pieces": [20, 50],
+                "matching": [100, 500, 2000]},
+    "full": {"particles": [1000, 10000, 100000], "frames": [100, 500, 1000], "polys": [512, 2048, 8192, 32768],
+             "pieces": [20, 50, 200], "matching": [100, 500, 1000, 2000]},
+}
+
+
+def load_addon():
+    spec = importlib.util.spec_from_file_location("CakeParticles", os.path.join(REPO_ROOT, "CakeParticles.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.register()
+    return module
+
+
+def int_list(text):
+    return [int(value) for value in text.split(",")]
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    parser.add_argument("--particles", type=int_list, help="Comma separated particle counts, overrides the preset")
+    parser.add_argument("--frames", type=int_list, help="Comma separated frame counts, overrides the preset")
+    parser.add_argument("--polys", type=int_list, help="Comma separated explosion mesh face counts")
+    parser.add_argument("--pieces", type=int_list, help="Comma separated explosion piece counts")
+    parser.add_argument("--matching", type=int_list, help="Comma separated piece = particle counts for matching")
+    parser.add_argument("--explosion-frames", type=int, default=50)
+    parser.add_argument("--only", default="*", help="fnmatch pattern of the case names to run, e.g. 'bake/*'")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--thresholds", help="JSON with the allowed slowdown per case pattern")
+    args = parser.parse_args(argv)
+    for key, values in PRESETS[args.preset].items():
+        if getattr(args, key) is None:
+            setattr(args, key, values)
+    return args
+
+
+def reset_scene(seed=0):
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    random.seed(seed)
+    return bpy.context.scene
+
+
+def make_active(obj, selected=()):
+    for other in bpy.context.view_layer.objects:
+        other.select_set(False)
+    for other in selected:
+        other.select_set(True)
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def add_particle_emitter(scene, particle_count, frame_count, mesh_add=bpy.ops.mesh.primitive_plane_add, **mesh_args):
+    mesh_add(**mesh_args)
+    emitter = bpy.context.active_object
+    emitter.modifiers.new("Particles", type='PARTICLE_SYSTEM')
+    settings = emitter.particle_systems[0].settings
+    settings.count = particle_count
+    settings.frame_start = 1
+    settings.frame_end = max(1, frame_count // 2)
+    settings.lifetime = frame_count
+    settings.use_rotations = True
+    settings.use_dynamic_rotation = True
+    scene.frame_start = 1
+    scene.frame_end = frame_count
+    return emitter
+
+
+def select_all_keys(objects):
+    for obj in objects:
+        for fcurve in obj.animation_data.action.fcurves:
+            fcurve.keyframe_points.foreach_set("select_control_point", [True] * len(fcurve.keyframe_points))
+
+
+def bake_cases(cake, particle_count, frame_count):
+    """Bake and the post-processing run on its result, one scene"""
+    scene = reset_scene()
+    bpy.ops.mesh.primitive_cube_add(size=0.1)
+    source = bpy.context.active_object
+    emitter = add_particle_emitter(scene, particle_count, frame_count, size=2.0)
+    psys = emitter.particle_systems[0]
+    label = f"p{particle_count}_f{frame_count}"
+
+    timings = {}
+    timings[f"bake/create_particle_objects/{label}"], objects = timed(
+        cake.create_particle_objects, psys, [source], "bench_bake")
+    timings[f"bake/match_keyframe_objects/{label}"], _ = timed(
+        cake.match_keyframe_objects, psys, objects, scene.frame_start, scene.frame_end)
+
+    context = bpy.context
+    scene.step = 2
+    for mode in ('STEP', 'TOLERANCE'):
+        scene.cake_simplify_mode = mode
+        select_all_keys(objects)
+        timings[f"post/remove_inbetween_{mode.lower()}/{label}"], _ = timed(cake.remove_inbetween, context, objects)
+
+    make_active(objects[0], objects)
+    scene.scale_range = 0.5
+    for mode in ('KEYS', 'NLA'):
+        scene.cake_time_scale_mode = mode
+        timings[f"post/scale_keyframes_{mode.lower()}/{label}"], _ = timed(bpy.ops.object.scale_keyframes)
+    return timings
+
+
+def uv_sphere_segments(poly_count):
+    """UV sphere segments/rings giving about poly_count faces"""
+    rings = max(3, int(round((poly_count / 2) ** 0.5)))
+    return max(3, poly_count // rings), rings
+
+
+def explosion_case(cake, poly_count, piece_count, split_mode, frame_count):
+    scene = reset_scene()
+    segments, rings = uv_sphere_segments(poly_count)
+    bpy.ops.mesh.primitive_uv_sphere_add(segments=segments, ring_count=rings, radius=1.0)
+    cake_obj = bpy.context.active_object
+    cake_obj.modifiers.new("Particles", type='PARTICLE_SYSTEM')
+    scene.frame_start = 1
+    scene.frame_end = frame_count
+    scene.target_collection_name = "bench_explosion"
+    scene.cake_explosion_num_cuts = piece_count
+    scene.cake_explosion_split_mode = split_mode
+    scene.cake_explosion_seed = 0
+    make_active(cake_obj)
+    bpy.ops.cake.adjust_explosion_particles()
+
+    seconds, result = timed(bpy.ops.cake.cake_explosion)
+    collection = bpy.data.collections.get("bench_explosion")
+    return {
+        f"explosion/{split_mode.lower()}/poly{len(cake_obj.data.polygons)}_pieces{piece_count}": seconds,
+    }, {
+        "finished": 'FINISHED' in result,
+        "pieces_created": len(collection.objects) if collection else 0,
+    }
+
+
+def matching_alignment(emitter, center, matched, eval_frame):
+    """Mean cosine between each particle's direction and its piece's outward direction"""
+    scene = bpy.context.scene
+    scene.frame_set(eval_frame)
+    particles = emitter.evaluated_get(bpy.context.evaluated_depsgraph_get()).particle_systems[0].particles
+    cosines = []
+    for particle, piece in zip(particles, matched):
+        direction = particle.velocity if particle.velocity.length > 0.001 else particle.location - center
+        outward = piece.matrix_world.translation - center
+        if direction.length > 0.001 and outward.length > 0.001:
+            cosines.append(direction.normalized().dot(outward.normalized()))
+    return sum(cosines) / len(cosines) if cosines else 0.0
+
+
+def matching_case(cake, count, matching):
+    scene = reset_scene()
+    emitter = add_particle_emitter(scene, count, 10, bpy.ops.mesh.primitive_ico_sphere_add, subdivisions=3)
+    settings = emitter.particle_systems[0].settings
+    settings.frame_end = 1
+    settings.normal_factor = 10.0
+    center = emitter.matrix_world.translation.copy()
+
+    pieces = []
+    for index in range(count):
+        piece = bpy.data.objects.new(f"piece_{index:04d}", None)
+        piece.location = (random.uniform(-1, 1), random.uniform(-1, 1), random.uniform(-1, 1))
+        scene.collection.objects.link(piece)
+        pieces.append(piece)
+    bpy.context.view_layer.update()
+
+    seconds, matched = timed(cake.get_directionally_matched_pieces, center, pieces,
+                             emitter.particle_systems[0], 2, bpy.context, matching)
+    return {f"matching/{matching.lower()}/n{count}": seconds}, {
+        "matched": len(matched),
+        "mean_alignment": round(matching_alignment(emitter, center, matched, 2), 4),
+    }
+
+
+def enum_identifiers(prop_name):
+    return [item.identifier for item in bpy.types.Scene.bl_rna.properties[prop_name].enum_items]
+
+
+def run_cases(cake, args):
+    """(case name -> seconds, case name -> extra info), fastest of args.repeat runs"""
+    jobs = []
+    for particle_count in args.particles:
+        for frame_count in args.frames:
+            jobs.append((f"bake/*/p{particle_count}_f{frame_count}",
+                         lambda p=particle_count, f=frame_count: (bake_cases(cake, p, f), {})))
+    for split_mode in enum_identifiers("cake_explosion_split_mode"):
+        for poly_count in args.polys:
+            for piece_count in args.pieces:
+                jobs.append((f"explosion/{split_mode.lower()}/*",
+                             lambda m=split_mode, p=poly_count, k=piece_count:
+                             explosion_case(cake, p, k, m, args.explosion_frames)))
+    for matching in enum_identifiers("cake_explosion_matching"):
+        for count in args.matching:
+            jobs.append((f"matching/{matching.lower()}/n{count}",
+                         lambda n=count, m=matching: matching_case(cake, n, m)))
+
+    results, info = {}, {}
+    for pattern, job in jobs:
+        if not (fnmatch.fnmatch(pattern, args.only) or fnmatch.fnmatch(args.only, pattern)):
+            continue
+        for _ in range(args.repeat):
+            timings, extra = job()
+            for name, seconds in timings.items():
+                results[name] = min(seconds, results.get(name, seconds))
+                info[name] = extra
+                print(f"{name:<60} {seconds:>10.3f} s", flush=True)
+    return results, info
+
+
+def load_thresholds(path):
+    if not path:
+        return {"default": 0.2, "cases": {}}
+    with open(path) as thresholds_file:
+        return json.load(thresholds_file)
+
+
+def threshold_for(case, thresholds):
+    """Allowed relative slowdown of a case, the most specific (longest) matching pattern wins"""
+    matches = [pattern for pattern in thresholds.get("cases", {}) if fnmatch.fnmatch(case, pattern)]
+    if not matches:
+        return thresholds.get("default", 0.2)
+    return thresholds["cases"][max(matches, key=len)]
+
+
+def compare(results, baseline_path, thresholds):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+    regressions = []
+    print(f"\n{'case':<60} {'base s':>10} {'new s':>10} {'ratio':>8}")
+    for case, seconds in sorted(results.items()):
+        if case not in baseline:
+            continue
+        base = baseline[case]["seconds"]
+        ratio = seconds / base if base > 0 else 1.0
+        limit = 1.0 + threshold_for(case, thresholds)
+        flag = "  REGRESSION" if ratio > limit else ""
+        print(f"{case:<60} {base:>10.3f} {seconds:>10.3f} {ratio:>8.2f}{flag}")
+        if flag:
+            regressions.append({"case": case, "baseline": base, "seconds": seconds, "limit": limit})
+    return regressions
+
+
+def main():
+    args = parse_args()
+    cake = load_addon()
+    results, info = run_cases(cake, args)
+
+    report = {
+        "meta": {
+            "addon_version": ".".join(str(part) for part in cake.bl_info["version"]),
+            "blender": bpy.app.version_string,
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "processor": platform.processor(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "preset": args.preset,
+            "repeat": args.repeat,
+        },
+        "results": {case: dict(seconds=round(seconds, 6), **info[case]) for case, seconds in results.items()},
+    }
+    if args.baseline:
+        report["regressions"] = compare(results, args.baseline, load_thresholds(args.thresholds))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    if report.get("regressions"):
+        print(f"{len(report['regressions'])} case(s) slower than their threshold")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()